@@ -0,0 +1,242 @@
+"""
+Batched sampling engine for running many Markov chains at once.
+
+A trained MarkovModel stores its predictions as a dict of lists, which is
+convenient for learning but means predict() has to do a dict lookup and a
+random.choice for every word of every chain. compile_model() flattens the
+predictions into NumPy arrays (one row per distinct successor, grouped by
+state), and BatchSampler advances N chains per step with a single
+searchsorted over those arrays.
+
+Every chain draws its random numbers from its own seed, so chain i produces
+the same text no matter how many other chains are run alongside it.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from markov_model import MarkovModel
+
+# Marks "no word" / "no state": the chain has reached the end of the text.
+END = -1
+
+
+class CompiledModel:
+    """
+    Array form of a trained MarkovModel.
+
+    Successors of state s are stored in rows offsets[s] to offsets[s+1]-1 of
+    next_word, next_state and cumulative. cumulative holds s plus the running
+    fraction of the weight of s, so the row for a draw u in [0, 1) is found
+    by searching for s + u in the whole array.
+    """
+
+    def __init__(self, model):
+        self.n = model.n
+        # Distinct words, indexed by word id. None (end of text) gets no id,
+        # it is stored as END in next_word.
+        self.vocab = []
+        word_ids = {}
+        # State keys in id order and the reverse mapping
+        self.states = list(model.predictions.keys())
+        self.state_ids = {key: i for i, key in enumerate(self.states)}
+
+        offsets = [0]
+        next_word = []
+        next_state = []
+        cumulative = []
+        entropy = []
+        for s, key in enumerate(self.states):
+            options = model.predictions[key]
+            counts = {}
+            for word in options:
+                counts[word] = counts.get(word, 0) + 1
+            total = len(options)
+            running = 0
+            for word, count in counts.items():
+                running += count
+                if word is None:
+                    next_word.append(END)
+                    next_state.append(END)
+                else:
+                    if word not in word_ids:
+                        word_ids[word] = len(self.vocab)
+                        self.vocab.append(word)
+                    next_word.append(word_ids[word])
+                    next_state.append(self.state_ids.get(key[1:] + (word,), END))
+                cumulative.append(s + running / total)
+            # Guard against rounding so each state ends exactly at s + 1
+            cumulative[-1] = s + 1.0
+            offsets.append(len(next_word))
+            entropy.append(1 - sum(c * c for c in counts.values()) / (total * total))
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.next_word = np.array(next_word, dtype=np.int32)
+        self.next_state = np.array(next_state, dtype=np.int32)
+        self.cumulative = np.array(cumulative, dtype=np.float64)
+        self.entropy = np.array(entropy, dtype=np.float64)
+        self.start = self.state_ids.get((None,) * self.n, END)
+
+    def num_states(self):
+        return len(self.states)
+
+    def num_transitions(self):
+        return len(self.next_word)
+
+
+def compile_model(model):
+    """Flatten a trained MarkovModel into a CompiledModel."""
+    return CompiledModel(model)
+
+
+def chain_seeds(seed, count):
+    """Derive count independent per-chain seeds from a single seed."""
+    return np.random.SeedSequence(seed).generate_state(count, dtype=np.uint64)
+
+
+def _mix64(x):
+    """SplitMix64 finalizer, applied elementwise to a uint64 array."""
+    with np.errstate(over='ignore'):
+        z = x + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def uniform_draws(seeds, step):
+    """
+    Return one float in [0, 1) per seed for the given step number.
+
+    The value depends only on (seed, step), which is what makes every chain
+    reproducible independently of the batch it is run in.
+    """
+    step_key = _mix64(np.array([step], dtype=np.uint64))
+    bits = _mix64(seeds ^ step_key)
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+class BatchSampler:
+    """
+    Advances many independent chains over a CompiledModel.
+
+    state holds the current state id of each chain (END once a chain has
+    finished) and step counts how many words have been drawn so far.
+    """
+
+    def __init__(self, compiled, seeds):
+        self.compiled = compiled
+        self.seeds = np.asarray(seeds, dtype=np.uint64)
+        self.reset()
+
+    def reset(self):
+        self.state = np.full(len(self.seeds), self.compiled.start, dtype=np.int64)
+        self.step_count = 0
+
+    def alive(self):
+        """Boolean mask of the chains that have not reached the end."""
+        return self.state != END
+
+    def step(self):
+        """
+        Advance every live chain by one word.
+
+        Returns:
+            tuple: (word_ids, entropies) arrays with one entry per chain.
+                Finished chains get END and 0.0.
+        """
+        compiled = self.compiled
+        words = np.full(len(self.seeds), END, dtype=np.int32)
+        scores = np.zeros(len(self.seeds), dtype=np.float64)
+        live = np.flatnonzero(self.state != END)
+        if len(live):
+            states = self.state[live]
+            u = uniform_draws(self.seeds[live], self.step_count)
+            rows = np.searchsorted(compiled.cumulative, states + u, side='right')
+            # s + u can round up to s + 1, which would land in the next state
+            rows = np.minimum(rows, compiled.offsets[states + 1] - 1)
+            words[live] = compiled.next_word[rows]
+            scores[live] = compiled.entropy[states]
+            self.state[live] = compiled.next_state[rows]
+        self.step_count += 1
+        return words, scores
+
+    def generate(self, max_words):
+        """
+        Run all chains until they end or produce max_words words.
+
+        Returns:
+            list: One list of words per chain.
+        """
+        vocab = self.compiled.vocab
+        columns = []
+        for _ in range(max_words):
+            if not self.alive().any():
+                break
+            words, _ = self.step()
+            columns.append(words)
+        if not columns:
+            return [[] for _ in self.seeds]
+        table = np.stack(columns, axis=1)
+        return [[vocab[w] for w in row if w != END] for row in table]
+
+
+def format_chain(words, width=80):
+    """Lay out one chain's words the way markov_model.main prints them, without color."""
+    lines = []
+    line = []
+    line_length = 0
+    for word in words:
+        if word == '\n':
+            lines.append(' '.join(line))
+            lines.append('')
+            line = []
+            line_length = 0
+            continue
+        if line_length + len(word) + 1 > width:
+            lines.append(' '.join(line))
+            line = []
+            line_length = 0
+        line.append(word)
+        line_length += len(word) + 1
+    if line:
+        lines.append(' '.join(line))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate text from many Markov chains at once")
+    parser.add_argument('-n', type=int, default=2,
+                        help='Order of the Markov model')
+    parser.add_argument('--chains', type=int, default=100,
+                        help='Number of chains to run in parallel')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed from which the per-chain seeds are derived')
+    parser.add_argument('--max-words', type=int, default=200,
+                        help='Maximum number of words per chain')
+    parser.add_argument('-o', '--output',
+                        help='File to write the generated texts to (default: stdout)')
+    parser.add_argument('files', nargs='+', help='Text files to learn from')
+    args = parser.parse_args()
+
+    model = MarkovModel(args.n)
+    for fname in args.files:
+        model.learn_from(fname)
+
+    sampler = BatchSampler(compile_model(model), chain_seeds(args.seed, args.chains))
+    texts = sampler.generate(args.max_words)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for i, words in enumerate(texts):
+            print(f"=== chain {i} ===", file=out)
+            print(format_chain(words), file=out)
+            print(file=out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
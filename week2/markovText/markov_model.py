@@ -1,5 +1,7 @@
 import argparse
 import random
+import sys
+import time
 from collections import deque, Counter
 from termcolor import colored
 
@@ -24,8 +26,11 @@ class MarkovModel:
     def learn_from(self, filename):
         self.reset()
         last_empty = False
+        line_count = 0
+        word_count = 0
         with open(filename, 'r', encoding='utf-8') as f:
             for line in f:
+                line_count += 1
                 line = line.strip()
                 if line.isupper():
                     self.reset()
@@ -35,12 +40,14 @@ class MarkovModel:
                     words = line.split()
                     for word in words:
                         self.saw(word)
+                    word_count += len(words)
                     last_empty = False
                 else:
                     if not last_empty:
                         self.saw('\n')
                     last_empty = True
         self.saw(None)
+        return line_count, word_count
 
     def predict(self):
         key = tuple(self.prev)
@@ -61,29 +68,133 @@ def entropy(words):
     return 1 - (sum_sq / (total * total))
 
 
+def bucket_label(low, high):
+    return str(low) if low == high else f"{low}-{high}"
+
+
+def model_stats(model):
+    """Collect size and shape statistics about a trained model."""
+    predictions = model.predictions
+    states = len(predictions)
+    observations = 0
+    distinct = 0
+    size_buckets = Counter()
+    entropy_buckets = Counter()
+    entropy_sum = 0.0
+    weighted_entropy_sum = 0.0
+    memory = sys.getsizeof(predictions)
+    seen_words = set()
+    for key, options in predictions.items():
+        observations += len(options)
+        distinct += len(set(options))
+        size = len(options)
+        high = 1
+        while high < size:
+            high *= 2
+        size_buckets[(high // 2 + 1 if high > 1 else 1, high)] += 1
+        score = entropy(options)
+        entropy_sum += score
+        weighted_entropy_sum += score * size
+        entropy_buckets[min(int(score * 10), 9)] += 1
+        memory += sys.getsizeof(key) + sys.getsizeof(options)
+        for word in key + tuple(options):
+            if word is not None and id(word) not in seen_words:
+                seen_words.add(id(word))
+                memory += sys.getsizeof(word)
+    return {
+        'states': states,
+        'observations': observations,
+        'transitions': distinct,
+        'memory': memory,
+        'size_buckets': size_buckets,
+        'entropy_buckets': entropy_buckets,
+        'mean_entropy': entropy_sum / states if states else 0.0,
+        'weighted_entropy': weighted_entropy_sum / observations if observations else 0.0,
+    }
+
+
+def print_stats(stats, out=sys.stderr):
+    """Print the statistics returned by model_stats."""
+    states = stats['states']
+    print("=== Model statistics ===", file=out)
+    print(f"States:                 {states:,}", file=out)
+    print(f"Observed transitions:   {stats['observations']:,}", file=out)
+    print(f"Distinct transitions:   {stats['transitions']:,}", file=out)
+    print(f"Approximate memory:     {stats['memory'] / 2**20:,.1f} MB", file=out)
+    if states:
+        print(f"Memory per state:       {stats['memory'] / states:,.0f} bytes", file=out)
+    print(f"Mean entropy:           {stats['mean_entropy']:.3f}", file=out)
+    print(f"Mean entropy per word:  {stats['weighted_entropy']:.3f}", file=out)
+    print("Successor list sizes:", file=out)
+    for (low, high), count in sorted(stats['size_buckets'].items()):
+        print(f"  {bucket_label(low, high):>11}: {count:>9,} {count / states * 100:5.1f}%", file=out)
+    print("Entropy:", file=out)
+    for bucket, count in sorted(stats['entropy_buckets'].items()):
+        low = bucket / 10
+        print(f"  {low:.1f}-{low + 0.1:.1f}: {count:>9,} {count / states * 100:5.1f}%", file=out)
+
+
+def print_profile(timings, out=sys.stderr):
+    """Print the training and generation timings collected by main."""
+    total = timings['train'] + timings['predict'] + timings['output']
+    print("=== Profile ===", file=out)
+    train = timings['train']
+    print(f"Training:   {train:8.3f}s  {timings['lines']:,} lines, {timings['words']:,} words", file=out)
+    if train > 0:
+        print(f"            {timings['lines'] / train:,.0f} lines/sec, {timings['words'] / train:,.0f} words/sec",
+              file=out)
+    predict = timings['predict']
+    print(f"Predict:    {predict:8.3f}s  {timings['generated']:,} words", file=out)
+    if predict > 0:
+        print(f"            {timings['generated'] / predict:,.0f} words/sec", file=out)
+    print(f"Output:     {timings['output']:8.3f}s", file=out)
+    if total > 0:
+        for name in ('train', 'predict', 'output'):
+            print(f"  {name:<8} {timings[name] / total * 100:5.1f}%", file=out)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Markov text model")
     parser.add_argument('-n', type=int, default=2,
                         help='Order of the Markov model')
     parser.add_argument('-l', action='store_true', help='light mode')
+    parser.add_argument('--profile', action='store_true',
+                        help='report training and generation timings on stderr')
+    parser.add_argument('--stats', action='store_true',
+                        help='report model size and successor statistics on stderr')
     parser.add_argument('files', nargs='+', help='Text files to learn from')
     args = parser.parse_args()
 
+    timings = Counter()
+    clock = time.perf_counter
     model = MarkovModel(args.n)
+    start = clock()
     for fname in args.files:
-        model.learn_from(fname)
+        lines, words = model.learn_from(fname)
+        timings['lines'] += lines
+        timings['words'] += words
+    timings['train'] = clock() - start
+
+    if args.stats:
+        print_stats(model_stats(model))
 
     model.reset()
     line_length = 0
     while True:
+        start = clock()
         word, entropy_score = model.predict()
+        finish = clock()
+        timings['predict'] += finish - start
+        start = finish
         if word is None:
             break
+        timings['generated'] += 1
         if word == '\n':
             if line_length > 0:
                 print()
             print()
             line_length = 0
+            timings['output'] += clock() - start
             continue
         if line_length + len(word) + 1 > 80:
             print()
@@ -97,6 +208,11 @@ def main():
             text_color = (255, color, color)
         print(colored(word, text_color), end=' ')
         line_length += len(word) + 1
+        timings['output'] += clock() - start
+
+    if args.profile:
+        print(file=sys.stderr)
+        print_profile(timings)
 
 
 if __name__ == "__main__":
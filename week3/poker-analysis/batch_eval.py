@@ -0,0 +1,189 @@
+"""
+Vectorized hand evaluation with NumPy.
+
+evaluate_many() gives exactly the same strengths as poker_analysis.evaluate(),
+but for a whole array of hands at once. It follows the same steps:
+
+* CARD_KEY is gathered and summed down each hand, giving the base 5 rank
+  histogram and the four suit counters in one int64 per hand.
+* The histogram is split into its low 7 and high 6 base 5 digits, and two
+  small tables turn those into a dense index into RANK_STRENGTHS, a flat
+  copy of RANK_TABLE. Ordering the low halves by their digit sum makes the
+  halves that fit with any given high half a prefix, so the flat table
+  has no holes.
+* Only the few hands whose suit counters show a flush get per-suit rank
+  bitmasks, built with a bitwise OR-reduce and looked up in FLUSH_TABLE.
+
+Hands are processed as (7, N) arrays internally because summing down the
+short axis of a contiguous array is much faster than across it.
+"""
+
+import hashlib
+import numpy as np
+
+from equity import POT, EquityResult
+from hand_rank import HandRank
+from poker_analysis import (CARD_KEY, DECK, FLUSH_TABLE, FLUSH_TEST_ADD, FLUSH_TEST_MASK,
+                            RANK_TABLE, parse_cards)
+
+LOW_DIGITS = 7
+HIGH_DIGITS = 6
+LOW_SPAN = 5 ** LOW_DIGITS
+MAX_CARDS = 7
+
+CARD_KEYS = np.array(CARD_KEY, dtype=np.int64)
+CARD_SUIT = np.array([card & 3 for card in DECK], dtype=np.int64)
+CARD_BIT = np.array([1 << (card >> 2) for card in DECK], dtype=np.int64)
+FLUSH_STRENGTHS = np.array(FLUSH_TABLE, dtype=np.int64)
+
+
+def _histograms(digits):
+    """(value, digit sum) for every base 5 number with this many digits that holds at most MAX_CARDS cards."""
+    found = []
+
+    def fill(position, value, total):
+        if position == digits:
+            found.append((value, total))
+            return
+        for count in range(min(4, MAX_CARDS - total) + 1):
+            fill(position + 1, value + count * 5 ** position, total + count)
+
+    fill(0, 0, 0)
+    return found
+
+
+def _build_rank_index():
+    """Build LOW_INDEX, HIGH_BASE and RANK_STRENGTHS (see the module docstring)."""
+    lows = sorted(_histograms(LOW_DIGITS), key=lambda low: low[1])
+    low_index = np.zeros(LOW_SPAN, dtype=np.int64)
+    fitting = [0] * (MAX_CARDS + 1)
+    for i, (value, total) in enumerate(lows):
+        low_index[value] = i
+        fitting[total] = i + 1
+    for total in range(1, MAX_CARDS + 1):
+        fitting[total] = max(fitting[total], fitting[total - 1])
+
+    high_base = np.zeros(5 ** HIGH_DIGITS, dtype=np.int64)
+    size = 0
+    for value, total in _histograms(HIGH_DIGITS):
+        high_base[value] = size
+        size += fitting[MAX_CARDS - total]
+
+    strengths = np.zeros(size, dtype=np.int64)
+    for key, strength in RANK_TABLE.items():
+        high, low = divmod(key, LOW_SPAN)
+        strengths[high_base[high] + low_index[low]] = strength
+    return low_index, high_base, strengths
+
+
+LOW_INDEX, HIGH_BASE, RANK_STRENGTHS = _build_rank_index()
+
+
+def evaluate_columns(columns):
+    """
+    evaluate_many() for hands stored one card per row.
+
+    Args:
+        columns: Integer array of shape (5-7, N). A transposed view of an
+            (N, 7) array works, and int32 or smaller codes are fastest.
+
+    Returns:
+        ndarray: int64 strengths, length N.
+    """
+    keys = np.take(CARD_KEYS, columns).sum(axis=0)
+    high, low = np.divmod(keys >> 16, LOW_SPAN)
+    strengths = RANK_STRENGTHS[HIGH_BASE[high] + LOW_INDEX[low]]
+
+    flushes = np.flatnonzero((keys + FLUSH_TEST_ADD) & FLUSH_TEST_MASK)
+    if len(flushes):
+        cards = columns[:, flushes]
+        suits = CARD_SUIT[cards]
+        bits = CARD_BIT[cards]
+        for suit in range(4):
+            masks = np.bitwise_or.reduce(np.where(suits == suit, bits, 0), axis=0)
+            strengths[flushes] = np.maximum(strengths[flushes], FLUSH_STRENGTHS[masks])
+    return strengths
+
+
+def evaluate_many(hands):
+    """
+    Evaluate many hands at once.
+
+    Args:
+        hands: Integer array of shape (N, 5), (N, 6) or (N, 7) of card codes.
+
+    Returns:
+        tuple: (ranks, strengths) int64 arrays of length N. ranks holds the
+        HandRank values and strengths the same integers evaluate() returns.
+    """
+    hands = np.asarray(hands)
+    if hands.dtype.kind not in 'iu':
+        hands = hands.astype(np.int32)
+    strengths = evaluate_columns(hands.T)
+    return strengths >> 20, strengths
+
+
+def parse_hands(lines):
+    """
+    Convert lines of card strings into an array for evaluate_many.
+
+    Args:
+        lines: Iterable of strings such as 'KC KS QH TD 7S 2C 3D'. Only the
+            first 7 cards of each line are used, so testData lines can be
+            passed as they are.
+
+    Returns:
+        ndarray: Shape (N, 7) array of card codes.
+    """
+    return np.array([parse_cards(line.split()[:7]) for line in lines], dtype=np.int64)
+
+
+def numpy_rng(seed):
+    """NumPy generator for a batch seed string from equity.batch_seed."""
+    return np.random.default_rng(int.from_bytes(hashlib.sha256(str(seed).encode()).digest(), 'little'))
+
+
+def run_trials_vectorized(known, trials, seed, max_players):
+    """
+    equity.run_trials(), with every deal of the batch evaluated in one call.
+
+    Returns:
+        EquityResult: Counters for this batch.
+    """
+    rng = numpy_rng(seed)
+    known = list(known)
+    deck = np.array([card for card in DECK if card not in known], dtype=np.int32)
+    missing = 7 - len(known)
+    opponents = max_players - 1
+    needed = missing + 2 * opponents
+
+    # Shuffle the remaining deck once per trial; rows of drawn are the cards dealt
+    drawn = rng.permuted(np.tile(deck, (trials, 1)), axis=1)[:, :needed].T
+    mine = np.concatenate([np.repeat(np.array(known, dtype=np.int32)[:, None], trials, axis=1),
+                           drawn[:missing]])
+    strengths = evaluate_columns(mine)
+    ranks = strengths >> 20
+    categories = len(HandRank)
+    result = EquityResult(max_players)
+    result.trials = trials
+    result.rank_counts = np.bincount(ranks, minlength=categories).tolist()
+    if opponents:
+        # (7, opponents, trials): each opponent's two hole cards above the shared board
+        holes = drawn[missing:].reshape(opponents, 2, trials).transpose(1, 0, 2)
+        board = np.broadcast_to(mine[2:, None, :], (5, opponents, trials))
+        theirs = np.concatenate([holes, board]).reshape(7, opponents * trials)
+        their_strengths = evaluate_columns(theirs).reshape(opponents, trials)
+        best = np.maximum.accumulate(their_strengths, axis=0)
+        won = strengths >= best
+        tied = strengths == best
+        # Number of opponents so far who hold exactly the player's hand
+        tied_with = np.cumsum(their_strengths == strengths, axis=0)
+        shares = np.where(won, POT // (tied_with + 1), 0)
+        result.shares = shares.sum(axis=1).tolist()
+        for column in range(opponents):
+            wins_by_rank = np.bincount(ranks, weights=won[column], minlength=categories)
+            ties_by_rank = np.bincount(ranks, weights=tied[column], minlength=categories)
+            for rank in range(categories):
+                result.wins[rank][column] = int(wins_by_rank[rank])
+                result.ties[rank][column] = int(ties_by_rank[rank])
+    return result
@@ -0,0 +1,369 @@
+"""
+Speed and correctness benchmark for the hand evaluators.
+
+test_poker_hand.py checks that get_best_hand is right on the testData
+files; this module also measures how fast each evaluator is:
+
+* testData: every case, checked against the category its file is named for.
+* A fixed-seed stream of random seven card hands (1,000,000 by default),
+  whose HandRank frequencies are checked against the known counts.
+* Optionally (--exhaustive) all 133,784,560 seven card hands, whose counts
+  must match the known counts exactly.
+
+For each it reports hands/sec per evaluator, and for the random stream the
+time per hand of each HandRank. The memory used by the lookup tables and
+the peak size of the process are printed at the end.
+
+    uv run python bench.py
+    uv run python bench.py --evaluators evaluate7,numpy --exhaustive
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from functools import lru_cache
+from itertools import combinations
+
+try:
+    import numpy as np
+    import batch_eval
+except ImportError:  # pragma: no cover
+    np = None
+
+from hand_rank import HandRank
+from poker_analysis import DECK, FLUSH_TABLE, RANK_TABLE, card_name, evaluate, evaluate7, parse_cards
+from test_harness import get_best_hand
+
+TEST_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testData')
+# Files whose name is not the HandRank their hands should have
+TEST_DATA_RANKS = {'WHEEL_STRAIGHT': HandRank.STRAIGHT, 'TRICKY_FOUR_OF_A_KIND': HandRank.FOUR_OF_A_KIND}
+
+ALL_SEVEN_CARD_HANDS = math.comb(52, 7)
+# Number of the 133,784,560 seven card hands with each HandRank as their best hand
+KNOWN_COUNTS = {
+    HandRank.HIGH_CARD: 23_294_460,
+    HandRank.ONE_PAIR: 58_627_800,
+    HandRank.TWO_PAIR: 31_433_400,
+    HandRank.THREE_OF_A_KIND: 6_461_620,
+    HandRank.STRAIGHT: 6_180_020,
+    HandRank.FLUSH: 4_047_644,
+    HandRank.FULL_HOUSE: 3_473_184,
+    HandRank.FOUR_OF_A_KIND: 224_848,
+    HandRank.STRAIGHT_FLUSH: 37_260,
+    HandRank.ROYAL_FLUSH: 4_324,
+}
+DEFAULT_SEED = 398
+
+
+def read_test_data(directory=TEST_DATA):
+    """
+    Read every testData case.
+
+    Returns:
+        tuple: (hands, expected): lists of seven integer card codes, and the
+        HandRank value each hand should have.
+    """
+    hands, expected = [], []
+    for filename in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(filename)
+        if extension != '.txt':
+            continue
+        rank = TEST_DATA_RANKS.get(name) or HandRank[name]
+        with open(os.path.join(directory, filename)) as f:
+            for line in f:
+                if line.strip():
+                    hands.append(parse_cards(line.split()[:7]))
+                    expected.append(rank.value)
+    return hands, expected
+
+
+def random_hands(count, seed=DEFAULT_SEED):
+    """count random seven card hands; the same seed always gives the same hands."""
+    rng = random.Random(seed)
+    return [rng.sample(DECK, 7) for _ in range(count)]
+
+
+def _categories_get_best_hand(hands):
+    return [get_best_hand(cards)[0].value for cards in hands]
+
+
+def _categories_evaluate(hands):
+    return [evaluate(cards) >> 20 for cards in hands]
+
+
+def _categories_evaluate7(hands):
+    return [evaluate7(*cards) >> 20 for cards in hands]
+
+
+def _categories_numpy(columns):
+    return batch_eval.evaluate_columns(columns) >> 20
+
+
+def _as_names(hands):
+    return [[card_name(card) for card in cards] for cards in hands]
+
+
+def _as_columns(hands):
+    return np.ascontiguousarray(np.array(hands, dtype=np.int32).T)
+
+
+# name: (convert the hands to the evaluator's input, categories of converted hands)
+EVALUATORS = {
+    'get_best_hand': (_as_names, _categories_get_best_hand),
+    'evaluate': (list, _categories_evaluate),
+    'evaluate7': (list, _categories_evaluate7),
+}
+if np is not None:
+    EVALUATORS['numpy'] = (_as_columns, _categories_numpy)
+
+
+def time_evaluator(name, hands, repeat=1):
+    """
+    Time one evaluator, leaving out the time to convert the hands to its input.
+
+    Returns:
+        tuple: (categories, seconds): the HandRank value of every hand and the
+        time for one pass over all of them (the best of repeat passes).
+    """
+    convert, categorize = EVALUATORS[name]
+    prepared = convert(hands)
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        categories = categorize(prepared)
+        best = min(best, time.perf_counter() - start)
+    return [int(category) for category in categories], best
+
+
+def category_counts(categories):
+    """Number of hands with each HandRank value."""
+    counts = [0] * len(HandRank)
+    for category in categories:
+        counts[category] += 1
+    return counts
+
+
+def check_frequencies(counts, exact=False, sigmas=5.0):
+    """
+    Compare HandRank counts with the frequencies over all seven card hands.
+
+    Args:
+        counts: Hands per HandRank value, from a random sample or all hands.
+        exact: If True the counts must equal KNOWN_COUNTS. Otherwise each must
+            be within sigmas standard deviations of its expected value.
+
+    Returns:
+        list: A message for every HandRank that is off; empty if all are fine.
+    """
+    total = sum(counts)
+    problems = []
+    for rank in HandRank:
+        known = KNOWN_COUNTS[rank]
+        count = counts[rank.value]
+        if exact:
+            if count != known:
+                problems.append(f"{rank.name}: {count:,} hands, expected {known:,}")
+            continue
+        p = known / ALL_SEVEN_CARD_HANDS
+        expected = p * total
+        allowed = sigmas * math.sqrt(total * p * (1 - p))
+        if abs(count - expected) > allowed:
+            problems.append(f"{rank.name}: {count:,} hands, expected {expected:,.0f} ± {allowed:,.0f}")
+    return problems
+
+
+def per_category_times(name, hands, categories):
+    """
+    Time an evaluator separately on the hands of each HandRank.
+
+    Returns:
+        dict: HandRank value to nanoseconds per hand, for the ranks present.
+    """
+    groups = {}
+    for cards, category in zip(hands, categories):
+        groups.setdefault(category, []).append(cards)
+    times = {}
+    for category, group in groups.items():
+        _, seconds = time_evaluator(name, group)
+        times[category] = seconds / len(group) * 1e9
+    return times
+
+
+@lru_cache(maxsize=None)
+def _index_combinations(size, count):
+    """All count-element index combinations of range(size), as an array with one per row."""
+    return np.array(list(combinations(range(size), count)), dtype=np.intp).reshape(-1, count)
+
+
+def exhaustive_counts(evaluator='numpy', deck=DECK, progress=None):
+    """
+    Count the HandRanks of every seven card hand that can be made from deck.
+
+    Args:
+        evaluator: 'numpy', or 'evaluate7' for the (much slower) scalar loop.
+        deck: Card codes to deal from; the full deck gives KNOWN_COUNTS.
+        progress: Optional callback called with the fraction done.
+
+    Returns:
+        list: Hands per HandRank value.
+    """
+    deck = sorted(deck)
+    if evaluator != 'numpy':
+        counts = [0] * len(HandRank)
+        ev = evaluate7
+        for hand in combinations(deck, 7):
+            counts[ev(*hand) >> 20] += 1
+        return counts
+
+    # Fix the lowest three cards and evaluate every choice of the other four at once
+    cards = np.array(deck, dtype=np.int32)
+    counts = np.zeros(len(HandRank), dtype=np.int64)
+    for first in range(len(deck) - 6):
+        for second in range(first + 1, len(deck) - 5):
+            for third in range(second + 1, len(deck) - 4):
+                rest = cards[third + 1:]
+                rows = _index_combinations(len(rest), 4)
+                columns = np.empty((7, len(rows)), dtype=np.int32)
+                columns[0], columns[1], columns[2] = cards[first], cards[second], cards[third]
+                columns[3:] = rest[rows].T
+                counts += np.bincount(batch_eval.evaluate_columns(columns) >> 20, minlength=len(HandRank))
+        if progress:
+            progress((first + 1) / (len(deck) - 6))
+    return counts.tolist()
+
+
+def table_memory():
+    """
+    Approximate bytes held by each lookup table.
+
+    The dict and list sizes include their int objects, so they are estimates.
+    """
+    sizes = {
+        'RANK_TABLE': sys.getsizeof(RANK_TABLE)
+        + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in RANK_TABLE.items()),
+        'FLUSH_TABLE': sys.getsizeof(FLUSH_TABLE) + sum(sys.getsizeof(value) for value in set(FLUSH_TABLE)),
+    }
+    if np is not None:
+        sizes['numpy rank index'] = (batch_eval.LOW_INDEX.nbytes + batch_eval.HIGH_BASE.nbytes
+                                     + batch_eval.RANK_STRENGTHS.nbytes)
+        sizes['numpy flush table'] = batch_eval.FLUSH_STRENGTHS.nbytes
+    return sizes
+
+
+def peak_memory():
+    """Peak resident size of this process in bytes, or None where the resource module is missing."""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _megabytes(size):
+    return f"{size / 2 ** 20:,.1f} MB"
+
+
+def report_test_data(names, repeat):
+    hands, expected = read_test_data()
+    print(f"testData: {len(hands)} hands, best of {repeat} passes")
+    ok = True
+    for name in names:
+        categories, seconds = time_evaluator(name, hands, repeat)
+        wrong = sum(1 for got, want in zip(categories, expected) if got != want)
+        ok = ok and not wrong
+        status = "all correct" if not wrong else f"{wrong} WRONG"
+        print(f"  {name:>14} {len(hands) / seconds:>14,.0f} hands/sec  {status}")
+    return ok
+
+
+def report_random(names, count, seed):
+    hands = random_hands(count, seed)
+    print(f"\nRandom stream: {count:,} hands, seed {seed}")
+    ok = True
+    categories_by_name = {}
+    for name in names:
+        categories, seconds = time_evaluator(name, hands)
+        categories_by_name[name] = categories
+        problems = check_frequencies(category_counts(categories))
+        ok = ok and not problems
+        status = "frequencies ok" if not problems else "; ".join(problems)
+        print(f"  {name:>14} {count / seconds:>14,.0f} hands/sec  {status}")
+
+    reference = categories_by_name[names[0]]
+    for name in names[1:]:
+        if categories_by_name[name] != reference:
+            ok = False
+            print(f"  {name} disagrees with {names[0]}")
+
+    counts = category_counts(reference)
+    times = {name: per_category_times(name, hands, reference) for name in names}
+    print("\nns/hand by category")
+    print(f"{'hand':>15} {'hands':>9}" + ''.join(f"{name:>14}" for name in names))
+    for rank in HandRank:
+        line = f"{rank.name:>15} {counts[rank.value]:>9,}"
+        for name in names:
+            ns = times[name].get(rank.value)
+            line += f"{ns:>14,.0f}" if ns is not None else f"{'-':>14}"
+        print(line)
+    return ok
+
+
+def report_exhaustive(evaluator):
+    print(f"\nAll {ALL_SEVEN_CARD_HANDS:,} seven card hands with {evaluator}")
+    start = time.perf_counter()
+
+    def progress(fraction):
+        print(f"\r  {fraction * 100:5.1f}% ({time.perf_counter() - start:.0f}s)", end='', file=sys.stderr)
+
+    counts = exhaustive_counts(evaluator, progress=progress)
+    seconds = time.perf_counter() - start
+    print(file=sys.stderr)
+    problems = check_frequencies(counts, exact=True)
+    for problem in problems:
+        print(f"  {problem}")
+    print(f"  {ALL_SEVEN_CARD_HANDS / seconds:,.0f} hands/sec in {seconds:.1f}s, "
+          f"{'counts match' if not problems else 'COUNTS DIFFER'}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and check the hand evaluators")
+    parser.add_argument('--evaluators', default=','.join(EVALUATORS),
+                        help=f"Comma separated evaluators to run (default: {','.join(EVALUATORS)})")
+    parser.add_argument('--hands', type=int, default=1_000_000,
+                        help='Number of random hands (default: 1,000,000)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help=f'Seed for the random hands (default: {DEFAULT_SEED})')
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='Passes over the testData hands; the fastest is reported (default: 200)')
+    parser.add_argument('--exhaustive', action='store_true',
+                        help='Also evaluate all 133,784,560 seven card hands (numpy if available, '
+                             'otherwise evaluate7, which takes several minutes)')
+    args = parser.parse_args()
+    names = args.evaluators.split(',')
+    for name in names:
+        if name not in EVALUATORS:
+            parser.error(f"unknown evaluator {name}; choose from {', '.join(EVALUATORS)}")
+
+    ok = report_test_data(names, args.repeat)
+    if args.hands:
+        ok = report_random(names, args.hands, args.seed) and ok
+    if args.exhaustive:
+        ok = report_exhaustive('numpy' if 'numpy' in EVALUATORS else 'evaluate7') and ok
+
+    print("\nMemory")
+    for name, size in table_memory().items():
+        print(f"  {name:>17}: {_megabytes(size)}")
+    peak = peak_memory()
+    if peak is not None:
+        print(f"  {'peak process':>17}: {_megabytes(peak)}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
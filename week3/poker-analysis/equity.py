@@ -0,0 +1,603 @@
+"""
+Monte Carlo simulation of how a partial hand finishes.
+
+Given 0-7 known cards, the first two are the player's hole cards and the rest
+are community cards. Each trial deals out the missing cards plus two hole
+cards for each of up to nine opponents, then records
+
+* the HandRank the player ends up with, and
+* for every table size from 2 to max_players, whether the player beats or
+  ties the best of the opponents at that table.
+
+When only a few deals are possible (e.g. 5 or 6 known cards) every one of
+them is enumerated instead, see exact_result() and analyze(). At larger
+tables the HandRank distribution and heads-up column are enumerated and
+only the columns for 3 or more players are sampled.
+
+Trials are split into batches that run in a process pool. Every batch has
+its own RNG seeded from (seed, batch number), so a run is reproducible and
+no two workers share a random stream. Batch results are merged by adding
+up their counters.
+"""
+
+import math
+import os
+import random
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from itertools import combinations
+
+from hand_rank import HandRank
+from poker_analysis import ACE, DECK, evaluate, evaluate7
+
+MAX_PLAYERS = 10
+# A whole pot, in units that split evenly between any 1-10 players
+POT = 2520
+BATCH_SIZE = 20_000
+# Measured seconds per step on one core, for choosing between enumerating
+# and sampling: each deal exact_result() enumerates (a completion, or a board
+# when heads-up), each opponent hand of a heads-up deal, each trial of
+# run_trials(), and each opponent of a trial
+EXACT_DEAL_SECONDS = 5e-6
+EXACT_OPPONENT_SECONDS = 0.8e-6
+TRIAL_SECONDS = 2.5e-6
+TRIAL_OPPONENT_SECONDS = 0.9e-6
+# z value for a 95% confidence interval
+Z_95 = 1.96
+
+
+class EquityResult:
+    """
+    Counters accumulated over a number of trials.
+
+    rank_counts[r] is the number of trials where the player finished with the
+    HandRank whose value is r. wins[r][i] is the number of those trials where
+    the player won or split at a table of i + 2 players, and ties[r][i] the
+    number of those that were splits. shares[i] is the player's total share
+    of the pot at a table of i + 2 players, in units of POT per trial, so a
+    three way split counts POT // 3. exact is True when the counters come
+    from enumerating every deal rather than sampling.
+
+    enumerated is None, or an exact result for 1 or 2 players of the same
+    hand, whose HandRank distribution (and heads-up column) the rank_*,
+    table_* and format_* functions use in place of the sampled counters.
+    """
+
+    def __init__(self, max_players=MAX_PLAYERS):
+        self.max_players = max_players
+        self.trials = 0
+        self.exact = False
+        self.rank_counts = [0] * len(HandRank)
+        self.wins = [[0] * (max_players - 1) for _ in HandRank]
+        self.ties = [[0] * (max_players - 1) for _ in HandRank]
+        self.shares = [0] * (max_players - 1)
+        self.enumerated = None
+
+    def merge(self, other):
+        """Add the counters from another result into this one."""
+        if self.enumerated is None:
+            self.enumerated = other.enumerated
+        self.trials += other.trials
+        for r in range(len(HandRank)):
+            self.rank_counts[r] += other.rank_counts[r]
+            for mine, theirs in ((self.wins[r], other.wins[r]), (self.ties[r], other.ties[r])):
+                for i, count in enumerate(theirs):
+                    mine[i] += count
+        for i, share in enumerate(other.shares):
+            self.shares[i] += share
+        return self
+
+    def total_wins(self):
+        """Number of trials won or split at each table size, over all HandRanks."""
+        return [sum(column) for column in zip(*self.wins)]
+
+    def total_ties(self):
+        """Number of trials split at each table size, over all HandRanks."""
+        return [sum(column) for column in zip(*self.ties)]
+
+    def exact_columns(self):
+        """Number of table sizes, from 2 players up, whose results are exact."""
+        if self.exact:
+            return self.max_players - 1
+        return self.enumerated.max_players - 1 if self.enumerated is not None else 0
+
+    def column_source(self, i):
+        """The result holding the counters for a table of i + 2 players."""
+        if not self.exact and i < self.exact_columns():
+            return self.enumerated
+        return self
+
+    def rank_source(self):
+        """The result holding the HandRank distribution."""
+        return self.enumerated if self.enumerated is not None else self
+
+    def equity(self):
+        """The player's expected share of the pot at each table size, from 0 to 1."""
+        equities = []
+        for i in range(self.max_players - 1):
+            source = self.column_source(i)
+            equities.append(source.shares[i] / (POT * source.trials) if source.trials else 0.0)
+        return equities
+
+    def table_rates(self):
+        """Fraction of trials won outright and fraction split at each table size, as two lists."""
+        won, split = [], []
+        for i in range(self.max_players - 1):
+            source = self.column_source(i)
+            wins = sum(row[i] for row in source.wins)
+            ties = sum(row[i] for row in source.ties)
+            won.append((wins - ties) / source.trials if source.trials else 0.0)
+            split.append(ties / source.trials if source.trials else 0.0)
+        return won, split
+
+    def table_ci(self):
+        """
+        95% confidence half-width of the equity at each table size, from 0 to 1.
+
+        A pot share is between 0 and 1, so its variance is at most
+        e * (1 - e) for mean e, which makes this a conservative bound.
+        """
+        if self.exact:
+            return [0.0] * len(self.shares)
+        if self.trials == 0:
+            return [math.inf] * len(self.shares)
+        exact = self.exact_columns()
+        return [0.0 if i < exact else Z_95 * math.sqrt(e * (1 - e) / self.trials)
+                for i, e in enumerate(self.equity())]
+
+    def ci_half_width(self):
+        """
+        Largest 95% confidence half-width, in percent, of the HandRank
+        frequencies and overall win rates that were sampled.
+        """
+        if self.exact:
+            return 0.0
+        if self.trials == 0:
+            return math.inf
+        counts = self.total_wins()[self.exact_columns():]
+        if self.enumerated is None:
+            counts = self.rank_counts + counts
+        widest = 0.0
+        for count in counts:
+            p = count / self.trials
+            widest = max(widest, Z_95 * math.sqrt(p * (1 - p) / self.trials))
+        return widest * 100
+
+
+def batch_seed(seed, batch):
+    """Seed for one batch, derived from the run seed so every batch has its own stream."""
+    return f"{seed}:{batch}"
+
+
+def run_trials(known, trials, seed, max_players=MAX_PLAYERS):
+    """
+    Run a batch of trials in this process.
+
+    Args:
+        known: List of 0-7 integer card codes. The first two are the hole cards.
+        trials: Number of trials to run.
+        seed: Seed for this batch's random.Random.
+        max_players: Largest table size to track (1 means no opponents).
+
+    Returns:
+        EquityResult: Counters for this batch.
+    """
+    rng = random.Random(seed)
+    sample = rng.sample
+    ev = evaluate7
+    known = list(known)
+    deck = [card for card in DECK if card not in known]
+    missing = 7 - len(known)
+    opponents = max_players - 1
+    needed = missing + 2 * opponents
+
+    result = EquityResult(max_players)
+    rank_counts = result.rank_counts
+    wins = result.wins
+    ties = result.ties
+    shares = result.shares
+    for _ in range(trials):
+        drawn = sample(deck, needed)
+        h0, h1, b0, b1, b2, b3, b4 = known + drawn[:missing]
+        mine = ev(h0, h1, b0, b1, b2, b3, b4)
+        rank = mine >> 20
+        rank_counts[rank] += 1
+        row = wins[rank]
+        best = 0
+        tied = 0
+        for i in range(opponents):
+            j = missing + 2 * i
+            theirs = ev(drawn[j], drawn[j + 1], b0, b1, b2, b3, b4)
+            if theirs > best:
+                best = theirs
+                if best > mine:
+                    break
+            row[i] += 1
+            if theirs == mine:
+                tied += 1
+            if tied:
+                ties[rank][i] += 1
+                shares[i] += POT // (tied + 1)
+            else:
+                shares[i] += POT
+    result.trials = trials
+    return result
+
+
+def simulate(known, trials, max_players=MAX_PLAYERS, seed=None, workers=None,
+             time_budget=None, target_ci=None, progress=None, vectorized=False):
+    """
+    Run trials in a process pool until the trial count, time budget or
+    confidence target is reached, whichever comes first.
+
+    Args:
+        known: List of 0-7 integer card codes.
+        trials: Maximum number of trials.
+        max_players: Largest table size to track.
+        seed: Run seed; a random one is chosen if None.
+        workers: Number of worker processes (default: CPU count). With 1 the
+            trials run in this process.
+        time_budget: Stop submitting batches after this many seconds.
+        target_ci: Stop once EquityResult.ci_half_width() is at or below this
+            many percentage points.
+        progress: Optional callback called with the merged result after each batch.
+        vectorized: Evaluate each batch with NumPy (batch_eval.run_trials_vectorized).
+
+    Returns:
+        EquityResult: The merged counters of all completed batches.
+    """
+    if vectorized:
+        from batch_eval import run_trials_vectorized as run_batch
+    else:
+        run_batch = run_trials
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    workers = workers or os.cpu_count() or 1
+    batch_sizes = [BATCH_SIZE] * (trials // BATCH_SIZE)
+    if trials % BATCH_SIZE:
+        batch_sizes.append(trials % BATCH_SIZE)
+    deadline = time.monotonic() + time_budget if time_budget else None
+    result = EquityResult(max_players)
+
+    def done():
+        if deadline is not None and time.monotonic() >= deadline:
+            return True
+        return target_ci is not None and result.ci_half_width() <= target_ci
+
+    if workers == 1:
+        for batch, size in enumerate(batch_sizes):
+            result.merge(run_batch(known, size, batch_seed(seed, batch), max_players))
+            if progress:
+                progress(result)
+            if done():
+                break
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batches = iter(enumerate(batch_sizes))
+        pending = set()
+
+        def submit(count):
+            for _ in range(count):
+                batch = next(batches, None)
+                if batch is None:
+                    return
+                number, size = batch
+                pending.add(pool.submit(run_batch, known, size, batch_seed(seed, number), max_players))
+
+        submit(2 * workers)
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result.merge(future.result())
+            if progress:
+                progress(result)
+            if done():
+                for future in pending:
+                    future.cancel()
+                break
+            submit(len(finished))
+    return result
+
+
+ALL_RANKS = (1 << (ACE + 1)) - 1
+MASK_RANKS = [[rank for rank in range(ACE + 1) if mask >> rank & 1] for mask in range(ALL_RANKS + 1)]
+
+
+def suit_masks(cards):
+    """Return, for each suit, the bitmask of the ranks of cards in that suit."""
+    masks = [0] * 4
+    for card in cards:
+        masks[card & 3] |= 1 << (card >> 2)
+    return masks
+
+
+@lru_cache(maxsize=None)
+def masks_of_size(available, size):
+    """All rank masks with size bits chosen from available, largest first."""
+    ranks = MASK_RANKS[available]
+    masks = [sum(1 << rank for rank in combo) for combo in combinations(ranks, size)]
+    return sorted(masks, reverse=True)
+
+
+def suit_classes(groups):
+    """
+    Key each suit by the ranks every group of known cards has in it.
+
+    Two suits with the same key can be swapped without changing anything
+    about the known cards, so deals that only differ by such a swap are
+    equivalent.
+    """
+    masks = [suit_masks(group) for group in groups]
+    return [tuple(group_masks[suit] for group_masks in masks) for suit in range(4)]
+
+
+def completions(groups, count):
+    """
+    Deal count more cards, up to suit isomorphism.
+
+    Only one deal per set of equivalent deals is produced: within each set
+    of interchangeable suits (see suit_classes), the dealt rank masks must
+    be in non-increasing order.
+
+    Args:
+        groups: Lists of known cards. Suits are only interchangeable if they
+            look the same in every group, so e.g. hole cards and board cards
+            are passed as separate groups.
+        count: Number of cards to deal.
+
+    Yields:
+        tuple: (cards, weight) where weight is the number of actual deals
+        that are equivalent to cards.
+    """
+    keys = suit_classes(groups)
+    used = suit_masks([card for group in groups for card in group])
+    order = sorted(range(4), key=lambda suit: keys[suit])
+    dealt = [0] * 4
+
+    orbit = symmetry(groups)
+
+    def weight():
+        # Equal keys are adjacent in order, and so are equal masks within them
+        total = orbit
+        run = 1
+        for previous, suit in zip(order, order[1:]):
+            if keys[previous] == keys[suit] and dealt[previous] == dealt[suit]:
+                run += 1
+                total //= run
+            else:
+                run = 1
+        return total
+
+    def deal(position, remaining):
+        if position == 4:
+            if remaining == 0:
+                cards = [rank * 4 + suit for suit in range(4) for rank in MASK_RANKS[dealt[suit]]]
+                yield cards, weight()
+            return
+        suit = order[position]
+        previous = order[position - 1] if position else None
+        limit = dealt[previous] if previous is not None and keys[previous] == keys[suit] else ALL_RANKS
+        available = ALL_RANKS & ~used[suit]
+        sizes = [remaining] if position == 3 else range(min(remaining, len(MASK_RANKS[available])) + 1)
+        for size in sizes:
+            for mask in masks_of_size(available, size):
+                if mask <= limit:
+                    dealt[suit] = mask
+                    yield from deal(position + 1, remaining - size)
+        dealt[suit] = 0
+
+    yield from deal(0, count)
+
+
+def symmetry(groups):
+    """Number of suit permutations that leave every group of known cards unchanged."""
+    total = 1
+    for size in Counter(suit_classes(groups)).values():
+        total *= math.factorial(size)
+    return total
+
+
+def canonical_key(known):
+    """
+    A key that is the same for hands that only differ by a relabeling of
+    the suits or by the order of the hole cards or of the board cards, and
+    so have the same results.
+    """
+    return tuple(sorted(suit_classes([known[:2], known[2:]])))
+
+
+def exact_seconds(known, max_players):
+    """
+    Estimate how long exact_result() takes on one core.
+
+    Returns:
+        float: The estimate, or math.inf for tables larger than heads-up,
+        which cannot be enumerated.
+    """
+    if max_players > 2:
+        return math.inf
+    unknown = 52 - len(known)
+    if max_players == 1:
+        return math.comb(unknown, 7 - len(known)) / symmetry([known]) * EXACT_DEAL_SECONDS
+    hole, board = known[:2], known[2:]
+    hole_missing = 2 - len(hole)
+    board_missing = 5 - len(board)
+    deals = math.comb(unknown, hole_missing) * math.comb(unknown - hole_missing, board_missing)
+    opponents = math.comb(unknown - hole_missing - board_missing, 2)
+    return deals / symmetry([hole, board]) * (EXACT_DEAL_SECONDS + opponents * EXACT_OPPONENT_SECONDS)
+
+
+def sampling_seconds(trials, max_players):
+    """
+    Estimate how long simulate() takes on one core for this many trials.
+
+    Workers are left out: for queries small enough to enumerate, starting the
+    process pool costs about as much as the workers save.
+    """
+    return trials * (TRIAL_SECONDS + (max_players - 1) * TRIAL_OPPONENT_SECONDS)
+
+
+def exact_result(known, max_players=1):
+    """
+    Enumerate every way the hand can finish.
+
+    With max_players 1 only the HandRank distribution is computed. With 2,
+    every opponent hand is enumerated too, giving exact heads-up win and
+    split counts. Larger tables are not supported.
+
+    Args:
+        known: List of 0-7 integer card codes. The first two are the hole cards.
+        max_players: 1 or 2.
+
+    Returns:
+        EquityResult: Counters where every possible deal counts once.
+    """
+    if max_players > 2:
+        raise ValueError("exact results are only available for up to 2 players")
+    known = list(known)
+    result = EquityResult(max_players)
+    result.exact = True
+    rank_counts = result.rank_counts
+    if max_players == 1:
+        for cards, weight in completions([known], 7 - len(known)):
+            rank_counts[evaluate(known + cards) >> 20] += weight
+        result.trials = sum(rank_counts)
+        return result
+
+    hole_known, board_known = known[:2], known[2:]
+    for hole_cards, hole_weight in completions([hole_known, board_known], 2 - len(hole_known)):
+        hole = hole_known + hole_cards
+        for board_cards, board_weight in completions([hole, board_known], 5 - len(board_known)):
+            board = board_known + board_cards
+            h0, h1 = hole
+            b0, b1, b2, b3, b4 = board
+            mine = evaluate7(h0, h1, b0, b1, b2, b3, b4)
+            taken = set(hole + board)
+            rest = [card for card in DECK if card not in taken]
+            won = tied = hands = 0
+            for o0, o1 in combinations(rest, 2):
+                theirs = evaluate7(o0, o1, b0, b1, b2, b3, b4)
+                hands += 1
+                if theirs <= mine:
+                    won += 1
+                    if theirs == mine:
+                        tied += 1
+            weight = hole_weight * board_weight
+            rank = mine >> 20
+            rank_counts[rank] += weight * hands
+            result.wins[rank][0] += weight * won
+            result.ties[rank][0] += weight * tied
+            result.shares[0] += weight * ((won - tied) * POT + tied * (POT // 2))
+    result.trials = sum(rank_counts)
+    return result
+
+
+def analyze(known, trials, max_players=MAX_PLAYERS, method='auto', **options):
+    """
+    Compute the outcome table for a partial hand, exactly or by sampling.
+
+    With method 'auto', the hand is enumerated when that is expected to take
+    no longer than sampling the requested number of trials (see
+    exact_seconds() and sampling_seconds()), and sampled otherwise. Tables
+    of more than 2 players are always sampled, but when enumerating the hand
+    heads-up (or else its HandRank distribution alone) is no slower than the
+    sampling, that is done too and kept in the result's enumerated, so the
+    distribution and heads-up column are exact at the full table width.
+
+    Args:
+        known: List of 0-7 integer card codes.
+        trials: Number of trials if sampling.
+        max_players: Largest table size to track.
+        method: 'auto', 'exact' or 'sample'.
+        options: Passed on to simulate().
+
+    Returns:
+        EquityResult: The result; its exact attribute says which method was used.
+    """
+    budget = sampling_seconds(trials, max_players)
+    if method == 'exact' or (method == 'auto' and exact_seconds(known, max_players) <= budget):
+        return exact_result(known, max_players)
+    result = simulate(known, trials, max_players, **options)
+    if method == 'auto':
+        for players in (2, 1):
+            if players < max_players and exact_seconds(known, players) <= budget:
+                result.enumerated = exact_result(known, players)
+                break
+    return result
+
+
+class ResultCache:
+    """
+    Least recently used cache of results, keyed by canonical_key() and table size.
+
+    A sampled result can be extended by merging more trials into it, so a
+    repeated query builds on the trials of earlier ones.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def get(self, known, max_players):
+        """Return the cached result for an equivalent hand, or None."""
+        key = (canonical_key(known), max_players)
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, known, result):
+        """Store result for known, evicting the least recently used entry if full."""
+        key = (canonical_key(known), result.max_players)
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def format_showdown(result):
+    """
+    Format the per-table-size results: how often the player wins outright,
+    splits, their pot equity and its 95% confidence interval.
+    """
+    lines = [f"{'players':>7} {'win':>6} {'split':>6} {'equity':>7} {'±95%':>6}"]
+    won, split = result.table_rates()
+    for i, (equity, ci) in enumerate(zip(result.equity(), result.table_ci())):
+        lines.append(f"{i + 2:>7} {won[i] * 100:6.1f} {split[i] * 100:6.1f} {equity * 100:7.2f} {ci * 100:6.2f}")
+    return '\n'.join(lines)
+
+
+def format_table(result):
+    """
+    Format a result the way the README shows it: one row per HandRank with
+    its frequency, and for each table size the percent of those trials won
+    or split. With an enumerated result, the frequencies and counts are its
+    deals, and each win column comes from whichever result holds it.
+    """
+    columns = range(2, result.max_players + 1)
+    header = f"{'hand':>15}  percent  trials" + ''.join(f"{players:>7}" for players in columns)
+    lines = [header]
+    ranks = result.rank_source()
+    sources = [result.column_source(i) for i in range(result.max_players - 1)]
+
+    def row(name, count, rank=None):
+        percent = count / ranks.trials * 100 if ranks.trials else 0.0
+        line = f"{name:>15}: {percent:6.1f}% {count:7d}"
+        for i, source in enumerate(sources):
+            if rank is None:
+                total, won = source.trials, sum(wins[i] for wins in source.wins)
+            else:
+                total, won = source.rank_counts[rank], source.wins[rank][i]
+            line += f"{won / total * 100 if total else 0.0:7.1f}"
+        return line
+
+    lines.append(row('All', ranks.trials))
+    for rank in HandRank:
+        lines.append(row(rank.name, ranks.rank_counts[rank.value], rank.value))
+    return '\n'.join(lines)
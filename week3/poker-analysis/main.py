@@ -1,5 +1,176 @@
+import argparse
+import sys
+import time
+
+from equity import MAX_PLAYERS, EquityResult, ResultCache, analyze, format_showdown, format_table
+from poker_analysis import parse_cards
+from preflop import load_table
+
+
+def read_cards(text):
+    """
+    Parse the cards typed by the user.
+
+    Returns:
+        list: Integer card codes, or None (after printing why) if the input is not usable.
+    """
+    try:
+        cards = parse_cards(text)
+    except (KeyError, IndexError):
+        print("Cards are a rank (A23456789TJQK) followed by a suit (SHDC), e.g. 'AS 9H'")
+        return None
+    if len(cards) > 7:
+        print("Enter at most 7 cards")
+        return None
+    if len(set(cards)) != len(cards):
+        print("The same card was entered twice")
+        return None
+    return cards
+
+
+class LiveStatus:
+    """
+    Progress callback for simulate() that keeps one status line on stderr
+    up to date, counting the trials of an earlier cached result too.
+    """
+
+    def __init__(self, earlier=None):
+        self.earlier = earlier
+        self.width = 0
+
+    def __call__(self, result):
+        if self.earlier is not None:
+            result = EquityResult(result.max_players).merge(self.earlier).merge(result)
+        line = f"{result.trials:,} trials, ±{result.ci_half_width():.2f}%"
+        if result.max_players > 1:
+            line += f", heads up equity {result.equity()[0] * 100:.1f}%"
+        print('\r' + line.ljust(self.width), end='', file=sys.stderr, flush=True)
+        self.width = len(line)
+
+    def clear(self):
+        if self.width:
+            print('\r' + ' ' * self.width + '\r', end='', file=sys.stderr, flush=True)
+
+
+def report(cards, args, preflop=None, cache=None):
+    """
+    Print the outcome table for cards.
+
+    Two hole cards are answered from the preflop table when one is given,
+    unless --sample asks for a simulation. With a cache, an exact result for
+    an equivalent hand is reused as is, and a sampled one gets args.trials
+    more trials merged into it.
+    """
+    start = time.perf_counter()
+    if args.exact and args.players > 2:
+        print("Exact results are only available with --players 1 or 2")
+        return
+    result = None
+    if preflop is not None and not args.sample:
+        result = preflop.lookup(cards, args.players)
+    from_table = result is not None
+    earlier = cache.get(cards, args.players) if cache is not None and not from_table else None
+    reused = 0
+    if earlier is not None and earlier.exact and not args.sample:
+        result = earlier
+    elif not from_table:
+        method = 'exact' if args.exact else 'sample' if args.sample else 'auto'
+        seed = args.seed
+        if earlier is not None and seed is not None:
+            # The same seed would repeat the trials already in the cache
+            seed = f"{seed}+{earlier.trials}"
+        status = LiveStatus(earlier) if args.live else None
+        result = analyze(cards, args.trials, max_players=args.players, method=method, seed=seed,
+                         workers=args.workers, time_budget=args.time, target_ci=args.ci,
+                         vectorized=args.vectorized, progress=status)
+        if status:
+            status.clear()
+        if earlier is not None and not earlier.exact and not result.exact:
+            reused = earlier.trials
+            result = EquityResult(args.players).merge(earlier).merge(result)
+        if cache is not None:
+            cache.put(cards, result)
+    elapsed = time.perf_counter() - start
+    print(format_table(result))
+    if args.showdown and args.players > 1:
+        print()
+        print(format_showdown(result))
+    if from_table:
+        print(f"Preflop table: {result.trials:,} trials (±{result.ci_half_width():.2f}%) from {preflop.path}")
+    elif result is earlier:
+        print(f"Exact: all {result.trials:,} deals enumerated (cached)")
+    elif result.exact:
+        print(f"Exact: all {result.trials:,} deals enumerated in {elapsed:.1f}s")
+    else:
+        new = result.trials - reused
+        line = f"{new:,} trials in {elapsed:.1f}s ({new / elapsed:,.0f} trials/sec, ±{result.ci_half_width():.2f}%)"
+        if reused:
+            line += f", {result.trials:,} in total with {reused:,} from earlier queries"
+        print(line)
+        if result.enumerated is not None:
+            exact = "hand frequencies and heads-up results" if result.exact_columns() else "hand frequencies"
+            print(f"Exact {exact}: all {result.enumerated.trials:,} deals enumerated")
+
+
 def main():
-    print("Your code for poker analysis main method here")
+    parser = argparse.ArgumentParser(description="Chance of finishing with each poker hand, and of winning")
+    parser.add_argument('-t', '--trials', type=int, default=100_000,
+                        help='Maximum number of trials per query (default: 100,000)')
+    parser.add_argument('-p', '--players', type=int, default=MAX_PLAYERS,
+                        help=f'Largest table size to report wins for, 1 for none (default: {MAX_PLAYERS})')
+    parser.add_argument('--time', type=float,
+                        help='Stop each query after this many seconds')
+    parser.add_argument('--ci', type=float,
+                        help='Stop once every percentage is within this many points (95%% confidence)')
+    parser.add_argument('--workers', type=int,
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible results')
+    parser.add_argument('--showdown', action='store_true',
+                        help='Also show win, split and pot equity with confidence intervals per table size')
+    parser.add_argument('--vectorized', action='store_true',
+                        help='Evaluate each batch of trials at once with NumPy')
+    method = parser.add_mutually_exclusive_group()
+    method.add_argument('--exact', action='store_true',
+                        help='Always enumerate every deal (only for --players 1 or 2; by default larger '
+                             'tables enumerate the hand frequencies and heads-up column when that is cheap)')
+    method.add_argument('--sample', action='store_true',
+                        help='Always sample, even when enumerating would be cheaper '
+                             'or the preflop table has the answer')
+    parser.add_argument('--cache-size', type=int, default=128,
+                        help='Number of results the prompt keeps for repeated queries (default: 128)')
+    parser.add_argument('--no-live', dest='live', action='store_false',
+                        help='Do not show the running trial count while a query is sampled')
+    parser.add_argument('--table', default=None,
+                        help='Preflop table written by preflop.py (default: preflop_table.json.gz if present)')
+    parser.add_argument('cards', nargs='*', help="Cards to analyze; if omitted, prompt for them")
+    args = parser.parse_args()
+    args.live = args.live and sys.stderr.isatty()
+    if not 1 <= args.players <= MAX_PLAYERS:
+        parser.error(f"--players must be between 1 and {MAX_PLAYERS}")
+    preflop = load_table(args.table) if args.table else load_table()
+    if args.table and preflop is None:
+        parser.error(f"{args.table} is not a preflop table written by preflop.py")
+
+    if args.cards:
+        cards = read_cards(' '.join(args.cards))
+        if cards is not None:
+            report(cards, args, preflop)
+        return
+
+    # Equivalent hands (e.g. 'AS 9H' and 'AH 9S') share an entry, and asking again adds trials
+    cache = ResultCache(args.cache_size)
+    print("Enter cards (e.g. 'AS 9H'), or 'stop' to quit.")
+    while True:
+        try:
+            text = input("> ").strip()
+        except EOFError:
+            break
+        if text.lower() == 'stop':
+            break
+        cards = read_cards(text)
+        if cards is not None:
+            report(cards, args, preflop, cache)
+
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,282 @@
 """
-  Put your code for analyzing poker hands in here. 
-  
-  Rewrite get_best_hand in test_harness.py to call the 
-  appropriate methods in your code.
+Poker hand evaluation using small-integer cards and lookup tables.
+
+Cards are encoded as integers 0-51: card = rank * 4 + suit, where rank is
+0-12 for 2 through A and suit is the index into SUITS. Strings like 'KC' are
+only converted at the edges (parse_card / card_name).
+
+evaluate() classifies 5 to 7 cards at once, without looking at any five card
+subsets, and returns a single strength integer. A larger strength is always
+a better hand:
+
+    strength = category << 20 | r1 << 16 | r2 << 12 | r3 << 8 | r4 << 4 | r5
+
+category is the HandRank value, and r1..r5 are the ranks of the five cards
+that make the hand, in the order used to break ties (e.g. QQ33A for two
+pair, 5432A for the wheel straight).
+
+How evaluate() finds the hand:
+
+* Every card has a precomputed CARD_KEY. The rank part is 5 ** rank, so the
+  sum over the hand is the rank-count histogram written in base 5. The suit
+  part is one 4 bit counter per suit.
+* If no suit counter reaches 5, the hand only depends on the rank histogram,
+  and RANK_TABLE maps every possible histogram straight to its strength.
+* Otherwise the ranks in the flush suit are ORed into a 13 bit mask, and
+  FLUSH_TABLE maps that mask to a straight flush or flush strength.
 """
-  
\ No newline at end of file
+
+from hand_rank import HandRank
+
+RANKS = '23456789TJQKA'
+SUITS = 'SHDC'
+ACE = 12
+
+CARD_INDEX = {rank + suit: r * 4 + s for r, rank in enumerate(RANKS) for s, suit in enumerate(SUITS)}
+CARD_NAMES = [rank + suit for rank in RANKS for suit in SUITS]
+DECK = list(range(52))
+
+# Per card: rank histogram digit in the high bits, suit counter in the low 16 bits
+CARD_KEY = [(5 ** (card >> 2)) << 16 | 1 << 4 * (card & 3) for card in DECK]
+CARD_RANK_BIT = [1 << (card >> 2) for card in DECK]
+# Adding 3 to each 4 bit suit counter sets its top bit exactly when the count is 5 or more
+FLUSH_TEST_ADD = 0x3333
+FLUSH_TEST_MASK = 0x8888
+
+WHEEL_MASK = 1 << ACE | 0b1111
+
+
+def parse_card(text):
+    """Convert a card string such as 'KC' to its integer code."""
+    return CARD_INDEX[text.upper()]
+
+
+def parse_cards(cards):
+    """
+    Convert card strings to integer codes.
+
+    Args:
+        cards: Either a list of card strings or a single whitespace separated string.
+
+    Returns:
+        list: Integer card codes, in the same order.
+    """
+    if isinstance(cards, str):
+        cards = cards.split()
+    return [parse_card(card) for card in cards]
+
+
+def card_name(card):
+    """Convert an integer card code back to a string such as 'KC'."""
+    return CARD_NAMES[card]
+
+
+def card_rank(card):
+    return card >> 2
+
+
+def card_suit(card):
+    return card & 3
+
+
+def make_strength(category, ranks):
+    """Pack a HandRank and five tie-break ranks into a strength integer."""
+    strength = category.value
+    for rank in ranks:
+        strength = strength << 4 | rank
+    return strength
+
+
+def hand_rank(strength):
+    """Return the HandRank of a strength produced by evaluate()."""
+    return HandRank(strength >> 20)
+
+
+def strength_ranks(strength):
+    """Return the five ranks, most significant first, packed into a strength."""
+    return [(strength >> shift) & 0xF for shift in (16, 12, 8, 4, 0)]
+
+
+def straight_ranks(mask):
+    """
+    Find the best straight in a 13 bit rank mask.
+
+    Returns:
+        list: The five ranks of the straight from high to low (the wheel is
+        5432A), or None if the mask contains no straight.
+    """
+    for high in range(ACE, 3, -1):
+        window = 0b11111 << (high - 4)
+        if mask & window == window:
+            return list(range(high, high - 5, -1))
+    if mask & WHEEL_MASK == WHEEL_MASK:
+        return [3, 2, 1, 0, ACE]
+    return None
+
+
+def top_ranks(mask, count):
+    """Return the highest count ranks set in a rank mask, high to low."""
+    ranks = []
+    rank = ACE
+    while len(ranks) < count and rank >= 0:
+        if mask >> rank & 1:
+            ranks.append(rank)
+        rank -= 1
+    return ranks
+
+
+def flush_strength(mask):
+    """Strength of the best hand that uses only cards of one suit with the given rank mask."""
+    straight = straight_ranks(mask)
+    if straight:
+        category = HandRank.ROYAL_FLUSH if straight[0] == ACE else HandRank.STRAIGHT_FLUSH
+        return make_strength(category, straight)
+    return make_strength(HandRank.FLUSH, top_ranks(mask, 5))
+
+
+def histogram_strength(counts):
+    """
+    Strength of the best non-flush hand for a rank histogram.
+
+    Args:
+        counts: List of 13 counts, indexed by rank.
+    """
+    by_count = [[], [], [], [], []]
+    mask = 0
+    for rank in range(ACE, -1, -1):
+        count = counts[rank]
+        by_count[count].append(rank)
+        if count:
+            mask |= 1 << rank
+    singles, pairs, trips, quads = by_count[1], by_count[2], by_count[3], by_count[4]
+
+    def kickers(used, count):
+        return [rank for rank in range(ACE, -1, -1) if counts[rank] and rank not in used][:count]
+
+    if quads:
+        quad = quads[0]
+        return make_strength(HandRank.FOUR_OF_A_KIND, [quad] * 4 + kickers([quad], 1))
+    if trips and (len(trips) > 1 or pairs):
+        trip = trips[0]
+        pair = max(trips[1:] + pairs)
+        return make_strength(HandRank.FULL_HOUSE, [trip] * 3 + [pair] * 2)
+    straight = straight_ranks(mask)
+    if straight:
+        return make_strength(HandRank.STRAIGHT, straight)
+    if trips:
+        trip = trips[0]
+        return make_strength(HandRank.THREE_OF_A_KIND, [trip] * 3 + kickers([trip], 2))
+    if len(pairs) > 1:
+        high, low = pairs[0], pairs[1]
+        return make_strength(HandRank.TWO_PAIR, [high, high, low, low] + kickers([high, low], 1))
+    if pairs:
+        pair = pairs[0]
+        return make_strength(HandRank.ONE_PAIR, [pair, pair] + kickers([pair], 3))
+    return make_strength(HandRank.HIGH_CARD, singles[:5])
+
+
+def _build_rank_table():
+    """Map the base 5 rank histogram key of every 5, 6 and 7 card rank multiset to its strength."""
+    table = {}
+    counts = [0] * 13
+
+    def fill(rank, remaining, key):
+        if rank < 0:
+            if remaining <= 2:
+                table[key] = histogram_strength(counts)
+            return
+        for count in range(min(4, remaining) + 1):
+            counts[rank] = count
+            fill(rank - 1, remaining - count, key + count * 5 ** rank)
+        counts[rank] = 0
+
+    fill(ACE, 7, 0)
+    return table
+
+
+RANK_TABLE = _build_rank_table()
+FLUSH_TABLE = [flush_strength(mask) if bin(mask).count('1') >= 5 else 0 for mask in range(1 << 13)]
+
+
+def evaluate(cards):
+    """
+    Evaluate 5 to 7 cards.
+
+    Args:
+        cards: List of integer card codes (see parse_card).
+
+    Returns:
+        int: Strength of the best five card hand. Use hand_rank() to get the
+        HandRank and compare strengths directly to compare hands.
+    """
+    key = 0
+    for card in cards:
+        key += CARD_KEY[card]
+    flush = (key + FLUSH_TEST_ADD) & FLUSH_TEST_MASK
+    if not flush:
+        return RANK_TABLE[key >> 16]
+    suit = flush.bit_length() // 4 - 1
+    mask = 0
+    for card in cards:
+        if card & 3 == suit:
+            mask |= CARD_RANK_BIT[card]
+    return FLUSH_TABLE[mask]
+
+
+def evaluate7(a, b, c, d, e, f, g):
+    """evaluate() for exactly seven cards passed as separate arguments, for use in tight loops."""
+    key = (CARD_KEY[a] + CARD_KEY[b] + CARD_KEY[c] + CARD_KEY[d]
+           + CARD_KEY[e] + CARD_KEY[f] + CARD_KEY[g])
+    flush = (key + FLUSH_TEST_ADD) & FLUSH_TEST_MASK
+    if not flush:
+        return RANK_TABLE[key >> 16]
+    return evaluate((a, b, c, d, e, f, g))
+
+
+def best_five(cards, strength=None):
+    """
+    Pick the five cards that make up the hand described by strength.
+
+    Args:
+        cards: List of integer card codes.
+        strength: The result of evaluate(cards), if already known.
+
+    Returns:
+        list: Five integer card codes, most significant first. When several
+        cards of the same rank could be used, the earliest one in cards wins.
+    """
+    if strength is None:
+        strength = evaluate(cards)
+    suited = hand_rank(strength) in (HandRank.FLUSH, HandRank.STRAIGHT_FLUSH, HandRank.ROYAL_FLUSH)
+    if suited:
+        suit_counts = [0] * 4
+        for card in cards:
+            suit_counts[card & 3] += 1
+        suit = suit_counts.index(max(suit_counts))
+        candidates = [card for card in cards if card & 3 == suit]
+    else:
+        candidates = list(cards)
+    chosen = []
+    for rank in strength_ranks(strength):
+        for i, card in enumerate(candidates):
+            if card >> 2 == rank:
+                chosen.append(card)
+                del candidates[i]
+                break
+    return chosen
+
+
+def best_hand(cards):
+    """
+    Find the best poker hand in a list of card strings.
+
+    Args:
+        cards: List of 5 to 7 card strings, e.g. ['KC', 'KS', 'QH', 'TD', '7S', '2C', '3D']
+
+    Returns:
+        tuple: (HandRank, list of 5 card strings) with the cards listed from
+        most significant to least significant.
+    """
+    codes = parse_cards(cards)
+    strength = evaluate(codes)
+    return hand_rank(strength), [card_name(card) for card in best_five(codes, strength)]
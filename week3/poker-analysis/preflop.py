@@ -0,0 +1,218 @@
+"""
+Precomputed results for every starting hand.
+
+Before the flop only the two hole cards are known, and the outcome does not
+depend on their suits except for whether they match. That leaves 169
+classes of starting hand: 13 pairs ('77'), 78 suited ('AKs') and 78
+offsuit ('AKo') hands. build_table() simulates one representative of each
+class against up to nine opponents, and save_table() writes the counters to
+a gzipped JSON file, so main.py can answer a preflop query with a lookup
+instead of a fresh simulation.
+
+Run this module to generate the table:
+
+    uv run python preflop.py -t 2000000 --vectorized
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+from equity import MAX_PLAYERS, EquityResult, format_table, simulate
+from hand_rank import HandRank
+from poker_analysis import ACE, RANKS
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_table.json.gz')
+# Bump when the layout of the saved counters changes, so old files are ignored
+FORMAT_VERSION = 1
+SPADES, HEARTS = 0, 1
+
+
+def hand_class(hole):
+    """
+    Name the class of a pair of hole cards, e.g. 'AKs', 'AKo' or '77'.
+
+    Args:
+        hole: Two integer card codes, in either order.
+    """
+    first, second = sorted(hole, reverse=True)
+    high, low = RANKS[first >> 2], RANKS[second >> 2]
+    if high == low:
+        return high + low
+    return high + low + ('s' if first & 3 == second & 3 else 'o')
+
+
+def all_classes():
+    """All 169 class names, pairs first, then from the highest cards down."""
+    pairs = [RANKS[rank] * 2 for rank in range(ACE, -1, -1)]
+    others = []
+    for high in range(ACE, 0, -1):
+        for low in range(high - 1, -1, -1):
+            others.append(RANKS[high] + RANKS[low] + 's')
+            others.append(RANKS[high] + RANKS[low] + 'o')
+    return pairs + others
+
+
+def class_cards(name):
+    """A representative pair of hole cards for a class name."""
+    high, low = RANKS.index(name[0]), RANKS.index(name[1])
+    second_suit = SPADES if name.endswith('s') else HEARTS
+    return [high * 4 + SPADES, low * 4 + second_suit]
+
+
+def class_combos(name):
+    """Number of distinct hole card pairs in a class: 6 for a pair, 4 suited, 12 offsuit."""
+    if len(name) == 2:
+        return 6
+    return 4 if name.endswith('s') else 12
+
+
+def trimmed(result, max_players):
+    """A copy of result that only reports table sizes up to max_players."""
+    columns = max_players - 1
+    copy = EquityResult(max_players)
+    copy.trials = result.trials
+    copy.exact = result.exact
+    copy.rank_counts = list(result.rank_counts)
+    copy.wins = [row[:columns] for row in result.wins]
+    copy.ties = [row[:columns] for row in result.ties]
+    copy.shares = result.shares[:columns]
+    return copy
+
+
+def build_table(trials, seed=0, classes=None, progress=None, **options):
+    """
+    Simulate every starting hand class.
+
+    Args:
+        trials: Number of trials per class.
+        seed: Run seed. Each class gets its own seed derived from it.
+        classes: Class names to simulate (default: all 169).
+        progress: Optional callback called with (name, result) as each class finishes.
+        options: Passed on to simulate(), e.g. workers or vectorized.
+
+    Returns:
+        dict: Class name to EquityResult, tracking every table size up to MAX_PLAYERS.
+    """
+    table = {}
+    for name in classes or all_classes():
+        result = simulate(class_cards(name), trials, MAX_PLAYERS, seed=f"{seed}:{name}", **options)
+        table[name] = result
+        if progress:
+            progress(name, result)
+    return table
+
+
+def _pack(result):
+    return ([result.trials] + result.rank_counts + [count for row in result.wins for count in row]
+            + [count for row in result.ties for count in row] + result.shares)
+
+
+def _unpack(values):
+    columns = MAX_PLAYERS - 1
+    ranks = len(HandRank)
+    result = EquityResult(MAX_PLAYERS)
+    result.trials = values[0]
+    result.rank_counts = values[1:1 + ranks]
+    start = 1 + ranks
+    result.wins = [values[start + r * columns:start + (r + 1) * columns] for r in range(ranks)]
+    start += ranks * columns
+    result.ties = [values[start + r * columns:start + (r + 1) * columns] for r in range(ranks)]
+    start += ranks * columns
+    result.shares = values[start:start + columns]
+    return result
+
+
+def save_table(table, path=TABLE_FILE, seed=None):
+    """Write a table from build_table() to a gzipped JSON file."""
+    data = {
+        'version': FORMAT_VERSION,
+        'max_players': MAX_PLAYERS,
+        'seed': seed,
+        'classes': {name: _pack(result) for name, result in table.items()},
+    }
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+class PreflopTable:
+    """Saved results for starting hand classes, looked up by hole cards."""
+
+    def __init__(self, results, path=None):
+        self.results = results
+        self.path = path
+
+    def lookup(self, cards, max_players=MAX_PLAYERS):
+        """
+        Return the saved result for two hole cards, or None if the cards are
+        not exactly two hole cards or their class is not in the table.
+        """
+        if len(cards) != 2:
+            return None
+        result = self.results.get(hand_class(cards))
+        if result is None:
+            return None
+        return trimmed(result, max_players)
+
+    def trials(self):
+        """Smallest number of trials behind any class in the table."""
+        return min((result.trials for result in self.results.values()), default=0)
+
+
+def load_table(path=TABLE_FILE):
+    """
+    Read a table written by save_table().
+
+    Returns:
+        PreflopTable: The table, or None if the file does not exist or was
+        written in a different format.
+    """
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    if data.get('version') != FORMAT_VERSION or data.get('max_players') != MAX_PLAYERS:
+        return None
+    return PreflopTable({name: _unpack(values) for name, values in data['classes'].items()}, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute results for all 169 starting hands")
+    parser.add_argument('-t', '--trials', type=int, default=1_000_000,
+                        help='Trials per starting hand (default: 1,000,000)')
+    parser.add_argument('--seed', type=int, default=0, help='Run seed (default: 0)')
+    parser.add_argument('--workers', type=int,
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--vectorized', action='store_true',
+                        help='Evaluate each batch of trials at once with NumPy')
+    parser.add_argument('-o', '--output', default=TABLE_FILE,
+                        help='File to write the table to (default: preflop_table.json.gz next to this script)')
+    parser.add_argument('--show', metavar='CLASS',
+                        help="Print the saved results for one class, e.g. 'AKs', and exit")
+    args = parser.parse_args()
+
+    if args.show:
+        table = load_table(args.output)
+        if table is None or args.show not in table.results:
+            sys.exit(f"{args.show} is not in {args.output}")
+        print(format_table(table.results[args.show]))
+        return
+
+    start = time.perf_counter()
+
+    def progress(name, result):
+        print(f"{name:>4}: {result.equity()[0] * 100:5.1f}% heads up "
+              f"({time.perf_counter() - start:.0f}s)", file=sys.stderr)
+
+    table = build_table(args.trials, args.seed, progress=progress,
+                        workers=args.workers, vectorized=args.vectorized)
+    save_table(table, args.output, args.seed)
+    print(f"Wrote {len(table)} hands x {args.trials:,} trials to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
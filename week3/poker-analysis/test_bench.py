@@ -0,0 +1,46 @@
+import unittest
+
+from bench import (ALL_SEVEN_CARD_HANDS, EVALUATORS, KNOWN_COUNTS, category_counts, check_frequencies,
+                   exhaustive_counts, random_hands, read_test_data, time_evaluator)
+from hand_rank import HandRank
+from poker_analysis import DECK
+
+
+class CheckBench(unittest.TestCase):
+    def test_known_counts_cover_every_hand(self):
+        self.assertEqual(sum(KNOWN_COUNTS.values()), ALL_SEVEN_CARD_HANDS)
+        self.assertEqual(check_frequencies([KNOWN_COUNTS[rank] for rank in HandRank], exact=True), [])
+
+    def test_every_evaluator_passes_test_data(self):
+        hands, expected = read_test_data()
+        self.assertGreater(len(hands), 100)
+        for name in EVALUATORS:
+            with self.subTest(evaluator=name):
+                categories, seconds = time_evaluator(name, hands)
+                self.assertEqual(categories, expected)
+
+    def test_random_stream_is_repeatable_and_plausible(self):
+        hands = random_hands(20_000, seed=1)
+        self.assertEqual(hands, random_hands(20_000, seed=1))
+        categories, _ = time_evaluator('evaluate7', hands)
+        self.assertEqual(check_frequencies(category_counts(categories)), [])
+
+    def test_check_frequencies_flags_wrong_counts(self):
+        counts = [KNOWN_COUNTS[rank] for rank in HandRank]
+        counts[HandRank.FLUSH.value] += 1
+        counts[HandRank.STRAIGHT.value] -= 1
+        self.assertEqual(len(check_frequencies(counts, exact=True)), 2)
+        skewed = [0] * len(HandRank)
+        skewed[HandRank.ONE_PAIR.value] = 10_000
+        self.assertNotEqual(check_frequencies(skewed), [])
+
+    def test_exhaustive_numpy_matches_scalar(self):
+        if 'numpy' not in EVALUATORS:
+            self.skipTest("numpy is not installed")
+        # Two suits of the top seven ranks plus two low cards: 11,440 hands with flushes and straights
+        deck = [card for card in DECK if card >> 2 >= 6 and card & 3 < 2] + [0, 5]
+        self.assertEqual(exhaustive_counts('numpy', deck), exhaustive_counts('evaluate7', deck))
+
+
+if __name__ == '__main__':
+    unittest.main()
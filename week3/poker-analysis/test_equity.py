@@ -0,0 +1,173 @@
+import math
+import unittest
+from itertools import combinations
+
+from equity import (MAX_PLAYERS, POT, EquityResult, ResultCache, analyze, canonical_key, completions,
+                    exact_result, format_showdown, format_table, run_trials, simulate)
+from hand_rank import HandRank
+from poker_analysis import DECK, evaluate, parse_cards
+
+
+class CheckSimulation(unittest.TestCase):
+    def test_complete_hand_always_same_rank(self):
+        result = run_trials(parse_cards("AS AH KS KH QS JS TS"), 200, seed=1)
+        self.assertEqual(result.trials, 200)
+        self.assertEqual(result.rank_counts[HandRank.ROYAL_FLUSH.value], 200)
+        self.assertEqual(result.total_wins(), [200] * 9)
+
+    def test_same_seed_same_result(self):
+        cards = parse_cards("AS 9H")
+        first = simulate(cards, 5000, seed=7, workers=1)
+        second = simulate(cards, 5000, seed=7, workers=1)
+        self.assertEqual(first.rank_counts, second.rank_counts)
+        self.assertEqual(first.wins, second.wins)
+
+    def test_pool_matches_single_process(self):
+        cards = parse_cards("7C 2D")
+        pooled = simulate(cards, 50_000, seed=11, workers=2)
+        single = simulate(cards, 50_000, seed=11, workers=1)
+        self.assertEqual(pooled.rank_counts, single.rank_counts)
+        self.assertEqual(pooled.wins, single.wins)
+
+    def test_wins_shrink_with_more_players(self):
+        result = simulate(parse_cards("KD 8C"), 20_000, seed=3, workers=1)
+        wins = result.total_wins()
+        self.assertEqual(wins, sorted(wins, reverse=True))
+
+    def test_board_plays_splits_every_pot(self):
+        # Nobody can beat or improve on a royal flush board, so every pot is split by everyone
+        result = run_trials(parse_cards("2C 3D AS KS QS JS TS"), 2000, seed=4)
+        wins, ties = result.total_wins(), result.total_ties()
+        self.assertEqual(wins, [2000] * 9)
+        self.assertEqual(ties, wins)
+        for i, share in enumerate(result.shares):
+            self.assertEqual(share, POT // (i + 2) * 2000)
+
+    def test_equity_between_win_and_win_or_split(self):
+        result = simulate(parse_cards("7S 7D"), 20_000, seed=9, workers=1)
+        wins, ties = result.total_wins(), result.total_ties()
+        for i, equity in enumerate(result.equity()):
+            self.assertGreaterEqual(equity * result.trials, wins[i] - ties[i])
+            self.assertLessEqual(equity * result.trials, wins[i])
+
+    def test_showdown_table(self):
+        result = run_trials(parse_cards("AS 9H"), 1000, seed=1)
+        lines = format_showdown(result).splitlines()
+        self.assertEqual(len(lines), 1 + 9)
+        self.assertEqual(lines[1].split()[0], "2")
+
+    def test_stops_at_target_ci(self):
+        result = simulate([], 1_000_000, max_players=1, seed=5, workers=1, target_ci=1.0)
+        self.assertLess(result.trials, 1_000_000)
+        self.assertLessEqual(result.ci_half_width(), 1.0)
+
+    def test_merge_adds_counters(self):
+        first = run_trials(parse_cards("AS 9H"), 100, seed=1)
+        second = run_trials(parse_cards("AS 9H"), 100, seed=2)
+        merged = EquityResult().merge(first).merge(second)
+        self.assertEqual(merged.trials, 200)
+        self.assertEqual(sum(merged.rank_counts), 200)
+
+    def test_table_has_row_per_rank(self):
+        lines = format_table(run_trials(parse_cards("AS 9H"), 100, seed=1)).splitlines()
+        self.assertEqual(len(lines), 2 + len(HandRank))
+        self.assertTrue(lines[1].strip().startswith("All:  100.0%"))
+
+
+class CheckExact(unittest.TestCase):
+    def test_completion_weights_count_every_deal(self):
+        for known in ["", "AS", "AS AH", "AS 9H", "2C 3C 4D", "AS AH KS KH"]:
+            cards = parse_cards(known)
+            for count in (1, 2, 3):
+                with self.subTest(known=known, count=count):
+                    total = sum(weight for _, weight in completions([cards], count))
+                    self.assertEqual(total, math.comb(52 - len(cards), count))
+
+    def test_completion_weights_with_hole_and_board(self):
+        hole, board = parse_cards("AS KS"), parse_cards("AH KH")
+        total = sum(weight for _, weight in completions([hole, board], 2))
+        self.assertEqual(total, math.comb(48, 2))
+
+    def test_distribution_matches_brute_force(self):
+        known = parse_cards("AS 9H 7C 2D")
+        expected = [0] * len(HandRank)
+        rest = [card for card in DECK if card not in known]
+        for extra in combinations(rest, 3):
+            expected[evaluate(known + list(extra)) >> 20] += 1
+        self.assertEqual(exact_result(known, 1).rank_counts, expected)
+
+    def test_heads_up_matches_brute_force(self):
+        # Spades and hearts are interchangeable here, so the isomorphism is used
+        known = parse_cards("AS AH KS KH QD")
+        hole, board_known = known[:2], known[2:]
+        rest = [card for card in DECK if card not in known]
+        wins = ties = deals = 0
+        for extra in combinations(rest, 2):
+            board = board_known + list(extra)
+            mine = evaluate(hole + board)
+            for opponent in combinations([card for card in rest if card not in extra], 2):
+                theirs = evaluate(list(opponent) + board)
+                deals += 1
+                wins += theirs <= mine
+                ties += theirs == mine
+        result = exact_result(known, 2)
+        self.assertEqual(result.trials, deals)
+        self.assertEqual(result.total_wins(), [wins])
+        self.assertEqual(result.total_ties(), [ties])
+        self.assertEqual(result.equity(), [(wins - ties / 2) / deals])
+
+    def test_auto_picks_exact_when_cheaper(self):
+        self.assertTrue(analyze(parse_cards("AS 9H 7C 2D KD 3S"), 100_000, max_players=2).exact)
+        self.assertFalse(analyze(parse_cards("AS 9H"), 10_000, max_players=2, workers=1).exact)
+        self.assertFalse(analyze(parse_cards("AS 9H 7C 2D KD 3S"), 10_000, workers=1).exact)
+
+    def test_auto_enumerates_flop_at_full_table(self):
+        known = parse_cards("AS 9H 7C 2D KD")
+        result = analyze(known, 100_000, workers=1, seed=1)
+        self.assertFalse(result.exact)
+        self.assertEqual(result.max_players, MAX_PLAYERS)
+        heads_up = exact_result(known, 2)
+        self.assertEqual(result.enumerated.rank_counts, heads_up.rank_counts)
+        self.assertEqual(result.equity()[0], heads_up.equity()[0])
+        self.assertEqual(result.table_ci()[0], 0.0)
+        self.assertGreater(result.table_ci()[1], 0.0)
+        table = format_table(result).splitlines()
+        self.assertEqual(len(table[0].split()), 3 + MAX_PLAYERS - 1)
+        self.assertIn(f"{heads_up.trials:7d}", table[1])
+        # Too slow to enumerate heads-up, but the HandRank distribution is cheap
+        result = analyze(parse_cards("AS 9H 7C"), 100_000, workers=1, seed=1)
+        self.assertEqual(result.enumerated.max_players, 1)
+        self.assertEqual(result.exact_columns(), 0)
+        self.assertIsNone(analyze(parse_cards("AS 9H"), 10_000, workers=1, seed=1).enumerated)
+
+
+class CheckCache(unittest.TestCase):
+    def test_equivalent_hands_share_a_key(self):
+        key = canonical_key(parse_cards("AS 9H 7C"))
+        self.assertEqual(canonical_key(parse_cards("AH 9S 7D")), key)
+        self.assertEqual(canonical_key(parse_cards("9D AC 7H")), key)
+        # Suited hole cards, or a board card matching a hole card's suit, are different hands
+        self.assertNotEqual(canonical_key(parse_cards("AS 9S 7C")), key)
+        self.assertNotEqual(canonical_key(parse_cards("AS 9H 7S")), key)
+        # Moving a card between the hole and the board changes the hand
+        self.assertNotEqual(canonical_key(parse_cards("AS 7C 9H")), key)
+
+    def test_key_classes_match_suit_symmetry(self):
+        keys = {canonical_key(list(hole)) for hole in combinations(DECK, 2)}
+        self.assertEqual(len(keys), 169)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = ResultCache(max_size=2)
+        hands = [parse_cards(text) for text in ("AS 9H", "KS KH", "7C 2D")]
+        for cards in hands[:2]:
+            cache.put(cards, run_trials(cards, 10, seed=1, max_players=3))
+        self.assertIsNotNone(cache.get(parse_cards("AH 9D"), 3))
+        self.assertIsNone(cache.get(hands[0], 2))
+        cache.put(hands[2], run_trials(hands[2], 10, seed=1, max_players=3))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(hands[1], 3))
+        self.assertIsNotNone(cache.get(hands[0], 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import random
+import unittest
+from itertools import combinations
+
+try:
+    import numpy as np
+    from batch_eval import evaluate_many, parse_hands, run_trials_vectorized
+except ImportError:  # pragma: no cover
+    np = None
+
+from hand_rank import HandRank
+from poker_analysis import (best_five, best_hand, card_name, evaluate, evaluate7,
+                            flush_strength, hand_rank, histogram_strength, parse_cards)
+
+
+def brute_force(cards):
+    """Best strength over every five card subset, scored without the lookup tables."""
+    best = 0
+    for five in combinations(cards, 5):
+        suits = {card & 3 for card in five}
+        if len(suits) == 1:
+            mask = 0
+            for card in five:
+                mask |= 1 << (card >> 2)
+            strength = flush_strength(mask)
+        else:
+            counts = [0] * 13
+            for card in five:
+                counts[card >> 2] += 1
+            strength = histogram_strength(counts)
+        best = max(best, strength)
+    return best
+
+
+class CheckEvaluator(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(398)
+        for _ in range(3000):
+            cards = rng.sample(range(52), 7)
+            with self.subTest(cards=[card_name(card) for card in cards]):
+                expected = brute_force(cards)
+                self.assertEqual(evaluate(cards), expected)
+                self.assertEqual(evaluate7(*cards), expected)
+
+    def test_five_and_six_cards(self):
+        rng = random.Random(5)
+        for size in (5, 6):
+            for _ in range(500):
+                cards = rng.sample(range(52), size)
+                self.assertEqual(evaluate(cards), brute_force(cards))
+
+    def test_strength_ordering(self):
+        hands = [
+            "2S 4H 6D 8C TS JH 3D",    # high card
+            "2S 2H 6D 8C TS JH 3D",    # pair of twos
+            "AS AH 6D 8C TS JH 3D",    # pair of aces
+            "AS AH 6D 6C TS JH 3D",    # two pair
+            "AS AH AD 6C TS JH 3D",    # trips
+            "AS 2H 3D 4C 5S JH 9D",    # wheel
+            "6S 2H 3D 4C 5S JH 9D",    # six high straight
+            "2S 4S 6S 8S TS JH 3D",    # flush
+            "AS AH AD 6C 6S JH 3D",    # full house
+            "2S 2H 2D 2C TS JH 3D",    # quads
+            "AS 2S 3S 4S 5S JH 9D",    # steel wheel
+            "AS KS QS JS TS JH 9D",    # royal flush
+        ]
+        strengths = [evaluate(parse_cards(hand)) for hand in hands]
+        self.assertEqual(strengths, sorted(strengths))
+        self.assertEqual(len(set(strengths)), len(strengths))
+
+    def test_suits_do_not_break_ties(self):
+        self.assertEqual(evaluate(parse_cards("AS KH 9D 7C 5S 3H 2D")),
+                         evaluate(parse_cards("AH KD 9C 7S 5H 3D 2C")))
+
+    def test_best_five(self):
+        cards = parse_cards("3S 6S 3D 5C QC QD AH")
+        strength = evaluate(cards)
+        self.assertEqual(hand_rank(strength), HandRank.TWO_PAIR)
+        self.assertEqual([card_name(card) for card in best_five(cards, strength)],
+                         ['QC', 'QD', '3S', '3D', 'AH'])
+
+    def test_best_hand_flush_uses_flush_suit(self):
+        rank, cards = best_hand(['AS', 'AH', '2H', '5H', '9H', 'JH', '4C'])
+        self.assertEqual(rank, HandRank.FLUSH)
+        self.assertEqual(cards, ['AH', 'JH', '9H', '5H', '2H'])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class CheckBatchEvaluator(unittest.TestCase):
+    def test_matches_scalar(self):
+        rng = random.Random(31)
+        for size in (5, 6, 7):
+            hands = [rng.sample(range(52), size) for _ in range(5000)]
+            ranks, strengths = evaluate_many(np.array(hands))
+            expected = [evaluate(hand) for hand in hands]
+            self.assertEqual(strengths.tolist(), expected)
+            self.assertEqual(ranks.tolist(), [strength >> 20 for strength in expected])
+
+    def test_test_data(self):
+        for name in sorted(os.listdir("testData")):
+            with open(os.path.join("testData", name)) as f:
+                lines = [line for line in f if line.strip()]
+            expected = HandRank[name[:-4].replace("WHEEL_", "").replace("TRICKY_", "")]
+            ranks, _ = evaluate_many(parse_hands(lines))
+            with self.subTest(file=name):
+                self.assertEqual(set(ranks.tolist()), {expected.value})
+
+    def test_vectorized_trials(self):
+        result = run_trials_vectorized(parse_cards("AS AH KS KH QS JS TS"), 100, seed=1, max_players=10)
+        self.assertEqual(result.rank_counts[HandRank.ROYAL_FLUSH.value], 100)
+        self.assertEqual(result.total_wins(), [100] * 9)
+
+    def test_vectorized_trials_agree_with_scalar(self):
+        from equity import simulate
+        cards = parse_cards("AS 9H")
+        scalar = simulate(cards, 40_000, seed=1, workers=1)
+        vectorized = simulate(cards, 40_000, seed=1, workers=1, vectorized=True)
+        for mine, theirs in zip(scalar.equity(), vectorized.equity()):
+            self.assertAlmostEqual(mine, theirs, delta=0.015)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,4 @@
-from hand_rank import HandRank
+from poker_analysis import best_hand
 
 
 def get_best_hand(cards):
@@ -19,5 +19,4 @@ def get_best_hand(cards):
         >>> get_best_hand(['KC', 'KS', 'QH', 'TD', '7S', '2C', '3D'])
         (<HandRank.ONE_PAIR: 1>, ['KC', 'KS', 'QH', 'TD', '7S'])
     """
-    # This is not the right code, but it shows the types of the values that should be returned
-    return (HandRank.HIGH_CARD, cards[:5])
+    return best_hand(cards)
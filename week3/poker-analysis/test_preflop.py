@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from itertools import combinations
+
+from equity import simulate
+from poker_analysis import DECK, parse_cards
+from preflop import (all_classes, build_table, class_cards, class_combos, hand_class, load_table,
+                     save_table)
+
+
+class CheckPreflop(unittest.TestCase):
+    def test_classes_cover_every_starting_hand(self):
+        classes = all_classes()
+        self.assertEqual(len(classes), 169)
+        self.assertEqual(sum(class_combos(name) for name in classes), 1326)
+        counts = {}
+        for hole in combinations(DECK, 2):
+            name = hand_class(hole)
+            counts[name] = counts.get(name, 0) + 1
+        self.assertEqual(counts, {name: class_combos(name) for name in classes})
+
+    def test_class_names(self):
+        self.assertEqual(hand_class(parse_cards("KH AH")), "AKs")
+        self.assertEqual(hand_class(parse_cards("AS KD")), "AKo")
+        self.assertEqual(hand_class(parse_cards("7C 7D")), "77")
+        for name in all_classes():
+            self.assertEqual(hand_class(class_cards(name)), name)
+
+    def test_saved_table_round_trips(self):
+        table = build_table(2000, seed=1, classes=["AKs", "72o"], workers=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.json.gz")
+            save_table(table, path, seed=1)
+            loaded = load_table(path)
+        self.assertEqual(set(loaded.results), {"AKs", "72o"})
+        for name, result in table.items():
+            saved = loaded.results[name]
+            self.assertEqual(saved.trials, result.trials)
+            self.assertEqual(saved.rank_counts, result.rank_counts)
+            self.assertEqual(saved.wins, result.wins)
+            self.assertEqual(saved.ties, result.ties)
+            self.assertEqual(saved.shares, result.shares)
+
+    def test_lookup_any_suits_and_table_size(self):
+        table = build_table(2000, seed=1, classes=["AKs"], workers=1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.json.gz")
+            save_table(table, path)
+            loaded = load_table(path)
+        result = loaded.lookup(parse_cards("KD AD"), max_players=3)
+        self.assertEqual(result.max_players, 3)
+        self.assertEqual(result.total_wins(), table["AKs"].total_wins()[:2])
+        self.assertIsNone(loaded.lookup(parse_cards("AD KC")))
+        self.assertIsNone(loaded.lookup(parse_cards("AD KD 2C")))
+
+    def test_representative_matches_other_suits(self):
+        table = build_table(40_000, seed=2, classes=["JTo"], workers=1)
+        other = simulate(parse_cards("TC JD"), 40_000, seed=3, workers=1)
+        for mine, theirs in zip(table["JTo"].equity(), other.equity()):
+            self.assertAlmostEqual(mine, theirs, delta=0.015)
+
+    def test_missing_file(self):
+        self.assertIsNone(load_table(os.path.join(tempfile.gettempdir(), "no-such-table.json.gz")))
+
+
+if __name__ == '__main__':
+    unittest.main()
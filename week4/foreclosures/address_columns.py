@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Column-oriented address parsing with pandas.
+
+parse_addresses() gives the same (number, name, unit, kind) values as
+parse_address(), but for a whole pandas Series at once. Foreclosure
+extracts repeat the same addresses many times, so the column is factorized
+and each distinct address is parsed only once with the compiled patterns of
+parse_address; the results are then gathered back into columns with a
+single take. read_parsed_addresses() reads a CSV in chunks so memory stays
+bounded for statewide extracts with millions of rows.
+"""
+
+import argparse
+import sys
+
+import pandas as pd
+
+from parse_address import parse_address
+
+COLUMNS = ['number', 'name', 'unit', 'kind']
+
+
+def parse_addresses(series):
+    """
+    Parse a column of street addresses.
+
+    Args:
+        series: pandas Series of address strings. Missing values can't be
+            parsed, like empty strings.
+
+    Returns:
+        DataFrame: Columns number, name, unit and kind with the same index as
+        series. Each row equals parse_address() of that address; rows that
+        can't be parsed are None in every column.
+    """
+    codes, uniques = pd.factorize(series)
+    # Missing values get code -1, which take() maps to the extra last row
+    parsed = [parse_address(address) for address in uniques] + [(None, None, None, None)]
+    table = pd.DataFrame(parsed, columns=COLUMNS, dtype=object)
+    result = table.take(codes)
+    result.index = series.index
+    return result
+
+
+def read_parsed_addresses(filename, column='Street Address', chunksize=100_000):
+    """
+    Read a CSV in chunks and add the parsed address columns to each chunk.
+
+    Args:
+        filename: Path of the CSV file.
+        column: Name of the column holding the street addresses.
+        chunksize: Number of rows per chunk.
+
+    Yields:
+        DataFrame: The original columns of each chunk, read as strings,
+        followed by number, name, unit and kind.
+    """
+    for chunk in pd.read_csv(filename, dtype=str, keep_default_na=False, chunksize=chunksize):
+        yield chunk.join(parse_addresses(chunk[column]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add parsed address columns to a CSV file")
+    parser.add_argument('input', nargs='?', default='County_Foreclosures.csv',
+                        help='CSV file to parse (default: County_Foreclosures.csv)')
+    parser.add_argument('-o', '--output', help='CSV file to write (default: stdout)')
+    parser.add_argument('--column', default='Street Address',
+                        help="Column holding the street addresses (default: 'Street Address')")
+    parser.add_argument('--chunksize', type=int, default=100_000,
+                        help='Rows per chunk (default: 100,000)')
+    args = parser.parse_args()
+
+    output = args.output or sys.stdout
+    rows = unparsed = 0
+    try:
+        for i, chunk in enumerate(read_parsed_addresses(args.input, args.column, args.chunksize)):
+            chunk.to_csv(output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows += len(chunk)
+            unparsed += int(chunk['number'].isna().sum())
+    except FileNotFoundError:
+        print(f"{args.input} not found.", file=sys.stderr)
+        sys.exit(1)
+    print(f"Parsed {rows - unparsed} of {rows} addresses", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,163 +1,488 @@
 #!/usr/bin/env python3
 
+import argparse
+import copy
 import csv
-import time
 import sys
-from parse_address import parse_address
-from geocoding_utils import geocode_address_nominatim, is_valid_prince_georges_zip
+from collections import Counter, deque
+from parse_address import STREET_TYPES, normalize_street_name, parse_address_for_geocoding
+from geocoding_utils import NOMINATIM_URL, is_valid_prince_georges_zip
+from geocode_cache import CachedGeocoder
+from local_geocoder import RoadGeocoder
+from geocoding_client import GeocodingClient
+from augment_journal import AugmentJournal, journal_filename
+from pipeline_stats import PipelineStats
+from street_index import StreetIndex
 
-def augment_foreclosures_csv(input_filename, output_filename):
+ROADS_FILE = "Prince_Georges_County_Maintained_Roads_-7480761036642557875.geojson"
+# Addresses handed to the geocoder at a time; progress is reported between batches
+BATCH_SIZE = 100
+# Most rows held back waiting for a batch to fill before it is geocoded anyway
+MAX_HELD_ROWS = 10_000
+
+def canonical_address_key(street_address, city, state, streets=None):
     """
-    Read the foreclosures CSV, geocode missing zip codes, and write augmented version.
+    Canonical form of an address for geocoding, so repeated filings for a
+    property and unit variants ("Apt 2B", "#2B") share a single lookup.
     
     Args:
-        input_filename: Path to original County_Foreclosures.csv
-        output_filename: Path to write augmented CSV
+        street_address: Street address as it appears in the CSV
+        city: City name
+        state: State name
+        streets: StreetIndex to correct misspelled street names with (and
+            rescue addresses parse_address() rejects), or None
+        
+    Returns:
+        tuple: (key, parts) where key is (number, street, city, state) upper-cased
+        with the street type expanded (e.g. "MAIN STREET" for both "Main St" and
+        "Main Street"), and parts is (number, name, kind, city, state) to pass to
+        the geocoder. (None, None) if the street address can't be parsed.
     """
+    number, name, kind = parse_address_for_geocoding(street_address)
+    if number is None and streets is not None:
+        number, name, kind = streets.recover(street_address)
+    if number is None or name is None:
+        return None, None
+    if not kind:
+        # A comma after the street type ("Main St, Apt 5") leaves it in the name
+        words = name.rsplit(None, 1)
+        if len(words) == 2 and words[1].upper() in STREET_TYPES:
+            name, kind = words[0], words[1].upper()
+    if streets is not None:
+        name, kind = streets.correct(name, kind)
+    variations = normalize_street_name(name, kind)
+    if not variations:
+        return None, None
+    key = (number.upper(), variations[-1], ' '.join(city.upper().split()), ' '.join(state.upper().split()))
+    return key, (number, name, kind, city, state)
+
+
+def geocode_batch(geocoder, addresses, stats=None):
+    """
+    Geocode a list of (number, name, kind, city, state) tuples, concurrently
+    if the geocoder has a geocode_many() method.
     
-    geocoded_count = 0
-    skipped_count = 0
-    failed_count = 0
-    total_processed = 0
+    If stats (a PipelineStats) is given, each call is timed as stage
+    'geocode', or each whole batch as 'geocode_batch' when concurrent.
     
-    print(f"Augmenting {input_filename} -> {output_filename}")
-    print("=" * 60)
+    Returns:
+        list: (zip_code, confidence_score) for each address, in the same order
+    """
+    geocode_many = getattr(geocoder, 'geocode_many', None)
+    if geocode_many is not None:
+        if stats is None:
+            return geocode_many(addresses)
+        with stats.time('geocode_batch'):
+            return geocode_many(addresses)
+    if stats is None:
+        return [geocoder(*address) for address in addresses]
+    results = []
+    for address in addresses:
+        with stats.time('geocode'):
+            results.append(geocoder(*address))
+    return results
+
+
+def classify_rows(rows, columns):
+    """
+    Stage: mark the rows whose zip code is missing or invalid (less than 5 digits).
     
-    with open(input_filename, 'r', encoding='utf-8') as infile, \
-         open(output_filename, 'w', newline='', encoding='utf-8') as outfile:
-        
-        reader = csv.DictReader(infile)
-        
-        # Get the fieldnames and ensure we maintain the original structure
-        fieldnames = reader.fieldnames
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
+    Args:
+        rows: Iterable of CSV rows as lists
+        columns: Dict of column name -> position in each row
         
-        for row_num, row in enumerate(reader, start=2):
-            total_processed += 1
-            
-            # Get current zip code
-            current_zip = row.get('Zip Code', '').strip()
-            street_address = row.get('Street Address', '').strip()
-            city = row.get('City', '').strip()
-            state = row.get('State', '').strip()
-            
-            # Check if zip code is missing or invalid (less than 5 digits)
-            zip_digits = ''.join(c for c in current_zip if c.isdigit())
-            needs_geocoding = len(zip_digits) < 5
-            
-            if not needs_geocoding:
-                # Already has valid zip code, just copy the row
-                writer.writerow(row)
-                skipped_count += 1
-                if total_processed % 1000 == 0:
-                    print(f"  Processed {total_processed} rows...")
-                continue
-            
+    Yields:
+        tuple: (index, row, missing) with index counting rows from 0
+    """
+    zip_column = columns['Zip Code']
+    for index, row in enumerate(rows):
+        zip_code = row[zip_column] if zip_column < len(row) else ''
+        yield index, row, sum(c.isdigit() for c in zip_code) < 5
+
+
+def parse_rows(records, columns, counts, stats=None, streets=None):
+    """
+    Stage: find the canonical address of each row that needs a zip code.
+    
+    Rows that already have a zip code are counted in counts['skipped'], ones
+    that can't be geocoded (missing address fields or unparseable street
+    address) in counts['failed']. Address parsing is timed as stage 'parse'
+    if stats is given, and street names are corrected with streets (a
+    StreetIndex) if given.
+    
+    Yields:
+        tuple: (index, row, key, parts) as returned by canonical_address_key(),
+        with key None for rows that won't be geocoded
+    """
+    address_columns = (columns['Street Address'], columns['City'], columns['State'])
+    for index, row, missing in records:
+        counts['rows'] += 1
+        key = parts = None
+        if not missing:
+            counts['skipped'] += 1
+        else:
+            counts['missing'] += 1
+            street_address, city, state = (row[column].strip() if column < len(row) else ''
+                                           for column in address_columns)
             # Skip if we don't have enough address info for geocoding
-            if not street_address or not city or not state:
-                writer.writerow(row)
-                failed_count += 1
-                continue
-            
-            print(f"Row {row_num}: Geocoding '{street_address}, {city}, {state}'")
-            
-            # Parse the street address
-            number, name, _, kind = parse_address(street_address)  # Discard unit component
-            
-            if number is None or name is None:
-                print(f"  ✗ Could not parse address")
-                writer.writerow(row)  # Write original row
-                failed_count += 1
-                continue
-            
-            # Attempt to geocode
-            found_zip, confidence = geocode_address_nominatim(number, name, kind, city, state)
+            if street_address and city and state:
+                if stats is None:
+                    key, parts = canonical_address_key(street_address, city, state, streets)
+                else:
+                    start = stats.clock()
+                    key, parts = canonical_address_key(street_address, city, state, streets)
+                    stats.add('parse', stats.clock() - start)
+            if key is None:
+                counts['failed'] += 1
+        yield index, row, key, parts
+
+
+def lookup_rows(records, geocoder, known, counts, journal=None, stats=None, held=None):
+    """
+    Stage: geocode and validate each new canonical address, BATCH_SIZE at a time.
+    
+    Rows are held back until every address among them has been looked up
+    (at most MAX_HELD_ROWS, so rare new addresses late in a file don't hold
+    up the output), then passed on in their original order. Results go into known, so later
+    rows with the same address reuse them, and each batch of settled
+    addresses (zip found, or found outside the county) is checkpointed in
+    journal. If the geocoder raises, the rows held back are passed on
+    without a key before the exception is re-raised. If the consumer stops
+    (or raises) instead, the rows not passed on yet are left in held.
+    
+    Args:
+        records: Iterable of (index, row, key, parts) from parse_rows()
+        geocoder: Function with the signature of geocode_address_nominatim()
+        known: Dict of canonical key -> zip code (None if not found) to use and update
+        counts: Counter updated with 'addresses' and 'lookups'
+        journal: AugmentJournal to record settled addresses in, or None
+        stats: PipelineStats to time geocoding, validation and checkpoints in, or None
+        held: deque of (index, row, key) the rows waiting for their batch are
+            kept in (default: a new one)
+        
+    Yields:
+        tuple: (index, row, key, zip_code) with zip_code None if not found
+    """
+    seen = set()
+    if held is None:
+        held = deque()
+    new = {}
+    
+    def release():
+        # Take each row off held before passing it on, so held never has a row twice
+        while held:
+            held_index, held_row, held_key = held.popleft()
+            yield held_index, held_row, held_key, known.get(held_key)
+    
+    def flush():
+        keys = list(new)
+        results = geocode_batch(geocoder, [new[key][1] for key in keys], stats)
+        validate_start = stats.clock() if stats is not None else None
+        settled = []
+        for key, (found_zip, confidence) in zip(keys, results):
+            index, (number, name, kind, city, state) = new[key]
+            street = ' '.join(part for part in (number, name, kind) if part)
+            print(f"Row {index + 2}: Geocoding '{street}, {city}, {state}'")
             
             # Validate zip code is in Prince George's County
             if found_zip and not is_valid_prince_georges_zip(found_zip):
                 print(f"  ⚠ Found zip {found_zip} but it's outside Prince George's County")
+                settled.append((key, None))
                 found_zip = None
-            
-            if found_zip:
-                # Update the row with the found zip code
-                row['Zip Code'] = found_zip
+            elif found_zip:
                 print(f"  ✓ Found and updated zip: {found_zip}")
-                geocoded_count += 1
+                settled.append((key, found_zip))
             else:
                 print(f"  ✗ No valid zip found")
-                failed_count += 1
-            
-            # Write the row (either updated or original)
-            writer.writerow(row)
-            
-            # Progress reporting
-            if total_processed % 100 == 0:
-                missing_attempted = geocoded_count + failed_count
-                print(f"\n--- Progress Update ---")
-                print(f"Rows processed: {total_processed:,}")
-                print(f"Had zip codes: {skipped_count:,}")
-                print(f"Missing zips attempted: {missing_attempted:,}")
-                print(f"  ✓ Successfully geocoded: {geocoded_count:,}")
-                print(f"  ✗ Failed to geocode: {failed_count:,}")
-                if missing_attempted > 0:
-                    print(f"  Success rate so far: {geocoded_count/missing_attempted*100:.1f}%")
-                print("----------------------\n")
-            
-            # Be respectful to Nominatim API
-            time.sleep(1.0)
+            known[key] = found_zip
+        if stats is not None:
+            stats.add('validate', stats.clock() - validate_start)
+        if journal is not None:
+            if stats is None:
+                journal.record(settled)
+            else:
+                with stats.time('journal'):
+                    journal.record(settled)
+        counts['lookups'] += len(keys)
+        new.clear()
+    
+    try:
+        for index, row, key, parts in records:
+            if key is not None and key not in seen:
+                seen.add(key)
+                counts['addresses'] += 1
+                if key not in known:
+                    new[key] = (index, parts)
+            held.append((index, row, key))
+            if len(new) >= BATCH_SIZE or (new and len(held) >= MAX_HELD_ROWS):
+                flush()
+            if not new:
+                yield from release()
+        if new:
+            flush()
+    except GeneratorExit:
+        raise
+    except BaseException:
+        # Pass on the rows held back, then re-raise
+        while held:
+            held_index, held_row, held_key = held.popleft()
+            yield held_index, held_row, held_key if held_key in known else None, known.get(held_key)
+        raise
+    yield from release()
+
+
+def augment_foreclosures_csv(input_filename, output_filename, geocoder=None, resume=True, stats=None,
+                             streets=None):
+    """
+    Read the foreclosures CSV, geocode missing zip codes, and write augmented version.
+    
+    The file is read once and streamed through generator stages
+    (classify_rows -> parse_rows -> lookup_rows -> write), with rows kept as
+    plain lists. Every distinct canonical address (see canonical_address_key)
+    is geocoded once, and later rows with the same address reuse the result.
+    Addresses go to the geocoder BATCH_SIZE at a time, so a geocoder with a
+    geocode_many() method (GeocodingClient, or CachedGeocoder in front of
+    one) can look them up concurrently.
+    
+    Settled addresses are checkpointed in an AugmentJournal next to the
+    output after every batch. If the run stops early (Ctrl+C, crash, API
+    outage) the rest of the input is still copied to the output, and the
+    next run picks up where it stopped instead of geocoding everything again.
+    
+    Each stage is timed in a PipelineStats, whose profile is printed at the
+    end; give it a stream to also get JSON progress lines while it runs.
+    
+    Args:
+        input_filename: Path to original County_Foreclosures.csv
+        output_filename: Path to write augmented CSV
+        geocoder: Function with the signature of geocode_address_nominatim()
+            (default: Nominatim behind the on-disk CachedGeocoder cache)
+        resume: Use (and keep up to date) the checkpoint journal of output_filename
+        stats: PipelineStats to record into (default: a new one without progress lines)
+        streets: StreetIndex proposing the known street for misspelled or
+            unparseable street addresses before they are geocoded, or None
+    """
+    if geocoder is None:
+        geocoder = CachedGeocoder()
+    if stats is None:
+        stats = PipelineStats()
+    stats.watch(geocoder)
+    
+    print(f"Augmenting {input_filename} -> {output_filename}")
+    print("=" * 60)
+    
+    journal = AugmentJournal(journal_filename(output_filename)) if resume else None
+    known = journal.load() if journal is not None else {}
+    if known:
+        print(f"Resuming from {journal.filename}: {len(known):,} addresses already done")
+    print()
+    
+    counts = stats.counts
+    completed = False
+    with open(input_filename, 'r', newline='', encoding='utf-8') as infile, \
+            open(output_filename, 'w', newline='', encoding='utf-8') as outfile:
+        reader = csv.reader(infile)
+        # Keep the original columns and their order
+        header = next(reader)
+        rows = stats.timed(reader, 'read')
+        columns = {name: position for position, name in enumerate(header)}
+        zip_column = columns['Zip Code']
+        writer = csv.writer(outfile)
+        writer.writerow(header)
+        next_report = 100
+        # Rows lookup_rows() is holding back, and the row being written, for the
+        # partial output if the run stops
+        held = deque()
+        current = None
+        try:
+            records = parse_rows(classify_rows(rows, columns), columns, counts, stats, streets)
+            for index, row, key, zip_code in lookup_rows(records, geocoder, known, counts, journal, stats,
+                                                         held):
+                current = row
+                if key is not None:
+                    counts['to_geocode'] += 1
+                    if zip_code:
+                        row[zip_column] = zip_code
+                        counts['geocoded'] += 1
+                    else:
+                        counts['failed'] += 1
+                write_start = stats.clock()
+                writer.writerow(row)
+                current = None
+                stats.add('write', stats.clock() - write_start)
+                stats.maybe_report()
+                
+                # Progress reporting
+                if counts['lookups'] >= next_report:
+                    next_report += 100
+                    missing_attempted = counts['geocoded'] + counts['failed']
+                    print(f"\n--- Progress Update ---")
+                    print(f"Rows read: {counts['rows']:,} ({counts['missing']:,} missing zip codes)")
+                    print(f"Addresses geocoded: {counts['lookups']:,}")
+                    print(f"Had zip codes: {counts['skipped']:,}")
+                    print(f"Missing zips attempted: {missing_attempted:,}")
+                    print(f"  ✓ Successfully geocoded: {counts['geocoded']:,}")
+                    print(f"  ✗ Failed to geocode: {counts['failed']:,}")
+                    if missing_attempted > 0:
+                        print(f"  Success rate so far: {counts['geocoded']/missing_attempted*100:.1f}%")
+                    print("----------------------\n")
+            completed = True
+        finally:
+            if not completed:
+                # Write the rows already read, then copy the rest, with the zip codes already known.
+                # A shallow copy of streets shares its index but keeps these rows out of its counts
+                if current is not None:
+                    writer.writerow(current)
+                for _, row, key in held:
+                    if known.get(key):
+                        row[zip_column] = known[key]
+                    writer.writerow(row)
+                for _, row, key, _ in parse_rows(classify_rows(reader, columns), columns, Counter(),
+                                                 streets=copy.copy(streets)):
+                    if known.get(key):
+                        row[zip_column] = known[key]
+                    writer.writerow(row)
+            if journal is not None:
+                if completed:
+                    journal.remove()
+                else:
+                    journal.close()
     
     # Final summary
     print(f"\n=== AUGMENTATION COMPLETE ===")
-    print(f"Total rows processed: {total_processed}")
-    print(f"Already had zip codes: {skipped_count}")
-    print(f"Successfully geocoded: {geocoded_count}")
-    print(f"Failed to geocode: {failed_count}")
+    print(f"Total rows processed: {counts['rows']}")
+    print(f"Already had zip codes: {counts['skipped']}")
+    print(f"Successfully geocoded: {counts['geocoded']}")
+    print(f"Failed to geocode: {counts['failed']}")
+    if counts['addresses']:
+        saved = counts['to_geocode'] - counts['addresses']
+        print(f"Unique addresses: {counts['addresses']:,}")
+        print(f"Dedup ratio: {counts['to_geocode'] / counts['addresses']:.2f} rows per address")
+        print(f"Lookups saved: {saved:,} (about {saved / 60:.1f} minutes at 1 request/second)")
     print(f"Output written to: {output_filename}")
+    if isinstance(geocoder, CachedGeocoder):
+        print(f"Geocoding cache: {geocoder.hits} hits, {geocoder.misses} new lookups")
+    if streets is not None:
+        print(f"Street names corrected: {streets.corrected:,}, unparseable addresses recovered: "
+              f"{streets.recovered:,} (against {len(streets):,} known streets)")
     
-    if geocoded_count > 0:
-        print(f"\nSuccess rate for missing zips: {geocoded_count/(geocoded_count+failed_count)*100:.1f}%")
+    if counts['geocoded'] > 0:
+        print(f"\nSuccess rate for missing zips: {counts['geocoded']/(counts['geocoded']+counts['failed'])*100:.1f}%")
+    
+    print(f"\n=== PROFILE ===")
+    print(stats.profile())
+    stats.report('done')
 
 def count_missing_zips(filename):
-    """Count how many rows have missing zip codes."""
-    total = 0
-    missing = 0
-    
-    with open(filename, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
+    """Count how many rows have missing zip codes, in one pass over the raw rows."""
+    with open(filename, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        columns = {name: position for position, name in enumerate(next(reader))}
+        total = missing = 0
+        for _, _, row_missing in classify_rows(reader, columns):
             total += 1
-            zip_code = row.get('Zip Code', '').strip()
-            zip_digits = ''.join(c for c in zip_code if c.isdigit())
-            if len(zip_digits) < 5:
-                missing += 1
-    
+            missing += row_missing
     return total, missing
 
+def add_geocoder_arguments(parser):
+    """Add the options choosing a geocoder (see make_geocoder()) to an ArgumentParser."""
+    parser.add_argument('--roads', nargs='?', const=ROADS_FILE, metavar='GEOJSON',
+                        help='Geocode offline from a road or address point GeoJSON file '
+                             f'(default file: {ROADS_FILE}) instead of Nominatim')
+    parser.add_argument('--geocoder-url', metavar='URL',
+                        help='Search endpoint of a Nominatim-compatible server (e.g. a self-hosted one)')
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help='Requests per second the server allows (default: 1, as public Nominatim asks)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Requests in flight at once (default: 1)')
+
+
+def make_geocoder(args):
+    """
+    The geocoder chosen by the add_geocoder_arguments() options.
+    
+    Returns:
+        A RoadGeocoder, a CachedGeocoder in front of a GeocodingClient, or
+        None for the default (Nominatim behind the on-disk cache)
+    """
+    if args.roads:
+        print(f"Loading local street index from {args.roads}...")
+        geocoder = RoadGeocoder.from_geojson(args.roads)
+        print(f"Indexed {len(geocoder):,} street names")
+        return geocoder
+    if args.geocoder_url or args.rate != 1.0 or args.concurrency != 1:
+        client = GeocodingClient(args.geocoder_url or NOMINATIM_URL, rate=args.rate,
+                                 concurrency=args.concurrency)
+        return CachedGeocoder(client)
+    return None
+
+
+def make_street_index(args, geocoder):
+    """
+    The StreetIndex chosen by --fuzzy-streets, or None if it wasn't given.
+    
+    Streets come from the GeoJSON file named by the option, or else from the
+    --roads index if one is used, or else from ROADS_FILE. The geocoding
+    cache is not used: it only holds the streets looked up so far, and a real
+    street missing from it would be "corrected" to a neighbour (Mill Rd to
+    Hill Rd) before it is ever geocoded.
+    """
+    if not args.fuzzy_streets:
+        return None
+    streets = StreetIndex()
+    if isinstance(args.fuzzy_streets, str):
+        streets.add_roads(RoadGeocoder.from_geojson(args.fuzzy_streets))
+    elif isinstance(geocoder, RoadGeocoder):
+        streets.add_roads(geocoder)
+    else:
+        streets.add_roads(RoadGeocoder.from_geojson(ROADS_FILE))
+    print(f"Fuzzy street matching against {len(streets):,} known streets")
+    return streets
+
+
 def main():
-    input_file = "County_Foreclosures.csv"
-    output_file = "County_Foreclosures_augmented.csv"
+    parser = argparse.ArgumentParser(description="Fill in missing zip codes in the foreclosure data")
+    parser.add_argument('--input', default="County_Foreclosures.csv", help='CSV file to augment')
+    parser.add_argument('--output', default="County_Foreclosures_augmented.csv", help='CSV file to write')
+    add_geocoder_arguments(parser)
+    parser.add_argument('--fuzzy-streets', nargs='?', const=True, metavar='GEOJSON',
+                        help='Correct misspelled street names to the closest known street before geocoding; '
+                             f'streets come from GEOJSON, the --roads file or {ROADS_FILE}')
+    parser.add_argument('--no-resume', dest='resume', action='store_false',
+                        help='Ignore the checkpoint of an earlier interrupted run and start over')
+    parser.add_argument('--json-progress', action='store_true',
+                        help='Write a JSON progress line to stderr every --progress-interval seconds')
+    parser.add_argument('--progress-interval', type=float, default=10.0,
+                        help='Seconds between JSON progress lines (default: 10)')
+    args = parser.parse_args()
+    input_file = args.input
+    output_file = args.output
     
-    # First, count how many need geocoding
-    print("Analyzing input file...")
-    total_rows, missing_zips = count_missing_zips(input_file)
+    geocoder = make_geocoder(args)
+    streets = make_street_index(args, geocoder)
     
+    # The file is read once; row counts are reported as it goes
     print("Starting full CSV augmentation with geocoding...")
     print("=" * 60)
-    print(f"Total rows in CSV: {total_rows:,}")
-    print(f"Rows with missing zip codes: {missing_zips:,}")
-    print(f"Percentage missing: {missing_zips/total_rows*100:.1f}%")
-    print(f"Estimated time at 1 request/second: {missing_zips/60:.1f} minutes")
+    if isinstance(geocoder, CachedGeocoder):
+        print(f"Geocoding at up to {args.rate:g} requests/second, {args.concurrency} in flight")
+        print("Addresses geocoded on earlier runs are answered from the local cache")
+    elif geocoder is None:
+        print("This will take a while due to API rate limiting (1 request per second)")
+        print("Addresses geocoded on earlier runs are answered from the local cache")
     print("=" * 60)
-    print("This will take a while due to API rate limiting (1 request per second)")
     print("Press Ctrl+C to stop at any time - partial results will be saved")
     print()
     
     try:
-        augment_foreclosures_csv(input_file, output_file)
+        augment_foreclosures_csv(input_file, output_file, geocoder, resume=args.resume,
+                                 stats=PipelineStats(sys.stderr if args.json_progress else None,
+                                                     args.progress_interval),
+                                 streets=streets)
     except KeyboardInterrupt:
         print(f"\n\nProcess interrupted by user.")
         print(f"Partial results have been saved to {output_file}")
+        print("Run again with the same --output to resume where it stopped")
         sys.exit(0)
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Checkpoint journal for augment_foreclosures_csv().
+
+Augmenting the full foreclosure file takes hours at Nominatim's one request
+per second, and a crash, API outage or Ctrl+C used to mean starting over.
+AugmentJournal records every address whose zip code has been settled in a
+SQLite file next to the output (see journal_filename()), committed after
+each batch, so the next run only geocodes the addresses that are left. The
+journal is removed once a run completes.
+
+Addresses the geocoder could not find are not recorded, so they are tried
+again on the next run (a failed request looks the same as a miss).
+"""
+
+import os
+import sqlite3
+
+
+def journal_filename(output_filename):
+    """Sidecar journal file for an output CSV."""
+    return output_filename + ".journal.sqlite"
+
+
+class AugmentJournal:
+    """SQLite table of settled addresses, keyed by canonical_address_key()."""
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename: SQLite file to use; created if it doesn't exist.
+        """
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS resolved (
+                number TEXT, street TEXT, city TEXT, state TEXT, zip_code TEXT,
+                PRIMARY KEY (number, street, city, state)
+            )""")
+        self.connection.commit()
+
+    def load(self):
+        """
+        Returns:
+            dict: canonical key -> zip code, or None if the zip code found was
+            outside Prince George's County
+        """
+        rows = self.connection.execute("SELECT number, street, city, state, zip_code FROM resolved")
+        return {tuple(row[:4]): row[4] for row in rows}
+
+    def record(self, results):
+        """
+        Record a batch of settled addresses in one transaction.
+
+        Args:
+            results: Iterable of (key, zip_code) pairs
+        """
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO resolved VALUES (?, ?, ?, ?, ?)",
+                                        [(*key, zip_code) for key, zip_code in results])
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM resolved").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def remove(self):
+        """Close and delete the journal, once the output is complete."""
+        self.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Registry of named boundary polygons (counties, ZCTAs, ...) with a binary cache.
+
+check_pg_county.py handles the one Prince George's County polygon. To check
+points against many boundaries, BoundaryRegistry loads any number of named
+polygons from GeoJSON files and answers "which boundary contains this
+point" through an STRtree over their bounding boxes.
+
+Parsing a large GeoJSON file with json.load() and shape() is slow, so the
+first load of a file also writes a SQLite cache next to it (see
+cache_filename()) holding each boundary's name, bounds and WKB. Later
+loads read the cache instead, and a boundary's WKB is only decoded when a
+point falls inside its bounding box. The cache is rebuilt whenever the
+GeoJSON file changes.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from collections import Counter
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from check_pg_county import are_in_pg_county, is_in_pg_county
+
+CACHE_SUFFIX = ".boundaries.sqlite"
+
+
+def cache_filename(geojson_path):
+    """Binary cache file for a GeoJSON boundary file."""
+    return geojson_path + CACHE_SUFFIX
+
+
+def read_geojson_boundaries(geojson_path, name_property=None):
+    """
+    Read the named polygons of a GeoJSON file.
+
+    Args:
+        geojson_path: A FeatureCollection (or single Feature) of polygons.
+        name_property: Feature property holding each boundary's name (default:
+            the first property of each feature, or its position if it has none).
+
+    Returns:
+        list: (name, geometry) pairs in file order
+
+    Raises:
+        ValueError: If two features have the same name (e.g. a county file
+            whose first property is STATEFP), so pass the name_property that
+            tells them apart.
+    """
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    boundaries = []
+    for position, feature in enumerate(features):
+        properties = feature.get('properties') or {}
+        if name_property is not None:
+            name = properties[name_property]
+        else:
+            name = next(iter(properties.values()), position)
+        boundaries.append((str(name), shape(feature['geometry'])))
+    duplicates = [name for name, count in Counter(name for name, _ in boundaries).items() if count > 1]
+    if duplicates:
+        property_name = f"property {name_property!r}" if name_property is not None else "first property"
+        raise ValueError(f"{geojson_path}: {len(duplicates)} names are shared by several features "
+                         f"(e.g. {duplicates[0]!r}) in the {property_name}; pass a name_property that "
+                         "is unique to each feature")
+    return boundaries
+
+
+def _source_stamp(geojson_path, name_property):
+    status = os.stat(geojson_path)
+    return status.st_size, status.st_mtime_ns, name_property or ''
+
+
+def _read_cache(filename, stamp):
+    """Rows (name, min_x, min_y, max_x, max_y, wkb) of an up to date cache, or None."""
+    if not os.path.exists(filename):
+        return None
+    try:
+        connection = sqlite3.connect(filename)
+        try:
+            if connection.execute("SELECT size, mtime_ns, name_property FROM source").fetchone() != stamp:
+                return None
+            return connection.execute(
+                "SELECT name, min_x, min_y, max_x, max_y, wkb FROM boundaries ORDER BY position").fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+
+
+def _write_cache(filename, stamp, boundaries):
+    """Replace the cache with (name, geometry) boundaries."""
+    if os.path.exists(filename):
+        os.remove(filename)
+    connection = sqlite3.connect(filename)
+    try:
+        with connection:
+            connection.execute("CREATE TABLE source (size INTEGER, mtime_ns INTEGER, name_property TEXT)")
+            connection.execute("""
+                CREATE TABLE boundaries (
+                    position INTEGER PRIMARY KEY, name TEXT,
+                    min_x REAL, min_y REAL, max_x REAL, max_y REAL, wkb BLOB
+                )""")
+            connection.execute("INSERT INTO source VALUES (?, ?, ?)", stamp)
+            connection.executemany(
+                "INSERT INTO boundaries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(position, name, *geometry.bounds, shapely.to_wkb(geometry))
+                 for position, (name, geometry) in enumerate(boundaries)])
+    finally:
+        connection.close()
+
+
+class BoundaryRegistry:
+    """
+    Named boundary polygons with a spatial index over their bounding boxes.
+
+    Containment follows is_in_pg_county(): points on a boundary's edge and
+    None/NaN coordinates are not inside it.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.positions = {}
+        self.bounds = []
+        self._wkb = []
+        self._geometries = []
+        self._tree = None
+
+    def add(self, name, geometry=None, bounds=None, wkb=None, replace=False):
+        """
+        Add a boundary.
+
+        Pass either a shapely geometry, or its bounds and WKB to decode it
+        only when it is first needed. A name that is already in the registry
+        raises ValueError, unless replace is True.
+        """
+        if geometry is not None:
+            bounds = geometry.bounds
+        elif bounds is None or wkb is None:
+            raise ValueError("add() needs a geometry, or both bounds and wkb")
+        position = self.positions.get(name)
+        if position is not None and not replace:
+            raise ValueError(f"A boundary named {name!r} is already in the registry")
+        if position is None:
+            position = self.positions[name] = len(self.names)
+            self.names.append(name)
+            self.bounds.append(None)
+            self._wkb.append(None)
+            self._geometries.append(None)
+        self.bounds[position] = tuple(bounds)
+        self._wkb[position] = wkb
+        self._geometries[position] = geometry
+        self._tree = None
+
+    def load(self, geojson_path, name_property=None, cache=True):
+        """
+        Add every boundary in a GeoJSON file, using (and refreshing) its binary cache.
+
+        Args:
+            geojson_path: GeoJSON file of polygons.
+            name_property: Feature property holding each boundary's name.
+            cache: Read and write the cache file; False always parses the GeoJSON.
+                A cache that can't be written (read-only directory, ...) is
+                skipped with a warning.
+
+        Returns:
+            list: Names of the boundaries loaded
+
+        Raises:
+            ValueError: If names repeat within the file (see
+                read_geojson_boundaries()) or are already in the registry;
+                nothing is added then.
+        """
+        stamp = _source_stamp(geojson_path, name_property)
+        filename = cache_filename(geojson_path)
+        rows = _read_cache(filename, stamp) if cache else None
+        if rows is not None:
+            # (name, geometry, bounds, wkb): decode each WKB when it is first needed
+            boundaries = [(name, None, bounds, wkb) for name, *bounds, wkb in rows]
+        else:
+            parsed = read_geojson_boundaries(geojson_path, name_property)
+            if cache:
+                try:
+                    _write_cache(filename, stamp, parsed)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Warning: could not write boundary cache {filename}: {e}", file=sys.stderr)
+            boundaries = [(name, geometry, None, None) for name, geometry in parsed]
+        clashes = [boundary[0] for boundary in boundaries if boundary[0] in self.positions]
+        if clashes:
+            raise ValueError(f"{geojson_path}: {len(clashes)} boundaries are already in the registry "
+                             f"(e.g. {clashes[0]!r})")
+        for name, geometry, bounds, wkb in boundaries:
+            self.add(name, geometry, bounds, wkb)
+        return [boundary[0] for boundary in boundaries]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def _geometry(self, position):
+        geometry = self._geometries[position]
+        if geometry is None:
+            geometry = self._geometries[position] = shapely.from_wkb(self._wkb[position])
+            self._wkb[position] = None
+        # Preparing builds an edge index once, so each point costs O(log n)
+        shapely.prepare(geometry)
+        return geometry
+
+    def get(self, name):
+        """The (prepared) geometry of a named boundary; KeyError if unknown."""
+        return self._geometry(self.positions[name])
+
+    def contains(self, name, latitude, longitude):
+        """Whether a named boundary contains a point."""
+        return is_in_pg_county(latitude, longitude, self.get(name))
+
+    def are_in(self, name, latitudes, longitudes):
+        """Vectorized contains(): boolean array, True for each point inside the named boundary."""
+        return are_in_pg_county(latitudes, longitudes, self.get(name))
+
+    def _index(self):
+        if self._tree is None:
+            boxes = shapely.box(*np.asarray(self.bounds, dtype=float).reshape(-1, 4).T)
+            self._tree = shapely.STRtree(boxes)
+        return self._tree
+
+    def locate(self, latitude, longitude):
+        """
+        Names of every boundary containing a point, in registry order.
+
+        Returns:
+            list: Names (empty if none contains the point or it is invalid)
+        """
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            return []
+        candidates = sorted(self._index().query(shapely.points(longitude, latitude)))
+        return [self.names[position] for position in candidates
+                if shapely.contains_xy(self._geometry(position), longitude, latitude)]
+
+    def locate_many(self, latitudes, longitudes):
+        """
+        Vectorized locate(): the first boundary (in registry order) containing each point.
+
+        Returns:
+            list: A name, or None, for each point
+        """
+        lats = np.asarray(latitudes, dtype=float)
+        lons = np.asarray(longitudes, dtype=float)
+        found = np.full(lats.shape, -1)
+        valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        if len(self) and valid.size:
+            point_index, boundary_index = self._index().query(shapely.points(lons[valid], lats[valid]))
+            point_index = valid[point_index]
+            # Group the candidate points by boundary, in registry order so the first match wins
+            order = np.argsort(boundary_index, kind='stable')
+            point_index, boundary_index = point_index[order], boundary_index[order]
+            starts = np.flatnonzero(np.diff(boundary_index, prepend=-1))
+            ends = np.append(starts[1:], boundary_index.size)
+            for start, end in zip(starts, ends):
+                points = point_index[start:end]
+                points = points[found[points] < 0]
+                if points.size:
+                    inside = shapely.contains_xy(self._geometry(boundary_index[start]), lons[points], lats[points])
+                    found[points[inside]] = boundary_index[start]
+        return [self.names[position] if position >= 0 else None for position in found]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find which boundaries contain a point")
+    parser.add_argument('latitude', type=float)
+    parser.add_argument('longitude', type=float)
+    parser.add_argument('--boundaries', nargs='+', default=['pg_county_boundary.geojson'],
+                        metavar='GEOJSON', help='GeoJSON boundary files to load')
+    parser.add_argument('--name-property', help='Feature property holding each boundary name')
+    args = parser.parse_args()
+
+    registry = BoundaryRegistry()
+    for path in args.boundaries:
+        registry.load(path, args.name_property)
+    print(f"Loaded {len(registry):,} boundaries")
+    print(registry.locate(args.latitude, args.longitude) or "No boundary contains this point")
+
+
+if __name__ == "__main__":
+    main()
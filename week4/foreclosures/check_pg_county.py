@@ -1,8 +1,13 @@
+import argparse
 import json
+import time
+
+import numpy as np
+import shapely
 from shapely.geometry import Point, shape
 
-# Internal cache for the loaded PG County polygon
-_PG_POLYGON_CACHE = None
+# PG County polygons loaded through the BoundaryRegistry cache, by file path
+_PG_POLYGONS = {}
 
 def load_pg_county_polygon(geojson_path: str):
     """
@@ -62,20 +67,125 @@ def is_in_pg_county(latitude: float, longitude: float, county_polygon) -> bool:
         # Handle any invalid coordinate values (NaN, inf, etc.)
         return False
 
+def are_in_pg_county(latitudes, longitudes, county_polygon) -> np.ndarray:
+    """
+    Vectorized is_in_pg_county() for many points at once.
+
+    Points outside the polygon's bounding box are rejected with NumPy
+    comparisons; the rest are tested in one shapely.contains_xy() call
+    against the prepared polygon.
+
+    Args:
+        latitudes: Sequence or array of latitudes.
+        longitudes: Sequence or array of longitudes, the same length.
+        county_polygon: The pre-loaded shapely geometry object for the county.
+
+    Returns:
+        Boolean array, True for each point inside the county. None and NaN
+        coordinates give False, as in is_in_pg_county().
+    """
+    lats = np.asarray(latitudes, dtype=float)
+    lons = np.asarray(longitudes, dtype=float)
+    inside = np.zeros(lats.shape, dtype=bool)
+    if county_polygon is None:
+        return inside
+
+    # Bounding box prefilter (comparisons with NaN are False)
+    min_lon, min_lat, max_lon, max_lat = county_polygon.bounds
+    candidates = (lons >= min_lon) & (lons <= max_lon) & (lats >= min_lat) & (lats <= max_lat)
+    if candidates.any():
+        # Preparing builds an edge index once, so each point costs O(log n)
+        shapely.prepare(county_polygon)
+        inside[candidates] = shapely.contains_xy(county_polygon, lons[candidates], lats[candidates])
+    return inside
+
 def get_pg_county_polygon(path: str = 'pg_county_boundary.geojson'):
-    """Return cached PG County polygon, loading once if needed."""
-    global _PG_POLYGON_CACHE
-    if _PG_POLYGON_CACHE is None:
-        _PG_POLYGON_CACHE = load_pg_county_polygon(path)
-    return _PG_POLYGON_CACHE
+    """
+    Return the PG County polygon (the first boundary in the file), loading it
+    once per path through BoundaryRegistry. The GeoJSON is parsed in memory,
+    without BoundaryRegistry's cache file, so nothing is written next to it.
+
+    Returns None, like load_pg_county_polygon(), if the file can't be read.
+    """
+    if path not in _PG_POLYGONS:
+        # boundary_registry imports this module, so import it on first use
+        from boundary_registry import BoundaryRegistry
+        registry = BoundaryRegistry()
+        try:
+            names = registry.load(path, cache=False)
+        except FileNotFoundError:
+            print(f"Error: The file '{path}' was not found.")
+            return None
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            print(f"Error reading or parsing GeoJSON file: {e}")
+            return None
+        if not names:
+            print("Error reading or parsing GeoJSON file: it has no features")
+            return None
+        _PG_POLYGONS[path] = registry.get(names[0])
+    return _PG_POLYGONS[path]
 
 def is_in_pg(latitude: float, longitude: float, path: str = 'pg_county_boundary.geojson') -> bool:
     """Convenience wrapper: load (cached) polygon and test point inclusion."""
     polygon = get_pg_county_polygon(path)
     return is_in_pg_county(latitude, longitude, polygon)
 
+def are_in_pg(latitudes, longitudes, path: str = 'pg_county_boundary.geojson') -> np.ndarray:
+    """Convenience wrapper: load (cached) polygon and test many points at once."""
+    polygon = get_pg_county_polygon(path)
+    return are_in_pg_county(latitudes, longitudes, polygon)
+
+def benchmark(count: int = 1_000_000, loop_count: int = None, seed: int = 0,
+              path: str = 'pg_county_boundary.geojson'):
+    """
+    Time are_in_pg_county() against a per-point is_in_pg_county() loop.
+
+    The points are uniform over the county's bounding box with a margin of
+    0.2 degrees on every side, so most land outside the county.
+
+    Args:
+        count: Number of random points.
+        loop_count: Time the per-point loop on only this many of the points
+            and extrapolate (the loop takes about 25 s per million points).
+        seed: Random seed.
+        path: County boundary GeoJSON file.
+    """
+    polygon = load_pg_county_polygon(path)
+    if polygon is None:
+        return
+    rng = np.random.default_rng(seed)
+    min_lon, min_lat, max_lon, max_lat = polygon.bounds
+    lats = rng.uniform(min_lat - 0.2, max_lat + 0.2, count)
+    lons = rng.uniform(min_lon - 0.2, max_lon + 0.2, count)
+    loop_count = min(count, loop_count or count)
+
+    start = time.perf_counter()
+    looped = [is_in_pg_county(lat, lon, polygon) for lat, lon in zip(lats[:loop_count], lons[:loop_count])]
+    loop_time = (time.perf_counter() - start) * count / loop_count
+
+    start = time.perf_counter()
+    inside = are_in_pg_county(lats, lons, polygon)
+    vector_time = time.perf_counter() - start
+
+    assert np.array_equal(inside[:loop_count], looped), "Vectorized results differ from the loop"
+    print(f"{count:,} random points, {inside.mean():.1%} inside the county")
+    print(f"Per-point loop: {loop_time:8.3f} s{' (extrapolated)' if loop_count < count else ''}"
+          f"  {loop_time / count * 1e6:7.3f} us/point")
+    print(f"are_in_pg:      {vector_time:8.3f} s  {vector_time / count * 1e6:7.3f} us/point"
+          f"  ({loop_time / vector_time:,.0f}x faster)")
+
 # --- Main execution block for demonstration ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check points against the Prince George's County boundary")
+    parser.add_argument('--benchmark', type=int, nargs='?', const=1_000_000, metavar='POINTS',
+                        help='Time batch checks against the per-point loop (default: 1,000,000 points)')
+    parser.add_argument('--loop-points', type=int,
+                        help='Time the per-point loop on only this many points and extrapolate')
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.benchmark, args.loop_points)
+        raise SystemExit
+
     # Load the county boundary polygon once
     pg_county_shape = load_pg_county_polygon('pg_county_boundary.geojson')
 
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Persistent cache for geocoding results.
+
+Geocoding the same foreclosure addresses on every run is slow (Nominatim
+asks for at most one request per second). CachedGeocoder wraps any
+geocoding backend with the signature of geocode_address_nominatim() and
+keeps its answers in a SQLite file, so a re-run only goes to the backend
+for addresses it has not seen. Addresses the backend could not find are
+cached too, but only for negative_ttl seconds, so they are retried later.
+Lookups that failed (GEOCODING_FAILED, e.g. during an outage) are not
+cached at all.
+
+LocalGeocoder is a stand-in backend that answers from a table in memory,
+for working offline and for tests.
+"""
+
+import csv
+import sqlite3
+import time
+
+from geocoding_utils import GeocodingFailure, geocode_address_nominatim
+from pipeline_stats import LatencyHistogram
+
+DEFAULT_CACHE_FILE = "geocode_cache.sqlite"
+# Retry addresses that could not be geocoded after 30 days
+DEFAULT_NEGATIVE_TTL = 30 * 24 * 60 * 60
+# Seconds between requests to Nominatim, as its usage policy asks
+NOMINATIM_INTERVAL = 1.0
+
+
+def normalize_geocode_key(street_number, street_name, street_type, city, state):
+    """
+    Normalize the parts of an address so equivalent spellings share a cache entry.
+
+    Returns:
+        tuple: (number, name, kind, city, state) upper-cased with whitespace
+        collapsed; a missing street type becomes an empty string.
+    """
+    return tuple(' '.join(str(part or '').upper().split())
+                 for part in (street_number, street_name, street_type, city, state))
+
+
+class GeocodeCache:
+    """SQLite table of geocoding results keyed by normalize_geocode_key()."""
+
+    def __init__(self, filename=DEFAULT_CACHE_FILE, negative_ttl=DEFAULT_NEGATIVE_TTL, clock=time.time):
+        """
+        Args:
+            filename: SQLite file to use; ':memory:' keeps the cache in memory.
+            negative_ttl: Seconds a "not found" result stays valid, or None to keep it forever.
+            clock: Function returning the current time in seconds.
+        """
+        self.filename = filename
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                number TEXT, name TEXT, kind TEXT, city TEXT, state TEXT,
+                zip_code TEXT, confidence REAL, fetched_at REAL NOT NULL,
+                PRIMARY KEY (number, name, kind, city, state)
+            )""")
+        self.connection.commit()
+
+    def get(self, key):
+        """
+        Look up a normalized key.
+
+        Returns:
+            tuple: (zip_code, confidence), which are (None, None) for a cached
+            "not found", or None if the key is not cached or its negative
+            result has expired.
+        """
+        row = self.connection.execute(
+            "SELECT zip_code, confidence, fetched_at FROM geocodes "
+            "WHERE number = ? AND name = ? AND kind = ? AND city = ? AND state = ?", key).fetchone()
+        if row is None:
+            return None
+        zip_code, confidence, fetched_at = row
+        if zip_code is None and self.negative_ttl is not None \
+                and self.clock() - fetched_at > self.negative_ttl:
+            return None
+        return zip_code, confidence
+
+    def put(self, key, zip_code, confidence):
+        """Store a result (zip_code None for "not found") for a normalized key."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (*key, zip_code, confidence, self.clock()))
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+class LocalGeocoder:
+    """
+    Offline stand-in for geocode_address_nominatim() that answers from a table.
+
+    Addresses are matched by normalize_geocode_key(), and every call is
+    counted in calls so tests can check what reached the backend.
+    """
+
+    def __init__(self, results=None):
+        """
+        Args:
+            results: Dict mapping (number, name, kind, city, state) to
+                (zip_code, confidence) or just a zip code.
+        """
+        self.results = {}
+        self.calls = 0
+        for key, value in (results or {}).items():
+            self.add(*key, value)
+
+    def add(self, street_number, street_name, street_type, city, state, result):
+        if not isinstance(result, tuple):
+            result = (result, 1.0)
+        self.results[normalize_geocode_key(street_number, street_name, street_type, city, state)] = result
+
+    def __call__(self, street_number, street_name, street_type, city, state):
+        self.calls += 1
+        key = normalize_geocode_key(street_number, street_name, street_type, city, state)
+        return self.results.get(key, (None, None))
+
+    @classmethod
+    def from_results_csv(cls, filename):
+        """Build a LocalGeocoder from the geocoding_results.csv written by test_geocoding_missing_zips.py."""
+        geocoder = cls()
+        with open(filename, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                if row['found_zip']:
+                    confidence = float(row['confidence']) if row['confidence'] else None
+                    geocoder.add(row['parsed_number'], row['parsed_name'], row['parsed_kind'],
+                                 row['city'], row['state'], (row['found_zip'], confidence))
+        return geocoder
+
+
+class CachedGeocoder:
+    """
+    A geocoding backend with a GeocodeCache in front of it.
+
+    Call it like geocode_address_nominatim(). Only cache misses reach the
+    backend, and those are spaced at least min_interval seconds apart, so
+    callers don't need to sleep between addresses. geocode_many() looks up
+    a list of addresses, passing all the misses to the backend's own
+    geocode_many() if it has one (e.g. GeocodingClient, which does its own
+    rate limiting).
+    """
+
+    def __init__(self, backend=geocode_address_nominatim, cache=None, min_interval=None):
+        """
+        Args:
+            backend: Function with the signature of geocode_address_nominatim().
+            cache: GeocodeCache to use (default: one in DEFAULT_CACHE_FILE).
+            min_interval: Seconds between backend calls (default: NOMINATIM_INTERVAL
+                for Nominatim, 0 for any other backend).
+        """
+        self.backend = backend
+        self.cache = cache if cache is not None else GeocodeCache()
+        if min_interval is None:
+            min_interval = NOMINATIM_INTERVAL if backend is geocode_address_nominatim else 0.0
+        self.min_interval = min_interval
+        self.last_call = None
+        self.hits = 0
+        self.misses = 0
+        # Total seconds slept to keep min_interval between backend calls, and
+        # the duration of each backend call (cache hits and sleeps left out)
+        self.slept = 0.0
+        self.latency = LatencyHistogram()
+
+    def __call__(self, street_number, street_name, street_type, city, state):
+        """
+        Returns:
+            tuple: (zip_code, confidence_score) or (None, None) if not found
+        """
+        key = normalize_geocode_key(street_number, street_name, street_type, city, state)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        if self.last_call is not None and self.min_interval:
+            wait = self.min_interval - (time.monotonic() - self.last_call)
+            if wait > 0:
+                self.slept += wait
+                time.sleep(wait)
+        start = time.perf_counter()
+        result = self.backend(street_number, street_name, street_type, city, state)
+        self.latency.add(time.perf_counter() - start)
+        self.last_call = time.monotonic()
+        if not isinstance(result, GeocodingFailure):
+            self.cache.put(key, *result)
+        return result
+
+    def geocode_many(self, addresses):
+        """
+        Geocode a list of (number, name, kind, city, state) tuples.
+
+        Returns:
+            list: (zip_code, confidence_score) for each address, in the same order
+        """
+        addresses = list(addresses)
+        backend_many = getattr(self.backend, 'geocode_many', None)
+        if backend_many is None:
+            return [self(*address) for address in addresses]
+        results = [None] * len(addresses)
+        misses = {}
+        for index, address in enumerate(addresses):
+            key = normalize_geocode_key(*address)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.hits += 1
+                results[index] = cached
+            else:
+                misses.setdefault(key, []).append(index)
+        self.misses += len(misses)
+        keys = list(misses)
+        found = backend_many([addresses[misses[key][0]] for key in keys])
+        for key, result in zip(keys, found):
+            if not isinstance(result, GeocodingFailure):
+                self.cache.put(key, *result)
+            for index in misses[key]:
+                results[index] = result
+        return results
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Concurrent, rate-limited client for Nominatim-compatible geocoding servers.
+
+geocode_address_nominatim() opens a new connection for every address and
+relies on the caller to sleep a second between requests, which is what the
+public Nominatim server asks for. A self-hosted instance can take far more,
+so GeocodingClient lets the server's limits set the pace instead:
+
+- a TokenBucket spaces requests to rate per second (with bursts of up to
+  burst requests), shared by all worker threads;
+- at most concurrency requests are in flight at once;
+- one requests.Session with a connection pool of that size keeps
+  connections alive between requests;
+- 429 and 5xx responses and connection errors are retried with exponential
+  backoff, honouring the server's Retry-After header;
+- geocode_many() returns results in the order the addresses were given.
+
+A client can be called like geocode_address_nominatim(), and used behind
+CachedGeocoder, whose geocode_many() passes the cache misses on to it.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from geocoding_utils import (GEOCODING_FAILED, NOMINATIM_HEADERS, NOMINATIM_URL, nominatim_params,
+                             parse_nominatim_response)
+from pipeline_stats import LatencyHistogram
+
+# Status codes worth retrying: rate limited, or the server is having trouble
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Longest wait for a Retry-After header, so a misbehaving server can't stall a run
+MAX_RETRY_AFTER = 60.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: acquire() blocks until a request may be sent.
+
+    Tokens are added at rate per second up to burst, so on average rate
+    requests per second go out, with short bursts of up to burst requests.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate: Requests per second, or None for no limit.
+            burst: Most requests that may be sent back to back.
+            clock: Function returning the current time in seconds.
+            sleep: Function sleeping for a number of seconds.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self.lock = threading.Lock()
+        # Total seconds callers have waited for a token
+        self.waited = 0.0
+
+    def acquire(self):
+        """Take one token, waiting until one is available."""
+        if self.rate is None:
+            return
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now so waiting threads queue up behind each other
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+        if wait > 0:
+            self.sleep(wait)
+
+
+def retry_after(response):
+    """Seconds asked for by a response's Retry-After header, or None."""
+    value = response.headers.get('Retry-After')
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class GeocodingClient:
+    """
+    Geocoder for a Nominatim-compatible search endpoint with pooled connections.
+
+    Call it like geocode_address_nominatim(), or use geocode_many() to look
+    up a list of addresses concurrently.
+    """
+
+    def __init__(self, url=NOMINATIM_URL, rate=1.0, burst=1, concurrency=1, max_retries=3,
+                 backoff=1.0, timeout=15, headers=None):
+        """
+        Args:
+            url: Search endpoint of the server.
+            rate: Requests per second the server allows, or None for no limit.
+            burst: Requests that may be sent back to back before rate applies.
+            concurrency: Most requests in flight at once (and connections kept open).
+            max_retries: Retries of a request after a 429/5xx response or connection error.
+            backoff: Seconds before the first retry; doubled for each further retry.
+            timeout: Seconds to wait for each response.
+            headers: HTTP headers to send (default: NOMINATIM_HEADERS).
+        """
+        self.url = url
+        self.limiter = TokenBucket(rate, burst)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(headers or NOMINATIM_HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.requests = 0
+        self.retries = 0
+        # Latency of each HTTP request, and seconds slept backing off before retries
+        self.latency = LatencyHistogram()
+        self.slept = 0.0
+        self.counts_lock = threading.Lock()
+
+    def _count(self, retry=False):
+        with self.counts_lock:
+            if retry:
+                self.retries += 1
+            else:
+                self.requests += 1
+
+    def _get(self, params):
+        """Send one search, retrying as needed; returns the decoded JSON."""
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self._count()
+            delay = self.backoff * 2 ** attempt
+            start = time.perf_counter()
+            try:
+                response = self.session.get(self.url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            else:
+                with self.counts_lock:
+                    self.latency.add(time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.json()
+                wait = retry_after(response)
+                if wait is not None:
+                    delay = wait
+            self._count(retry=True)
+            with self.counts_lock:
+                self.slept += delay
+            time.sleep(delay)
+
+    def geocode(self, street_number, street_name, street_type, city, state):
+        """
+        Same signature and result as geocode_address_nominatim().
+
+        Returns:
+            tuple: (zip_code, confidence_score), (None, None) if not found, or
+            GEOCODING_FAILED if the request failed after its retries
+        """
+        params = nominatim_params(street_number, street_name, street_type, city, state)
+        try:
+            return parse_nominatim_response(self._get(params))
+        except requests.RequestException as e:
+            print(f"Geocoding request failed: {e}", file=sys.stderr)
+            return GEOCODING_FAILED
+        except ValueError as e:
+            print(f"Error processing geocoding response: {e}", file=sys.stderr)
+            return GEOCODING_FAILED
+
+    __call__ = geocode
+
+    def geocode_many(self, addresses):
+        """
+        Geocode a list of addresses, up to concurrency at a time.
+
+        Args:
+            addresses: Iterable of (number, name, kind, city, state) tuples
+
+        Returns:
+            list: (zip_code, confidence_score) for each address, in the same order
+        """
+        addresses = list(addresses)
+        if self.concurrency == 1 or len(addresses) < 2:
+            return [self.geocode(*address) for address in addresses]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(addresses))) as executor:
+            return list(executor.map(lambda address: self.geocode(*address), addresses))
+
+    def close(self):
+        self.session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode addresses against a Nominatim-compatible server")
+    parser.add_argument('addresses', nargs='+', help='Street addresses, e.g. "123 Main St"')
+    parser.add_argument('--city', default='', help='City of the addresses')
+    parser.add_argument('--url', default=NOMINATIM_URL, help='Search endpoint of the server')
+    parser.add_argument('--rate', type=float, default=1.0, help='Requests per second (default: 1)')
+    parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight at once (default: 1)')
+    args = parser.parse_args()
+
+    from parse_address import parse_address_for_geocoding
+    client = GeocodingClient(args.url, rate=args.rate, concurrency=args.concurrency)
+    parsed = [parse_address_for_geocoding(address) for address in args.addresses]
+    start = time.perf_counter()
+    results = client.geocode_many([(*parts, args.city, 'MD') for parts in parsed])
+    for address, (zip_code, confidence) in zip(args.addresses, results):
+        print(f"{address}: {zip_code} (confidence {confidence})")
+    print(f"{client.requests} requests ({client.retries} retries) in {time.perf_counter() - start:.1f}s")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
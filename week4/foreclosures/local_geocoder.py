@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Offline geocoding from county road or address point data.
+
+RoadGeocoder builds an in-memory index from a GeoJSON file of road segments
+(with house number ranges and zip codes) or address points (one house
+number each): every street name variation from normalize_street_name() maps
+to that street's segments, sorted by house number. Looking up an address is
+then a dict lookup plus a bisect, so a whole file can be augmented in
+seconds with no network and no rate limit. It can be used anywhere
+geocode_address_nominatim() is, including behind CachedGeocoder.
+
+Attribute names differ between data sources, so each one is looked up
+under several common names (see DEFAULT_FIELDS); pass fields to override.
+"""
+
+import argparse
+import json
+import re
+from bisect import bisect_right
+
+from parse_address import STREET_TYPES, normalize_street_name
+
+# Candidate attribute names for each value, tried in order (case-insensitive)
+DEFAULT_FIELDS = {
+    'name': ['STREET_NAME', 'ST_NAME', 'ROAD_NAME', 'RD_NAME', 'STREETNAME', 'FULLNAME', 'NAME'],
+    'type': ['STREET_TYPE', 'ST_TYPE', 'ROAD_TYPE', 'STREETTYPE', 'SUFFIX', 'ST_SUFFIX', 'TYPE'],
+    'number': ['ADDRESS_NUMBER', 'ADDR_NUM', 'HOUSE_NUMBER', 'ST_NUM', 'ADDRNUM'],
+    'left_from': ['L_F_ADD', 'FROM_LEFT', 'FROMLEFT', 'L_ADD_FROM', 'LEFT_FROM', 'FRADDL', 'LOW_ADDR', 'FROM_ADDR'],
+    'left_to': ['L_T_ADD', 'TO_LEFT', 'TOLEFT', 'L_ADD_TO', 'LEFT_TO', 'TOADDL', 'HIGH_ADDR', 'TO_ADDR'],
+    'right_from': ['R_F_ADD', 'FROM_RIGHT', 'FROMRIGHT', 'R_ADD_FROM', 'RIGHT_FROM', 'FRADDR'],
+    'right_to': ['R_T_ADD', 'TO_RIGHT', 'TORIGHT', 'R_ADD_TO', 'RIGHT_TO', 'TOADDR'],
+    'zip': ['ZIP', 'ZIP_CODE', 'ZIPCODE', 'POSTAL_CODE', 'ZIP5'],
+    'left_zip': ['ZIP_LEFT', 'L_ZIP', 'ZIPL', 'LEFT_ZIP'],
+    'right_zip': ['ZIP_RIGHT', 'R_ZIP', 'ZIPR', 'RIGHT_ZIP'],
+    'city': ['CITY', 'MUNICIPALITY', 'PLACE_NAME', 'POSTAL_CITY'],
+}
+
+# Confidence of a match whose house number is inside a known range, and of one
+# that only matched the street (the closest range on it was used)
+RANGE_CONFIDENCE = 1.0
+STREET_CONFIDENCE = 0.5
+
+LEADING_DIGITS = re.compile(r'\s*(\d+)')
+
+
+def house_number(value):
+    """The integer part of a house number such as "123", "123A" or "111-B", or None."""
+    if value is None:
+        return None
+    match = LEADING_DIGITS.match(str(value))
+    return int(match.group(1)) if match else None
+
+
+def _lookup(properties, names):
+    """Value of the first attribute in names present in properties, ignoring case, or None."""
+    for name in names:
+        value = properties.get(name)
+        if value in (None, ''):
+            value = properties.get(name.lower())
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _index_keys(name, kind):
+    """Every normalized variation a street is indexed under."""
+    name = str(name)
+    if not kind:
+        # Full names like "MAIN ST" carry the type as their last word
+        words = name.rsplit(None, 1)
+        if len(words) == 2 and words[1].upper() in STREET_TYPES:
+            name, kind = words
+    return normalize_street_name(name, kind)
+
+
+class RoadGeocoder:
+    """
+    Street index answering geocode(number, name, kind, city, state) locally.
+
+    segments maps each normalized street name variation to a list of
+    (low, high, zip_code, city) ranges sorted by low, and streets holds the
+    (name, kind) of every street added.
+    """
+
+    def __init__(self):
+        self.segments = {}
+        self.streets = set()
+        self._sorted = True
+
+    def add_range(self, name, kind, low, high, zip_code, city=None):
+        """Add house numbers low to high (in either order) on a street, all in one zip code."""
+        self.streets.add((str(name), kind or ''))
+        if low is None or high is None or not zip_code:
+            return
+        low, high = min(low, high), max(low, high)
+        entry = (low, high, str(zip_code)[:5], city.upper() if city else None)
+        for key in _index_keys(name, kind):
+            self.segments.setdefault(key, []).append(entry)
+        self._sorted = False
+
+    def add_feature(self, properties, fields=DEFAULT_FIELDS):
+        """Add a GeoJSON feature's properties: a road segment or an address point."""
+        name = _lookup(properties, fields['name'])
+        if not name:
+            return
+        kind = _lookup(properties, fields['type'])
+        city = _lookup(properties, fields['city'])
+        zip_code = _lookup(properties, fields['zip'])
+        number = house_number(_lookup(properties, fields['number']))
+        if number is not None:
+            self.add_range(name, kind, number, number, zip_code, city)
+            return
+        for side in ('left', 'right'):
+            side_zip = _lookup(properties, fields[f'{side}_zip']) or zip_code
+            low = house_number(_lookup(properties, fields[f'{side}_from']))
+            high = house_number(_lookup(properties, fields[f'{side}_to']))
+            if low is not None and high is not None and (low or high):
+                self.add_range(name, kind, low, high, side_zip, city)
+
+    def _sort(self):
+        for entries in self.segments.values():
+            entries.sort(key=lambda entry: (entry[0], entry[1]))
+        self._sorted = True
+
+    def _candidates(self, name, kind):
+        """Segments of the most specific name variation that is indexed."""
+        if not self._sorted:
+            self._sort()
+        for key in reversed(normalize_street_name(name, kind)):
+            entries = self.segments.get(key)
+            if entries:
+                return entries
+        return None
+
+    def __call__(self, street_number, street_name, street_type, city, state):
+        """
+        Same signature and result as geocode_address_nominatim().
+
+        state is accepted for compatibility; the index covers one county.
+
+        Returns:
+            tuple: (zip_code, confidence_score) or (None, None) if not found
+        """
+        entries = self._candidates(street_name, street_type)
+        number = house_number(street_number)
+        if not entries or number is None:
+            return None, None
+        city = city.upper().strip() if city else None
+        if city and any(entry[3] == city for entry in entries):
+            entries = [entry for entry in entries if entry[3] in (city, None)]
+
+        # Ranges starting at or below number, the last ones are the closest
+        end = bisect_right(entries, (number, float('inf')))
+        for low, high, zip_code, _ in reversed(entries[:end]):
+            # Ranges with both ends odd or both even only hold that side of the street
+            if high >= number and (low % 2 != high % 2 or low % 2 == number % 2):
+                return zip_code, RANGE_CONFIDENCE
+        # Not inside any range: use the street's zip code, or the nearest range's if it has several
+        zips = {entry[2] for entry in entries}
+        if len(zips) == 1:
+            return zips.pop(), STREET_CONFIDENCE
+        nearest = min(entries, key=lambda entry: min(abs(entry[0] - number), abs(entry[1] - number)))
+        return nearest[2], STREET_CONFIDENCE
+
+    geocode = __call__
+
+    def __len__(self):
+        return len(self.segments)
+
+    @classmethod
+    def from_geojson(cls, filename, fields=None):
+        """
+        Build an index from a GeoJSON FeatureCollection of roads or address points.
+
+        Args:
+            filename: Path of the GeoJSON file
+            fields: Dict overriding some of DEFAULT_FIELDS, e.g. {'zip': ['ZIPCODE']}
+        """
+        merged = dict(DEFAULT_FIELDS)
+        merged.update(fields or {})
+        geocoder = cls()
+        with open(filename, encoding='utf-8') as file:
+            data = json.load(file)
+        for feature in data.get('features', []):
+            geocoder.add_feature(feature.get('properties') or {}, merged)
+        geocoder._sort()
+        return geocoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up zip codes from a local road or address point file")
+    parser.add_argument('geojson', help='GeoJSON file of road segments or address points')
+    parser.add_argument('address', nargs='+', help='Street address to look up, e.g. 123 Main St')
+    parser.add_argument('--city', default='', help='City of the address')
+    args = parser.parse_args()
+
+    from parse_address import parse_address_for_geocoding
+    geocoder = RoadGeocoder.from_geojson(args.geojson)
+    print(f"Indexed {len(geocoder):,} street names")
+    number, name, kind = parse_address_for_geocoding(' '.join(args.address))
+    if number is None:
+        print("Could not parse address")
+        return
+    print(geocoder(number, name, kind, args.city, 'MD'))
+
+
+if __name__ == "__main__":
+    main()
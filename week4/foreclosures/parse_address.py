@@ -8,11 +8,31 @@ import re
 import csv
 import sys
 
+# House number, optionally followed by a comma (e.g., "789, Unit 5A Elm Court")
+NUMBER_COMMA_PATTERN = re.compile(r'^\s*(\d+(?:[A-Za-z]|[-][A-Za-z])?)\s*,\s*(.+)', re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r'^\s*(\d+(?:[A-Za-z]|[-][A-Za-z])?)\s+(.+)', re.IGNORECASE)
+
+# Unit patterns as one alternation - more specific ones first. Only one of
+# apt/apartment/unit/suite can be the next to last word, so they share a branch.
+UNIT_PATTERN = re.compile(
+    r'(?P<street>.+?)\s+(?P<label>apt|apartment|unit|suite)\s+(?P<id>[^\s,]+)\s*$'
+    r'|(?P<hash_street>.+?)\s+#(?P<hash_id>[^\s,]+)\s*$'
+    r'|(?P<comma_street>.+?),\s*(?P<comma_rest>.+?)$',  # Generic comma
+    re.IGNORECASE)
+
+# Common street types, recognized when they are the last word of the street
+STREET_TYPES = frozenset(['STREET', 'AVE', 'AVENUE', 'DRIVE', 'ROAD', 'COURT', 'CIRCLE', 'PLACE',
+                          'LANE', 'BOULEVARD', 'BLVD', 'TERRACE', 'WAY', 'ST', 'DR', 'RD', 'CT',
+                          'CIR', 'PL', 'LN', 'TER'])
+
+
 def parse_address(address):
     """
     Parse a street address into components: number, name, unit, kind
     
     Enhanced version that combines robust parsing with clean output for various use cases.
+    All patterns are compiled once at import, and the street type is found
+    with a set lookup on the last word instead of one regex per type.
     
     Args:
         address (str): The street address to parse
@@ -32,57 +52,36 @@ def parse_address(address):
     # Clean up the address - normalize whitespace
     address = ' '.join(address.split())
     
-    # Step 1: Handle comma after number (e.g., "789, Unit 5A Elm Court")
-    comma_match = re.match(r'^\s*(\d+(?:[A-Za-z]|[-][A-Za-z])?)\s*,\s*(.+)', address, re.IGNORECASE)
-    if comma_match:
-        number = comma_match.group(1)
-        remainder = comma_match.group(2).strip()
-    else:
-        # Step 1b: Extract house number normally
-        number_match = re.match(r'^\s*(\d+(?:[A-Za-z]|[-][A-Za-z])?)\s+(.+)', address, re.IGNORECASE)
-        if not number_match:
-            return None, None, None, None
-        
-        number = number_match.group(1)
-        remainder = number_match.group(2).strip()
+    # Step 1: Handle comma after number, otherwise extract house number normally
+    number_match = NUMBER_COMMA_PATTERN.match(address) or NUMBER_PATTERN.match(address)
+    if not number_match:
+        return None, None, None, None
+    number = number_match.group(1)
+    remainder = number_match.group(2).strip()
     
     # Step 2: Look for unit patterns and extract them
     unit = ""
     street_part = remainder
+    match = UNIT_PATTERN.match(remainder)
+    if match:
+        if match.group('street') is not None:
+            street_part = match.group('street')
+            unit = f"{match.group('label')} {match.group('id')}"
+        elif match.group('hash_street') is not None:
+            street_part = match.group('hash_street')
+            unit = f"#{match.group('hash_id')}"
+        else:
+            street_part = match.group('comma_street')
+            unit = match.group('comma_rest')
+        street_part = street_part.strip()
     
-    # Unit patterns - more specific ones first
-    unit_patterns = [
-        (re.compile(r'(.+?)\s+(apt|apartment)\s+([^\s,]+)\s*$', re.IGNORECASE), lambda m: f"{m.group(2)} {m.group(3)}"),
-        (re.compile(r'(.+?)\s+(unit)\s+([^\s,]+)\s*$', re.IGNORECASE), lambda m: f"{m.group(2)} {m.group(3)}"),
-        (re.compile(r'(.+?)\s+(suite)\s+([^\s,]+)\s*$', re.IGNORECASE), lambda m: f"{m.group(2)} {m.group(3)}"),
-        (re.compile(r'(.+?)\s+#([^\s,]+)\s*$', re.IGNORECASE), lambda m: f"#{m.group(2)}"),
-        (re.compile(r'(.+?),\s*(.+?)$', re.IGNORECASE), lambda m: m.group(2)),  # Generic comma
-    ]
-    
-    for pattern, extractor in unit_patterns:
-        match = pattern.search(remainder)
-        if match:
-            street_part = match.group(1).strip()
-            unit = extractor(match)
-            break
-    
-    # Step 3: Extract street type from the end
+    # Step 3: Extract street type from the last word
     kind = ""
     name = street_part
-    
-    # Common street types (ordered by length to avoid partial matches)
-    street_types = ['STREET', 'AVE', 'AVENUE', 'DRIVE', 'ROAD', 'COURT', 'CIRCLE', 'PLACE', 
-                   'LANE', 'BOULEVARD', 'BLVD', 'TERRACE', 'WAY', 'ST', 'DR', 'RD', 'CT', 
-                   'CIR', 'PL', 'LN', 'TER']
-    
-    # Try to find street type at the end
-    for street_type in street_types:
-        pattern = re.compile(r'^(.+?)\s+' + re.escape(street_type) + r'\s*$', re.IGNORECASE)
-        match = pattern.search(street_part)
-        if match:
-            name = match.group(1).strip().rstrip(',')  # Remove trailing comma
-            kind = street_type.upper()
-            break
+    words = street_part.rsplit(None, 1)
+    if len(words) == 2 and words[1].upper() in STREET_TYPES:
+        name = words[0].strip().rstrip(',')  # Remove trailing comma
+        kind = words[1].upper()
     
     # If no street type found, the whole street_part is the name
     if not kind:
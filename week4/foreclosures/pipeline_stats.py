@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Lightweight instrumentation for the foreclosure pipeline.
+
+PipelineStats collects counters and per-stage latency histograms (reading,
+address parsing, geocoding, validation, writing, ...) while
+augment_foreclosures_csv() runs. It can write a JSON progress line every
+few seconds (rows/sec, geocoder p50/p95, cache hit rate, time spent
+sleeping for rate limits) for other programs to follow, and print a
+profile at the end showing where the time went.
+
+Timing a stage costs two perf_counter() calls, and LatencyHistogram keeps
+counts in log-scale buckets, so memory doesn't grow with the number of rows.
+"""
+
+import json
+import math
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class LatencyHistogram:
+    """
+    Durations in log-scale buckets: BUCKETS_PER_DOUBLING buckets per power of
+    two above MIN_SECONDS, so percentiles are accurate to about 9%.
+    """
+
+    BUCKETS_PER_DOUBLING = 8
+    MIN_SECONDS = 1e-7
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds <= self.MIN_SECONDS:
+            bucket = 0
+        else:
+            bucket = math.ceil(math.log2(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_DOUBLING)
+        self.buckets[bucket] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction (0-1) of durations, or 0.0 if empty."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.max, self.MIN_SECONDS * 2 ** (bucket / self.BUCKETS_PER_DOUBLING))
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {'count': self.count, 'total': round(self.total, 6), 'mean': round(self.mean, 9),
+                'p50': round(self.percentile(0.5), 9), 'p95': round(self.percentile(0.95), 9),
+                'max': round(self.max, 9)}
+
+
+def _geocoder_chain(geocoder):
+    """A geocoder and every backend it wraps (CachedGeocoder.backend, ...)."""
+    while geocoder is not None:
+        yield geocoder
+        geocoder = getattr(geocoder, 'backend', None)
+
+
+class PipelineStats:
+    """Counters, stage timings and progress reporting for one pipeline run."""
+
+    def __init__(self, stream=None, interval=10.0, clock=time.perf_counter):
+        """
+        Args:
+            stream: File to write JSON progress lines to (e.g. sys.stderr), or None
+            interval: Seconds between progress lines
+            clock: Function returning the current time in seconds
+        """
+        self.stream = stream
+        self.interval = interval
+        self.clock = clock
+        self.started = clock()
+        self.last_report = self.started
+        self.counts = Counter()
+        self.stages = {}
+        self.geocoder = None
+
+    def add(self, stage, seconds):
+        """Record one duration of a stage."""
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.add(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """Context manager recording how long its block takes as one duration of stage."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add(stage, self.clock() - start)
+
+    def timed(self, iterable, stage):
+        """Iterate over iterable, recording the time taken to produce each item."""
+        iterator = iter(iterable)
+        clock = self.clock
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.add(stage, clock() - start)
+            yield item
+
+    def watch(self, geocoder):
+        """Report the cache, rate limit and request metrics of a geocoder (and the backends it wraps)."""
+        self.geocoder = geocoder
+
+    def geocoder_metrics(self):
+        """
+        Cache hit rate, rate limit sleeping and request latency of the watched geocoder.
+
+        Request latency comes from the innermost geocoder that has timed any
+        requests: GeocodingClient times each HTTP request, and CachedGeocoder
+        each call to its backend (e.g. geocode_address_nominatim()).
+        """
+        metrics = {}
+        sleeping = 0.0
+        for geocoder in _geocoder_chain(self.geocoder):
+            if hasattr(geocoder, 'hits'):
+                lookups = geocoder.hits + geocoder.misses
+                metrics['cache_hits'] = geocoder.hits
+                metrics['cache_hit_rate'] = round(geocoder.hits / lookups, 4) if lookups else None
+            sleeping += getattr(geocoder, 'slept', 0.0)
+            limiter = getattr(geocoder, 'limiter', None)
+            if limiter is not None:
+                sleeping += limiter.waited
+            latency = getattr(geocoder, 'latency', None)
+            if latency is not None and (latency.count or 'requests' not in metrics):
+                metrics['requests'] = latency.as_dict()
+                retries = getattr(geocoder, 'retries', None)
+                if retries is not None:
+                    metrics['retries'] = retries
+                else:
+                    metrics.pop('retries', None)
+        metrics['rate_limit_sleep'] = round(sleeping, 3)
+        return metrics
+
+    def snapshot(self, event='progress'):
+        """Everything measured so far, as a JSON-serializable dict."""
+        elapsed = self.clock() - self.started
+        rows = self.counts['rows']
+        return {
+            'event': event,
+            'elapsed': round(elapsed, 3),
+            'rows_per_sec': round(rows / elapsed, 1) if elapsed > 0 else None,
+            'counts': dict(self.counts),
+            'stages': {stage: histogram.as_dict() for stage, histogram in self.stages.items()},
+            'geocoder': self.geocoder_metrics(),
+        }
+
+    def report(self, event='progress'):
+        """Write a JSON progress line to stream."""
+        self.last_report = self.clock()
+        if self.stream is not None:
+            self.stream.write(json.dumps(self.snapshot(event)) + '\n')
+            self.stream.flush()
+
+    def maybe_report(self):
+        """report() if stream is set and interval seconds have passed since the last one."""
+        if self.stream is not None and self.clock() - self.last_report >= self.interval:
+            self.report()
+
+    def profile(self):
+        """
+        End-of-run profile: time per stage and its share of the run.
+
+        Returns:
+            str: A table, one line per stage, followed by the geocoder metrics
+        """
+        elapsed = self.clock() - self.started
+        lines = [f"{'Stage':<12}{'Calls':>10}{'Total s':>10}{'% run':>8}{'Mean':>11}{'p50':>11}{'p95':>11}"]
+        accounted = 0.0
+        for stage, histogram in sorted(self.stages.items(), key=lambda item: -item[1].total):
+            accounted += histogram.total
+            share = histogram.total / elapsed * 100 if elapsed > 0 else 0.0
+            lines.append(f"{stage:<12}{histogram.count:>10,}{histogram.total:>10.2f}{share:>7.1f}%"
+                         f"{_duration(histogram.mean):>11}{_duration(histogram.percentile(0.5)):>11}"
+                         f"{_duration(histogram.percentile(0.95)):>11}")
+        other = max(0.0, elapsed - accounted)
+        lines.append(f"{'other':<12}{'':>10}{other:>10.2f}{(other / elapsed * 100 if elapsed > 0 else 0.0):>7.1f}%")
+        rate = self.counts['rows'] / elapsed if elapsed > 0 else 0.0
+        lines.append(f"{self.counts['rows']:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+        metrics = self.geocoder_metrics()
+        if metrics.get('cache_hit_rate') is not None:
+            lines.append(f"Geocoding cache hit rate: {metrics['cache_hit_rate']:.1%}")
+        if 'requests' in metrics:
+            requests = metrics['requests']
+            retries = f" ({metrics['retries']:,} retries)" if 'retries' in metrics else ''
+            lines.append(f"Geocoding requests: {requests['count']:,}{retries}, "
+                         f"p50 {_duration(requests['p50'])}, p95 {_duration(requests['p95'])}")
+        lines.append(f"Time sleeping for rate limits: {metrics['rate_limit_sleep']:.1f}s")
+        return '\n'.join(lines)
+
+
+def _duration(seconds):
+    """Short human-readable duration: 850ns, 12.5us, 3.2ms, 1.40s."""
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:.0f}ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Fill in missing zip codes for many foreclosure extracts at once.
+
+augment_foreclosures.py handles one file in one process. This driver takes
+any number of input CSV files (monthly extracts, several counties) and:
+
+1. splits each file into byte ranges that end on row boundaries
+   (split_ranges), so large files are spread over several workers;
+2. in a process pool, parses each chunk's rows, finds the canonical address
+   of rows without a zip code, and answers them from the on-disk geocoding
+   cache where it can (process_chunk);
+3. in the main process, takes the chunks in file order as they finish,
+   geocodes the distinct addresses the cache could not answer, through one
+   geocoder, so every remote request goes through a single rate limiter
+   (and the cache has a single writer), and writes the chunk to its file's
+   output straight away, so the output doesn't depend on the number of
+   workers or the chunk size.
+
+Only a few chunks per worker are parsed ahead of the one being geocoded
+(imap), so memory use doesn't grow with the size of the input.
+
+Geocoded zip codes are only kept if they are in the run's zip code set
+(--zip-codes): Prince George's County by default, a file of zip codes for
+other counties, or any zip code.
+
+Rows are split at newlines, so quoted fields must not contain line breaks
+(true of the county extracts).
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import time
+from collections import Counter, deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from augment_foreclosures import (add_geocoder_arguments, classify_rows, geocode_batch, make_geocoder,
+                                  parse_rows)
+from geocode_cache import CachedGeocoder, GeocodeCache, normalize_geocode_key
+from geocoding_utils import PG_ZIP_CODES
+
+# Target size of the byte range each worker task parses
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def split_ranges(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split a CSV file into byte ranges of about chunk_size that end on row boundaries.
+
+    Returns:
+        tuple: (header, ranges) with the header line (bytes) and a list of
+        (start, end) byte offsets covering every row after it
+    """
+    with open(filename, 'rb') as f:
+        header = f.readline()
+        size = os.fstat(f.fileno()).st_size
+        ranges = []
+        start = f.tell()
+        while start < size:
+            end = min(start + max(1, chunk_size), size)
+            if end < size:
+                # Extend to the end of the row that byte end - 1 is in
+                f.seek(end - 1)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def read_header(header):
+    """Column names of a header line, and a dict of name -> position."""
+    names = next(csv.reader([header.decode('utf-8')]))
+    return names, {name: position for position, name in enumerate(names)}
+
+
+def load_zip_codes(value):
+    """
+    Zip code set named by --zip-codes.
+
+    Args:
+        value: 'pg' for Prince George's County, 'any' to accept every zip
+            code, or the name of a file of zip codes separated by whitespace
+            or commas
+
+    Returns:
+        frozenset: The zip codes, or None for any
+    """
+    if value == 'pg':
+        return PG_ZIP_CODES
+    if value == 'any':
+        return None
+    with open(value, encoding='utf-8') as f:
+        return frozenset(f.read().replace(',', ' ').split())
+
+
+def accepted_zip(found_zip, zip_codes):
+    """found_zip if it is in zip_codes (any zip code if zip_codes is None), else None."""
+    if found_zip and (zip_codes is None or found_zip in zip_codes):
+        return found_zip
+    return None
+
+
+def output_filenames(inputs, output_dir):
+    """
+    Output filename for each input: its path relative to the directory all
+    inputs share, under output_dir, with "_augmented" added to the name.
+
+    Inputs in different directories with the same name (e.g. a/jan.csv and
+    b/jan.csv) keep their subdirectories (output_dir/a/jan_augmented.csv and
+    output_dir/b/jan_augmented.csv), so no output overwrites another.
+
+    Raises:
+        ValueError: If two inputs would still share an output (the same file given twice)
+    """
+    paths = [os.path.abspath(filename) for filename in inputs]
+    common = os.path.commonpath([os.path.dirname(path) for path in paths]) if paths else ''
+    outputs = []
+    for path in paths:
+        stem, extension = os.path.splitext(os.path.relpath(path, common))
+        outputs.append(os.path.join(output_dir, f"{stem}_augmented{extension or '.csv'}"))
+    duplicates = sorted(name for name, count in Counter(outputs).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Several inputs would be written to {', '.join(duplicates)}")
+    return outputs
+
+
+def process_chunk(task):
+    """
+    Worker: parse one byte range and resolve what the geocoding cache can.
+
+    Args:
+        task: (filename, start, end, columns, cache_filename, zip_codes) with
+            columns from read_header(), cache_filename None to skip cache
+            lookups and zip_codes as for accepted_zip()
+
+    Returns:
+        tuple: (rows, pending, counts) where rows are the chunk's rows as lists
+        (zip codes from the cache filled in), pending lists (position, key,
+        parts) for rows whose address still needs geocoding, and counts is a
+        Counter of rows, skipped, failed, cached, ...
+    """
+    filename, start, end, columns, cache_filename, zip_codes = task
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    reader = csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+    cache = GeocodeCache(cache_filename) if cache_filename else None
+    zip_column = columns['Zip Code']
+    counts = Counter()
+    rows = []
+    pending = []
+    answers = {}
+    try:
+        for position, row, key, parts in parse_rows(classify_rows(reader, columns), columns, counts):
+            rows.append(row)
+            if key is None:
+                continue
+            if key not in answers:
+                cached = cache.get(normalize_geocode_key(*parts)) if cache is not None else None
+                if cached is None:
+                    answers[key] = None
+                else:
+                    answers[key] = accepted_zip(cached[0], zip_codes) or ''
+            answer = answers[key]
+            if answer is None:
+                pending.append((position, key, parts))
+            elif answer:
+                row[zip_column] = answer
+                counts['cached'] += 1
+            else:
+                counts['not_found'] += 1
+    finally:
+        if cache is not None:
+            cache.close()
+    return rows, pending, counts
+
+
+def imap(pool, function, tasks, ahead):
+    """
+    Ordered, lazy pool.map(): yields function(task) for each task in order,
+    with at most ahead tasks submitted to pool and not yet consumed, so
+    results don't pile up while the caller is busy with earlier ones.
+    """
+    tasks = iter(tasks)
+    futures = deque(pool.submit(function, task) for task in islice(tasks, ahead))
+    try:
+        while futures:
+            result = futures.popleft().result()
+            futures.extend(pool.submit(function, task) for task in islice(tasks, 1))
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def geocode_addresses(geocoder, addresses, found, zip_codes=PG_ZIP_CODES, batch_size=100):
+    """
+    Geocode addresses (dict of canonical key -> parts), batch_size at a time,
+    into found (canonical key -> zip code, None if not found or not in zip_codes).
+    """
+    keys = list(addresses)
+    for batch_start in range(0, len(keys), batch_size):
+        batch = keys[batch_start:batch_start + batch_size]
+        for key, (found_zip, _) in zip(batch, geocode_batch(geocoder, [addresses[key] for key in batch])):
+            found[key] = accepted_zip(found_zip, zip_codes)
+        print(f"  Geocoded {len(found):,} addresses")
+
+
+def process_files(inputs, output_dir, geocoder=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                  zip_codes=PG_ZIP_CODES):
+    """
+    Fill in missing zip codes for several foreclosure CSV files.
+
+    Args:
+        inputs: Input CSV filenames
+        output_dir: Directory for the outputs, each named like its input
+            with "_augmented" added (see output_filenames())
+        geocoder: Function with the signature of geocode_address_nominatim(),
+            called from this process only (default: Nominatim behind the on-disk
+            CachedGeocoder cache). If it is a CachedGeocoder with a cache file,
+            the workers answer from that file first.
+        workers: Worker processes (default: one per CPU); 1 runs everything here
+        chunk_size: Target bytes per worker task
+        zip_codes: Zip codes a geocoded address may be given (default: Prince
+            George's County), or None for any; see load_zip_codes()
+
+    Returns:
+        dict: Output filename -> Counter of rows, skipped, failed, cached,
+        geocoded and not_found
+    """
+    if geocoder is None:
+        geocoder = CachedGeocoder()
+    cache_filename = None
+    if isinstance(geocoder, CachedGeocoder) and geocoder.cache.filename != ':memory:':
+        cache_filename = geocoder.cache.filename
+
+    # Tasks for every chunk of every file, in file order
+    files = []
+    tasks = []
+    for filename, output_filename in zip(inputs, output_filenames(inputs, output_dir)):
+        header, ranges = split_ranges(filename, chunk_size)
+        names, columns = read_header(header)
+        files.append((output_filename, names, len(ranges)))
+        tasks.extend((filename, start, end, columns, cache_filename, zip_codes) for start, end in ranges)
+    print(f"{len(inputs)} files, {len(tasks)} chunks")
+
+    # Geocode each address no worker could resolve once, in order of first appearance,
+    # and write each chunk as soon as it arrives, in file order
+    found = {}
+    summaries = {}
+    geocoding_time = 0.0
+    start_time = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if workers == 1:
+            chunk_results = map(process_chunk, tasks)
+        else:
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            chunk_results = imap(pool, process_chunk, tasks, 2 * (workers or os.cpu_count() or 1))
+        for output_filename, names, chunk_count in files:
+            os.makedirs(os.path.dirname(output_filename), exist_ok=True)
+            zip_column = names.index('Zip Code')
+            counts = Counter()
+            with open(output_filename, 'w', newline='', encoding='utf-8') as outfile:
+                writer = csv.writer(outfile)
+                writer.writerow(names)
+                for _ in range(chunk_count):
+                    rows, pending, chunk_counts = next(chunk_results)
+                    counts.update(chunk_counts)
+                    addresses = {}
+                    for _, key, parts in pending:
+                        if key not in found:
+                            addresses.setdefault(key, parts)
+                    geocoding_start = time.perf_counter()
+                    geocode_addresses(geocoder, addresses, found, zip_codes)
+                    geocoding_time += time.perf_counter() - geocoding_start
+                    for position, key, _ in pending:
+                        if found[key]:
+                            rows[position][zip_column] = found[key]
+                            counts['geocoded'] += 1
+                        else:
+                            counts['not_found'] += 1
+                    writer.writerows(rows)
+            summaries[output_filename] = counts
+            print(f"{output_filename}: {counts['rows']:,} rows, {counts['skipped']:,} had zip codes, "
+                  f"{counts['cached'] + counts['geocoded']:,} filled in ({counts['cached']:,} from the cache), "
+                  f"{counts['failed'] + counts['not_found']:,} not found")
+    print(f"Geocoded {len(found):,} addresses in {geocoding_time:.1f}s, "
+          f"{time.perf_counter() - start_time:.1f}s in total")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill in missing zip codes for many foreclosure files")
+    parser.add_argument('inputs', nargs='+', help='Foreclosure CSV files')
+    parser.add_argument('--output-dir', default='augmented', help='Directory for the outputs (default: augmented)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_SIZE / 1024 / 1024,
+                        help='Megabytes of CSV per worker task (default: 8)')
+    parser.add_argument('--zip-codes', default='pg', metavar='pg|any|FILE',
+                        help="Zip codes to accept: 'pg' for Prince George's County (default), 'any', "
+                             "or a file of zip codes for other counties")
+    add_geocoder_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        output_filenames(args.inputs, args.output_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        zip_codes = load_zip_codes(args.zip_codes)
+    except OSError as e:
+        parser.error(f"can't read --zip-codes: {e}")
+    geocoder = make_geocoder(args)
+    process_files(args.inputs, args.output_dir, geocoder, args.workers, int(args.chunk_mb * 1024 * 1024),
+                  zip_codes)
+
+
+if __name__ == "__main__":
+    main()
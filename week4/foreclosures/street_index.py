@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Fuzzy matching of street names against the streets known to exist.
+
+normalize_street_name() only produces exact variations, so a misspelled
+street ("Oak Drve", "Pennsylvnia Ave") reaches the geocoder as a new
+address, costs a request and usually fails. StreetIndex holds the county's
+street names (from the road GeoJSON via RoadGeocoder, or from addresses the
+geocoding cache has found) and proposes the canonical street for a name
+before it is geocoded, so a typo shares the key, cache entry and result of
+the correctly spelled address.
+
+Names are compared in their canonical form (upper-cased, street type
+expanded, e.g. "OAK DRIVE"). The index maps every string obtained by
+deleting up to max_distance characters from a name to the names it came
+from; a query looks up its own deletions the same way, so candidates within
+max_distance edits are found with a few dozen dict lookups (about 0.1 ms
+for 10,000 streets) and then checked with edit_distance(). A BK-tree over
+the same names needs hundreds of distance computations per query in Python.
+
+A name is only corrected when a single street is closest, and names shorter
+than MIN_FUZZY_LENGTH are only matched exactly. A correction never changes a
+directional ("W MAIN ST" is not "E MAIN ST") or a number ("12TH ST" is not
+"112TH ST"): those are one edit apart but are different streets.
+"""
+
+import argparse
+import re
+
+from parse_address import STREET_TYPES, normalize_street_name, parse_address_for_geocoding
+
+# Edits (insertion, deletion, substitution or swap of adjacent letters) allowed by default
+MAX_DISTANCE = 1
+# Street names shorter than this ("ELM", "OAK") are too close to each other to correct
+MIN_FUZZY_LENGTH = 4
+
+# Directional prefixes and suffixes a correction must not change
+DIRECTIONS = frozenset(['N', 'S', 'E', 'W', 'NE', 'NW', 'SE', 'SW',
+                        'NORTH', 'SOUTH', 'EAST', 'WEST', 'NORTHEAST', 'NORTHWEST', 'SOUTHEAST', 'SOUTHWEST'])
+DIGITS_PATTERN = re.compile(r'\d+')
+
+# House number stuck to the street name: "123Oak Dr"
+GLUED_NUMBER_PATTERN = re.compile(r'^\s*(\d+)([A-Za-z].*)$')
+# House number after the street: "Oak Dr 123", "Oak Dr, 123"
+TRAILING_NUMBER_PATTERN = re.compile(r'^\s*([A-Za-z].*?)[\s,]+(\d+[A-Za-z]?)\s*$')
+
+
+def edit_distance(a, b, limit):
+    """
+    Edit distance between two strings, counting a swap of adjacent characters as one edit.
+
+    Args:
+        a, b: Strings to compare
+        limit: Largest distance of interest
+
+    Returns:
+        int: The distance, or limit + 1 if it is larger than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        best = i
+        for j, other in enumerate(b, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == other:
+                distance = min(distance, before[j - 2] + 1)
+            current[j] = distance
+            if distance < best:
+                best = distance
+        if best > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def deletions(word, depth):
+    """word and every string made by deleting up to depth of its characters."""
+    found = {word}
+    level = {word}
+    for _ in range(depth):
+        level = {item[:i] + item[i + 1:] for item in level for i in range(len(item))}
+        found |= level
+    return found
+
+
+def street_signature(canonical):
+    """The directionals and numbers in a canonical street name, which tell streets apart."""
+    return ([word for word in canonical.split() if word in DIRECTIONS], DIGITS_PATTERN.findall(canonical))
+
+
+def split_street_type(name, kind):
+    """(name, kind) with a type left at the end of name ("Main St" and no kind) split off."""
+    name = str(name or '').strip()
+    if not kind:
+        words = name.rsplit(None, 1)
+        if len(words) == 2 and words[1].upper() in STREET_TYPES:
+            return words[0], words[1].upper()
+    return name, kind or ''
+
+
+def canonical_street(name, kind):
+    """
+    Canonical form of a street: upper-cased with the type expanded ("OAK DRIVE").
+
+    Returns:
+        str: The canonical name, or None if name is empty
+    """
+    variations = normalize_street_name(*split_street_type(name, kind))
+    return ' '.join(variations[-1].split()) if variations else None
+
+
+class StreetIndex:
+    """
+    Street names known to exist, with fuzzy lookups.
+
+    streets maps each canonical name to the (name, kind) to geocode it as.
+    corrected and recovered count the names match() changed and the
+    addresses recover() rescued, like CachedGeocoder.hits.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        """
+        Args:
+            max_distance: Most edits between a name and the street it is corrected to
+        """
+        self.max_distance = max_distance
+        self.streets = {}
+        self.neighbours = {}
+        self.corrected = 0
+        self.recovered = 0
+
+    def add(self, name, kind):
+        """Add a street, e.g. add("OAK", "DR") or add("MAIN ST", None)."""
+        canonical = canonical_street(name, kind)
+        if canonical is None or canonical in self.streets:
+            return
+        name, kind = split_street_type(name, kind)
+        self.streets[canonical] = (name.upper(), kind.upper())
+        for deletion in deletions(canonical, self.max_distance):
+            self.neighbours.setdefault(deletion, []).append(canonical)
+
+    def add_roads(self, geocoder):
+        """Add every street of a RoadGeocoder."""
+        for name, kind in geocoder.streets:
+            self.add(name, kind)
+
+    def add_cache(self, cache):
+        """
+        Add every street the geocoding cache (a GeocodeCache) has found a zip code on.
+
+        The cache only knows the streets looked up so far, so on its own it is
+        not a list to correct addresses against before geocoding: a real
+        street missing from it would be matched to a neighbour.
+        """
+        for name, kind in cache.connection.execute(
+                "SELECT DISTINCT name, kind FROM geocodes WHERE zip_code IS NOT NULL"):
+            self.add(name, kind)
+
+    def match(self, name, kind):
+        """
+        The known street closest to a street name.
+
+        Returns:
+            tuple: (name, kind, distance) of the only known street within
+            max_distance edits of the closest distance, or None if there is no
+            such street or several are equally close. Streets with other
+            directionals or numbers are never matched.
+        """
+        canonical = canonical_street(name, kind)
+        if canonical is None:
+            return None
+        if canonical in self.streets:
+            return (*self.streets[canonical], 0)
+        if len(str(name).strip()) < MIN_FUZZY_LENGTH:
+            return None
+        candidates = set()
+        for deletion in deletions(canonical, self.max_distance):
+            candidates.update(self.neighbours.get(deletion, ()))
+        signature = street_signature(canonical)
+        best = None
+        best_distance = self.max_distance + 1
+        tied = False
+        for candidate in candidates:
+            if street_signature(candidate) != signature:
+                continue
+            distance = edit_distance(canonical, candidate, self.max_distance)
+            if distance < best_distance:
+                best, best_distance, tied = candidate, distance, False
+            elif distance == best_distance:
+                tied = True
+        if best is None or tied:
+            return None
+        return (*self.streets[best], best_distance)
+
+    def correct(self, name, kind):
+        """
+        Name and kind of the known street a street name is closest to.
+
+        Returns:
+            tuple: (name, kind) of the matched street, or the arguments unchanged
+            if it is already known or nothing matches
+        """
+        found = self.match(name, kind)
+        if found is None or found[2] == 0:
+            return name, kind
+        self.corrected += 1
+        return found[0], found[1]
+
+    def recover(self, street_address):
+        """
+        Parse a street address parse_address() rejects, if its street is known.
+
+        Handles a house number stuck to the street name ("123Oak Dr") or
+        written after it ("Oak Dr 123"), and only accepts the result if the
+        street matches a known one.
+
+        Returns:
+            tuple: (number, name, kind) with the known street's name and kind,
+            or (None, None, None)
+        """
+        for pattern, number_group, street_group in ((GLUED_NUMBER_PATTERN, 1, 2),
+                                                    (TRAILING_NUMBER_PATTERN, 2, 1)):
+            found = pattern.match(street_address or '')
+            if not found:
+                continue
+            number, name, kind = parse_address_for_geocoding(
+                f"{found.group(number_group)} {found.group(street_group)}")
+            if number is None or not name:
+                continue
+            street = self.match(name, kind)
+            if street is not None:
+                self.recovered += 1
+                return number, street[0], street[1]
+        return None, None, None
+
+    def __len__(self):
+        return len(self.streets)
+
+    def __contains__(self, street):
+        return canonical_street(*street) in self.streets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the known street closest to a misspelled one")
+    parser.add_argument('street', nargs='+', help='Street address or name, e.g. "123 Oak Drve"')
+    parser.add_argument('--roads', metavar='GEOJSON', help='Road or address point GeoJSON file to read streets from')
+    parser.add_argument('--cache', metavar='SQLITE', help='Geocoding cache to read found streets from')
+    parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE,
+                        help=f'Most edits to correct (default: {MAX_DISTANCE})')
+    args = parser.parse_args()
+
+    index = StreetIndex(args.max_distance)
+    if args.roads:
+        from local_geocoder import RoadGeocoder
+        index.add_roads(RoadGeocoder.from_geojson(args.roads))
+    if args.cache:
+        from geocode_cache import GeocodeCache
+        cache = GeocodeCache(args.cache)
+        index.add_cache(cache)
+        cache.close()
+    print(f"Indexed {len(index):,} streets")
+    address = ' '.join(args.street)
+    number, name, kind = parse_address_for_geocoding(address)
+    if number is None:
+        number, name, kind = index.recover(address)
+        if number is not None:
+            print(f"Recovered: {number} {name} {kind}")
+            return
+        name, kind = address, ''
+    print(index.match(name, kind))
+
+
+if __name__ == "__main__":
+    main()
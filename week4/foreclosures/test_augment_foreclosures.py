@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Unit tests for the address deduplication done while geocoding."""
+
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+
+from augment_foreclosures import (augment_foreclosures_csv, canonical_address_key, classify_rows, lookup_rows,
+                                  parse_rows)
+from augment_journal import journal_filename
+from geocode_cache import LocalGeocoder
+from pipeline_stats import PipelineStats
+
+
+def make_row(address, city="Bowie", state="MD", zip_code=""):
+    return {"Street Address": address, "City": city, "State": state, "Zip Code": zip_code}
+
+
+class TestCanonicalAddressKey(unittest.TestCase):
+    def test_variants_share_key(self):
+        key, parts = canonical_address_key("456 Oak Dr Apt 2B", "Bowie", "MD")
+        self.assertEqual(key, ("456", "OAK DRIVE", "BOWIE", "MD"))
+        self.assertEqual(parts, ("456", "Oak", "DR", "Bowie", "MD"))
+        for address, city in [("456 Oak Dr #2B", "Bowie"), ("456 OAK DRIVE", "bowie "),
+                              ("456 oak dr, Unit 7", "BOWIE")]:
+            with self.subTest(address=address):
+                self.assertEqual(canonical_address_key(address, city, "md")[0], key)
+
+    def test_different_addresses_differ(self):
+        key = canonical_address_key("456 Oak Dr", "Bowie", "MD")[0]
+        self.assertNotEqual(canonical_address_key("458 Oak Dr", "Bowie", "MD")[0], key)
+        self.assertNotEqual(canonical_address_key("456 Oak Ct", "Bowie", "MD")[0], key)
+        self.assertNotEqual(canonical_address_key("456 Oak Dr", "Laurel", "MD")[0], key)
+
+    def test_unparseable(self):
+        self.assertEqual(canonical_address_key("Invalid Address", "Bowie", "MD"), (None, None))
+
+
+class TestGroupRows(unittest.TestCase):
+    def test_groups_and_counts(self):
+        rows = [
+            make_row("456 Oak Dr Apt 2B"),
+            make_row("1 Elm Ct", zip_code="20715"),
+            make_row("456 Oak Drive #3"),
+            make_row("Invalid Address"),
+            make_row("9 Pine Ln", city=""),
+            make_row("9 Pine Ln"),
+        ]
+        header = list(rows[0])
+        columns = {name: position for position, name in enumerate(header)}
+        backend = LocalGeocoder({("456", "Oak", "DR", "Bowie", "MD"): "20716"})
+        counts = Counter()
+        records = parse_rows(classify_rows([[row[name] for name in header] for row in rows], columns),
+                             columns, counts)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = list(lookup_rows(records, backend, {}, counts))
+        self.assertEqual((counts['skipped'], counts['failed']), (1, 2))
+        self.assertEqual((counts['addresses'], counts['lookups'], backend.calls), (2, 2, 2))
+        self.assertEqual([index for index, _, _, _ in result], list(range(len(rows))))
+        keys = [key for _, _, key, _ in result]
+        self.assertEqual(keys[0], keys[2])
+        self.assertEqual([key is None for key in keys], [False, True, False, True, True, False])
+        self.assertEqual([zip_code for _, _, _, zip_code in result], ["20716", None, "20716", None, None, None])
+
+
+class TestAugmentDedup(unittest.TestCase):
+    def test_each_address_geocoded_once(self):
+        backend = LocalGeocoder({("456", "Oak", "DR", "Bowie", "MD"): "20716"})
+        rows = [make_row("456 Oak Dr Apt 2B"), make_row("456 Oak Dr #2B"), make_row("456 oak dr"),
+                make_row("7 Nowhere Way")]
+        with tempfile.TemporaryDirectory() as directory:
+            input_file = os.path.join(directory, "in.csv")
+            output_file = os.path.join(directory, "out.csv")
+            with open(input_file, "w", newline="", encoding="utf-8") as file:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                augment_foreclosures_csv(input_file, output_file, backend)
+            with open(output_file, newline="", encoding="utf-8") as file:
+                result = list(csv.DictReader(file))
+        self.assertEqual(backend.calls, 2)
+        self.assertEqual([row["Zip Code"] for row in result], ["20716", "20716", "20716", ""])
+        self.assertEqual([row["Street Address"] for row in result], [row["Street Address"] for row in rows])
+        self.assertIn("Dedup ratio: 2.00 rows per address", output.getvalue())
+
+
+class FailingGeocoder(LocalGeocoder):
+    """LocalGeocoder that raises once it has answered fail_after calls."""
+
+    def __init__(self, results, fail_after):
+        super().__init__(results)
+        self.fail_after = fail_after
+
+    def __call__(self, *address):
+        if self.calls == self.fail_after:
+            raise ConnectionError("API outage")
+        return super().__call__(*address)
+
+
+class InterruptingStats(PipelineStats):
+    """PipelineStats that raises KeyboardInterrupt from the write loop after interrupt_after rows."""
+
+    def __init__(self, interrupt_after):
+        super().__init__()
+        self.interrupt_after = interrupt_after
+
+    def maybe_report(self):
+        self.interrupt_after -= 1
+        if self.interrupt_after == 0:
+            raise KeyboardInterrupt
+
+
+@mock.patch("augment_foreclosures.BATCH_SIZE", 2)
+class TestAugmentResume(unittest.TestCase):
+    ZIPS = ["20705", "20706", "20707", "20708", "20710", "20712"]
+    RESULTS = {(str(number), "Oak", "DR", "Bowie", "MD"): zip_code for number, zip_code in enumerate(ZIPS, 1)}
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input_file = os.path.join(self.directory.name, "in.csv")
+        self.output_file = os.path.join(self.directory.name, "out.csv")
+        rows = [make_row(f"{number} Oak Dr") for number in range(1, 7)] + [make_row("1 Oak Drive #4")]
+        with open(self.input_file, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def augment(self, geocoder, resume=True, stats=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            augment_foreclosures_csv(self.input_file, self.output_file, geocoder, resume=resume, stats=stats)
+
+    def output_zips(self):
+        with open(self.output_file, newline="", encoding="utf-8") as file:
+            return [row["Zip Code"] for row in csv.DictReader(file)]
+
+    def output_addresses(self):
+        with open(self.output_file, newline="", encoding="utf-8") as file:
+            return [row["Street Address"] for row in csv.DictReader(file)]
+
+    def test_resumes_after_failure(self):
+        with self.assertRaises(ConnectionError):
+            self.augment(FailingGeocoder(self.RESULTS, fail_after=3))
+        # The batches finished before the failure are saved and checkpointed
+        self.assertEqual(self.output_zips(), ["20705", "20706", "", "", "", "", "20705"])
+        self.assertTrue(os.path.exists(journal_filename(self.output_file)))
+
+        backend = LocalGeocoder(self.RESULTS)
+        self.augment(backend)
+        self.assertEqual(backend.calls, 4)
+        self.assertEqual(self.output_zips(), self.ZIPS + ["20705"])
+        self.assertFalse(os.path.exists(journal_filename(self.output_file)))
+
+    def test_interrupted_while_writing_keeps_every_row(self):
+        addresses = [f"{number} Oak Dr" for number in range(1, 7)] + ["1 Oak Drive #4"]
+        for interrupt_after in range(1, 8):
+            with self.subTest(interrupt_after=interrupt_after):
+                with self.assertRaises(KeyboardInterrupt):
+                    self.augment(LocalGeocoder(self.RESULTS), resume=False,
+                                 stats=InterruptingStats(interrupt_after))
+                # Rows held back for a batch, and the rest of the file, are still written
+                self.assertEqual(self.output_addresses(), addresses)
+                zips = self.output_zips()
+                self.assertEqual(zips[:interrupt_after], (self.ZIPS + ["20705"])[:interrupt_after])
+
+    def test_no_resume_starts_over(self):
+        with self.assertRaises(ConnectionError):
+            self.augment(FailingGeocoder(self.RESULTS, fail_after=2))
+        backend = LocalGeocoder(self.RESULTS)
+        self.augment(backend, resume=False)
+        self.assertEqual(backend.calls, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Unit tests for the multi-boundary registry and its binary cache."""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import boundary_registry
+from boundary_registry import BoundaryRegistry, cache_filename
+from check_pg_county import is_in_pg
+
+
+def square(name, min_x, min_y, size):
+    ring = [[min_x, min_y], [min_x + size, min_y], [min_x + size, min_y + size],
+            [min_x, min_y + size], [min_x, min_y]]
+    return {"type": "Feature", "properties": {"ZCTA5CE10": name, "ALAND10": 1},
+            "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+
+class TestBoundaryRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.squares = os.path.join(self.directory.name, "squares.geojson")
+        # Two side by side squares and a big one overlapping both
+        features = [square("A", 0, 0, 1), square("B", 1, 0, 1), square("C", 0, 0, 3)]
+        with open(self.squares, "w", encoding="utf-8") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_locate(self):
+        registry = BoundaryRegistry()
+        self.assertEqual(registry.load(self.squares), ["A", "B", "C"])
+        self.assertEqual(registry.locate(0.5, 0.5), ["A", "C"])
+        self.assertEqual(registry.locate(0.5, 1.5), ["B", "C"])
+        self.assertEqual(registry.locate(2.5, 2.5), ["C"])
+        self.assertEqual(registry.locate(5, 5), [])
+        self.assertEqual(registry.locate(None, 0.5), [])
+        self.assertEqual(registry.locate(float("nan"), 0.5), [])
+
+    def test_locate_many_first_match(self):
+        registry = BoundaryRegistry()
+        registry.load(self.squares)
+        lats = [0.5, 0.5, 2.5, 5, float("nan")]
+        lons = [0.5, 1.5, 2.5, 5, 0.5]
+        self.assertEqual(registry.locate_many(lats, lons), ["A", "B", "C", None, None])
+        self.assertEqual(registry.locate_many([], []), [])
+
+    def test_contains_and_are_in(self):
+        registry = BoundaryRegistry()
+        registry.load(self.squares)
+        self.assertTrue(registry.contains("B", 0.5, 1.5))
+        self.assertFalse(registry.contains("A", 0.5, 1.5))
+        self.assertEqual(registry.are_in("A", [0.5, 0.5], [0.5, 1.5]).tolist(), [True, False])
+        with self.assertRaises(KeyError):
+            registry.get("Z")
+
+    def test_cache_is_used_and_refreshed(self):
+        BoundaryRegistry().load(self.squares)
+        self.assertTrue(os.path.exists(cache_filename(self.squares)))
+        with mock.patch.object(boundary_registry, "read_geojson_boundaries") as read:
+            registry = BoundaryRegistry()
+            self.assertEqual(registry.load(self.squares), ["A", "B", "C"])
+            read.assert_not_called()
+        self.assertEqual(registry.locate(0.5, 1.5), ["B", "C"])
+
+        # A changed file is parsed again
+        with open(self.squares, "w", encoding="utf-8") as f:
+            json.dump({"type": "FeatureCollection", "features": [square("D", 10, 10, 1)]}, f)
+        registry = BoundaryRegistry()
+        self.assertEqual(registry.load(self.squares), ["D"])
+
+    def test_duplicate_names_raise(self):
+        registry = BoundaryRegistry()
+        # Every square has ALAND10 1, like the STATEFP of a file of counties
+        with self.assertRaisesRegex(ValueError, "name_property"):
+            registry.load(self.squares, name_property="ALAND10")
+        self.assertEqual(len(registry), 0)
+        self.assertFalse(os.path.exists(cache_filename(self.squares)))
+        with open(self.squares, "w", encoding="utf-8") as f:
+            json.dump({"type": "FeatureCollection", "features": [
+                {**square("A", 0, 0, 1), "properties": {"STATEFP": "24", "NAME": "A"}},
+                {**square("B", 1, 0, 1), "properties": {"STATEFP": "24", "NAME": "B"}}]}, f)
+        with self.assertRaises(ValueError):
+            registry.load(self.squares)
+        self.assertEqual(registry.load(self.squares, name_property="NAME"), ["A", "B"])
+
+    def test_names_already_loaded(self):
+        registry = BoundaryRegistry()
+        registry.load(self.squares)
+        for cache in (False, True):
+            with self.subTest(cache=cache):
+                with self.assertRaises(ValueError):
+                    registry.load(self.squares, cache=cache)
+        self.assertEqual(len(registry), 3)
+        with self.assertRaises(ValueError):
+            registry.add("A", registry.get("C"))
+        registry.add("A", registry.get("C"), replace=True)
+        self.assertEqual(registry.locate(2.5, 2.5), ["A", "C"])
+
+    def test_unwritable_cache_is_skipped(self):
+        # A directory where the cache file would go can't be replaced by a database
+        os.mkdir(cache_filename(self.squares))
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(BoundaryRegistry().load(self.squares), ["A", "B", "C"])
+        self.assertIn("could not write boundary cache", stderr.getvalue())
+
+    def test_is_in_pg_writes_no_cache(self):
+        path = os.path.join(self.directory.name, "pg_county_boundary.geojson")
+        shutil.copy("pg_county_boundary.geojson", path)
+        self.assertTrue(is_in_pg(38.8, -76.8, path))
+        self.assertFalse(os.path.exists(cache_filename(path)))
+
+    def test_pg_county_matches_is_in_pg(self):
+        path = os.path.join(self.directory.name, "pg_county_boundary.geojson")
+        shutil.copy("pg_county_boundary.geojson", path)
+        BoundaryRegistry().load(path)
+        registry = BoundaryRegistry()
+        registry.load(path)
+        registry.load(self.squares)
+        rng = np.random.default_rng(45)
+        lats = rng.uniform(38.4, 39.2, 500)
+        lons = rng.uniform(-77.2, -76.6, 500)
+        expected = [is_in_pg(lat, lon) for lat, lon in zip(lats, lons)]
+        self.assertTrue(any(expected))
+        located = registry.locate_many(lats, lons)
+        self.assertEqual([name == "Prince George's" for name in located], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Unit tests for the persistent geocoding cache, using the offline LocalGeocoder backend."""
+
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+
+from augment_foreclosures import augment_foreclosures_csv
+from geocode_cache import CachedGeocoder, GeocodeCache, LocalGeocoder, normalize_geocode_key
+from geocoding_utils import GEOCODING_FAILED
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGeocodeCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = GeocodeCache(":memory:", negative_ttl=60, clock=self.clock)
+        self.backend = LocalGeocoder({("123", "Main", "ST", "Bowie", "MD"): "20715"})
+        self.geocoder = CachedGeocoder(self.backend, self.cache)
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_normalized_key(self):
+        self.assertEqual(normalize_geocode_key("123", " main ", None, "bowie", "md"),
+                         ("123", "MAIN", "", "BOWIE", "MD"))
+        self.assertEqual(normalize_geocode_key("1", "Old  Fort", "rd", "Fort Washington", "MD"),
+                         ("1", "OLD FORT", "RD", "FORT WASHINGTON", "MD"))
+
+    def test_repeat_lookups_use_cache(self):
+        self.assertEqual(self.geocoder("123", "Main", "ST", "Bowie", "MD"), ("20715", 1.0))
+        self.assertEqual(self.geocoder("123", "MAIN", "st", "BOWIE", "MD"), ("20715", 1.0))
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual((self.geocoder.hits, self.geocoder.misses), (1, 1))
+
+    def test_negative_results_expire(self):
+        self.assertEqual(self.geocoder("9", "Nowhere", "", "Bowie", "MD"), (None, None))
+        self.assertEqual(self.geocoder("9", "Nowhere", "", "Bowie", "MD"), (None, None))
+        self.assertEqual(self.backend.calls, 1)
+        self.clock.now += 61
+        self.backend.add("9", "Nowhere", "", "Bowie", "MD", "20716")
+        self.assertEqual(self.geocoder("9", "Nowhere", "", "Bowie", "MD"), ("20716", 1.0))
+        self.assertEqual(self.backend.calls, 2)
+
+    def test_failed_lookups_are_not_cached(self):
+        self.backend.add("9", "Nowhere", "", "Bowie", "MD", GEOCODING_FAILED)
+        self.assertEqual(self.geocoder("9", "Nowhere", "", "Bowie", "MD"), (None, None))
+        self.assertEqual(self.geocoder.geocode_many([("9", "Nowhere", "", "Bowie", "MD")]), [(None, None)])
+        self.assertEqual(len(self.cache), 0)
+        # Once the backend answers again, so does the geocoder
+        self.backend.add("9", "Nowhere", "", "Bowie", "MD", "20716")
+        self.assertEqual(self.geocoder("9", "Nowhere", "", "Bowie", "MD"), ("20716", 1.0))
+        self.assertEqual(self.backend.calls, 3)
+
+    def test_positive_results_do_not_expire(self):
+        self.geocoder("123", "Main", "ST", "Bowie", "MD")
+        self.clock.now += 10 ** 9
+        self.geocoder("123", "Main", "ST", "Bowie", "MD")
+        self.assertEqual(self.backend.calls, 1)
+
+    def test_cache_persists_in_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "cache.sqlite")
+            first = GeocodeCache(filename)
+            CachedGeocoder(self.backend, first)("123", "Main", "ST", "Bowie", "MD")
+            first.close()
+            second = GeocodeCache(filename)
+            self.assertEqual(len(second), 1)
+            self.assertEqual(second.get(normalize_geocode_key("123", "Main", "ST", "Bowie", "MD")),
+                             ("20715", 1.0))
+            second.close()
+
+    def test_local_geocoder_from_results_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "geocoding_results.csv")
+            with open(filename, "w", newline="", encoding="utf-8") as file:
+                writer = csv.DictWriter(file, fieldnames=[
+                    "parsed_number", "parsed_name", "parsed_kind", "city", "state", "found_zip", "confidence"])
+                writer.writeheader()
+                writer.writerow({"parsed_number": "5", "parsed_name": "Oak", "parsed_kind": "DR",
+                                 "city": "Laurel", "state": "MD", "found_zip": "20707", "confidence": "0.4"})
+                writer.writerow({"parsed_number": "6", "parsed_name": "Elm", "parsed_kind": "",
+                                 "city": "Laurel", "state": "MD", "found_zip": "", "confidence": ""})
+            geocoder = LocalGeocoder.from_results_csv(filename)
+        self.assertEqual(geocoder("5", "Oak", "DR", "Laurel", "MD"), ("20707", 0.4))
+        self.assertEqual(geocoder("6", "Elm", "", "Laurel", "MD"), (None, None))
+
+
+class TestAugmentWithCache(unittest.TestCase):
+    def test_rerun_only_geocodes_new_addresses(self):
+        backend = LocalGeocoder({("123", "Main", "ST", "Bowie", "MD"): "20715",
+                                 ("9", "Oak", "DR", "Laurel", "MD"): "90210"})
+        cache = GeocodeCache(":memory:")
+        rows = [
+            {"Street Address": "123 Main St", "City": "Bowie", "State": "MD", "Zip Code": ""},
+            {"Street Address": "123 Main St", "City": "Bowie", "State": "MD", "Zip Code": ""},
+            {"Street Address": "9 Oak Dr", "City": "Laurel", "State": "MD", "Zip Code": ""},
+            {"Street Address": "1 Elm Ct", "City": "Laurel", "State": "MD", "Zip Code": "20707"},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            input_file = os.path.join(directory, "in.csv")
+            output_file = os.path.join(directory, "out.csv")
+            with open(input_file, "w", newline="", encoding="utf-8") as file:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            with contextlib.redirect_stdout(io.StringIO()):
+                augment_foreclosures_csv(input_file, output_file, CachedGeocoder(backend, cache))
+                self.assertEqual(backend.calls, 2)
+                augment_foreclosures_csv(input_file, output_file, CachedGeocoder(backend, cache))
+            self.assertEqual(backend.calls, 2)
+            with open(output_file, newline="", encoding="utf-8") as file:
+                zips = [row["Zip Code"] for row in csv.DictReader(file)]
+        # 90210 is not in Prince George's County, so that row keeps its empty zip
+        self.assertEqual(zips, ["20715", "20715", "", "20707"])
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Unit tests for the concurrent geocoding client, against a stub HTTP server."""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from geocode_cache import CachedGeocoder, GeocodeCache
+from geocoding_client import GeocodingClient, TokenBucket
+from geocoding_utils import GEOCODING_FAILED
+
+# Zip code the stub server returns for each house number
+ZIPS = {str(number): f"207{number:02d}" for number in range(1, 41)}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so connections are kept alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)["q"][0]
+        number = query.split()[0]
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failures = server.failures.get(number, [])
+            status = failures.pop(0) if failures else 200
+        time.sleep(server.delay)
+        if status == 200:
+            body = json.dumps([{"importance": 0.5, "address": {"postcode": ZIPS[number]}}]
+                              if number in ZIPS else [])
+        else:
+            body = "{}"
+        data = body.encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with server.lock:
+            server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_spaces_requests_at_rate(self):
+        fake = FakeTime()
+        bucket = TokenBucket(4, clock=fake.clock, sleep=fake.sleep)
+        for _ in range(5):
+            bucket.acquire()
+        self.assertEqual(fake.sleeps, [0.25] * 4)
+        self.assertEqual(bucket.waited, 1.0)
+
+    def test_burst_then_rate(self):
+        fake = FakeTime()
+        bucket = TokenBucket(2, burst=3, clock=fake.clock, sleep=fake.sleep)
+        for _ in range(4):
+            bucket.acquire()
+        self.assertEqual(fake.sleeps, [0.5])
+        # Idle time refills the bucket, but only up to burst
+        fake.now += 100
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(fake.sleeps, [0.5])
+
+    def test_unlimited(self):
+        fake = FakeTime()
+        bucket = TokenBucket(None, clock=fake.clock, sleep=fake.sleep)
+        for _ in range(10):
+            bucket.acquire()
+        self.assertEqual(fake.sleeps, [])
+
+
+class TestGeocodingClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.connections = set()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.failures = {}
+        self.server.delay = 0.0
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self, **options):
+        options.setdefault("rate", None)
+        options.setdefault("backoff", 0.01)
+        return GeocodingClient(self.url, **options)
+
+    def test_single_lookup(self):
+        client = self.client()
+        self.assertEqual(client("7", "Main", "ST", "Bowie", "MD"), ("20707", 0.5))
+        self.assertEqual(client("99", "Main", "ST", "Bowie", "MD"), (None, None))
+        client.close()
+
+    def test_results_in_order_with_bounded_concurrency(self):
+        self.server.delay = 0.02
+        client = self.client(concurrency=4)
+        addresses = [(str(number), "Main", "ST", "Bowie", "MD") for number in range(40, 0, -1)]
+        results = client.geocode_many(addresses)
+        client.close()
+        self.assertEqual([zip_code for zip_code, _ in results], [ZIPS[str(n)] for n in range(40, 0, -1)])
+        self.assertLessEqual(self.server.max_in_flight, 4)
+        self.assertGreater(self.server.max_in_flight, 1)
+        # Connections are kept alive and reused, not opened per request
+        self.assertLessEqual(len(self.server.connections), 4)
+
+    def test_retries_on_429_and_5xx(self):
+        self.server.failures = {"3": [429, 503], "5": [500]}
+        client = self.client(concurrency=2)
+        results = client.geocode_many([(str(n), "Main", "ST", "Bowie", "MD") for n in range(1, 7)])
+        client.close()
+        self.assertEqual([zip_code for zip_code, _ in results], [ZIPS[str(n)] for n in range(1, 7)])
+        self.assertEqual(client.retries, 3)
+        self.assertEqual(self.server.requests, 9)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.failures = {"3": [503, 503, 503]}
+        client = self.client(max_retries=2)
+        self.assertIs(client("3", "Main", "ST", "Bowie", "MD"), GEOCODING_FAILED)
+        client.close()
+        self.assertEqual(self.server.requests, 3)
+
+    def test_failures_are_not_cached(self):
+        self.server.failures = {"3": [503, 503]}
+        cache = GeocodeCache(":memory:")
+        client = self.client(max_retries=1, concurrency=2)
+        geocoder = CachedGeocoder(client, cache)
+        addresses = [(str(n), "Main", "ST", "Bowie", "MD") for n in (2, 3)]
+        self.assertEqual(geocoder.geocode_many(addresses), [("20702", 0.5), (None, None)])
+        self.assertEqual(len(cache), 1)
+        # The outage is over: the failed address is asked for again
+        self.assertEqual(geocoder.geocode_many(addresses), [("20702", 0.5), ("20703", 0.5)])
+        self.assertEqual(self.server.requests, 4)
+        client.close()
+        cache.close()
+
+    def test_rate_limit(self):
+        client = self.client(rate=50, concurrency=4)
+        start = time.perf_counter()
+        client.geocode_many([(str(n), "Main", "ST", "Bowie", "MD") for n in range(1, 11)])
+        client.close()
+        # The first request goes out at once, the other 9 are 1/50 s apart
+        self.assertGreaterEqual(time.perf_counter() - start, 9 / 50 * 0.9)
+
+    def test_cached_geocoder_only_sends_misses(self):
+        cache = GeocodeCache(":memory:")
+        client = self.client(concurrency=3)
+        geocoder = CachedGeocoder(client, cache)
+        addresses = [(str(n), "Main", "ST", "Bowie", "MD") for n in (1, 2, 2, 3)]
+        self.assertEqual([zip_code for zip_code, _ in geocoder.geocode_many(addresses)],
+                         ["20701", "20702", "20702", "20703"])
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(geocoder.geocode_many(addresses[:2] + [("4", "Main", "ST", "Bowie", "MD")]),
+                         [("20701", 0.5), ("20702", 0.5), ("20704", 0.5)])
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual((geocoder.hits, geocoder.misses), (2, 4))
+        client.close()
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
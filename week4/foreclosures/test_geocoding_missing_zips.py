@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 
 import csv
-import time
 import sys
 from parse_address import parse_address
-from geocoding_utils import geocode_address_nominatim, is_valid_prince_georges_zip
+from geocoding_utils import is_valid_prince_georges_zip
+from geocode_cache import CachedGeocoder
 
 
-def find_missing_zip_codes(filename, max_attempts=100):
+def find_missing_zip_codes(filename, max_attempts=100, geocoder=None):
     """
     Find foreclosure entries with missing zip codes and attempt to geocode them.
     
@@ -17,10 +17,14 @@ def find_missing_zip_codes(filename, max_attempts=100):
     Args:
         filename: Path to the foreclosure CSV file
         max_attempts: Maximum number of geocoding attempts for testing
+        geocoder: Function with the signature of geocode_address_nominatim()
+            (default: Nominatim behind the on-disk CachedGeocoder cache)
         
     Returns:
         List of dictionaries with geocoding results
     """
+    if geocoder is None:
+        geocoder = CachedGeocoder()
     results = []
     attempts = 0
     
@@ -63,7 +67,7 @@ def find_missing_zip_codes(filename, max_attempts=100):
             
             # Use Nominatim geocoding from shared utilities
             print(f"trying Nominatim...")
-            found_zip, confidence = geocode_address_nominatim(number, name, kind, city, state)
+            found_zip, confidence = geocoder(number, name, kind, city, state)
             api_used = "Nominatim"
             
             # Validate zip code if found
@@ -71,9 +75,6 @@ def find_missing_zip_codes(filename, max_attempts=100):
             if found_zip:
                 is_valid_pg_zip = is_valid_prince_georges_zip(found_zip)
             
-            # Add a longer delay for Nominatim to be respectful
-            time.sleep(1.0)
-            
             attempts += 1
             
             result = {
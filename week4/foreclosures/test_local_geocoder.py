@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Unit tests for the offline road / address point geocoder."""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from local_geocoder import RANGE_CONFIDENCE, STREET_CONFIDENCE, RoadGeocoder, house_number
+
+
+def road(name, kind, left, right, zip_left, zip_right=None, city=None):
+    properties = {"ST_NAME": name, "ST_TYPE": kind, "L_F_ADD": left[0], "L_T_ADD": left[1],
+                  "R_F_ADD": right[0], "R_T_ADD": right[1], "ZIP_LEFT": zip_left,
+                  "ZIP_RIGHT": zip_right or zip_left}
+    if city:
+        properties["CITY"] = city
+    return {"type": "Feature", "properties": properties,
+            "geometry": {"type": "LineString", "coordinates": [[-76.9, 38.9], [-76.8, 38.9]]}}
+
+
+FEATURES = [
+    road("MAIN", "ST", (1, 99), (2, 98), "20715"),
+    road("MAIN", "ST", (101, 199), (100, 198), "20716"),
+    road("MAIN", "AVE", (1, 49), (2, 48), "20743"),
+    # A street on a zip code boundary: odd numbers on one side, even on the other
+    road("BORDER", "RD", (1, 99), (2, 98), "20720", "20721"),
+    road("OAK", "DR", (1, 99), (2, 98), "20707", city="LAUREL"),
+    road("OAK", "DR", (1, 99), (2, 98), "20785", city="LANDOVER"),
+    {"type": "Feature", "properties": {"FULLNAME": "ELM CT", "ADDRESS_NUMBER": "7", "ZIP": "20774"},
+     "geometry": {"type": "Point", "coordinates": [-76.8, 38.9]}},
+]
+
+
+class TestRoadGeocoder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "roads.geojson")
+            with open(filename, "w", encoding="utf-8") as file:
+                json.dump({"type": "FeatureCollection", "features": FEATURES}, file)
+            cls.geocoder = RoadGeocoder.from_geojson(filename)
+
+    def test_house_number(self):
+        self.assertEqual(house_number("123A"), 123)
+        self.assertEqual(house_number("111-B"), 111)
+        self.assertIsNone(house_number("A1"))
+
+    def test_number_ranges(self):
+        self.assertEqual(self.geocoder("57", "Main", "ST", "Bowie", "MD"), ("20715", RANGE_CONFIDENCE))
+        self.assertEqual(self.geocoder("157", "Main", "Street", "Bowie", "MD"), ("20716", RANGE_CONFIDENCE))
+        self.assertEqual(self.geocoder("12", "Main", "Ave", "Bowie", "MD"), ("20743", RANGE_CONFIDENCE))
+
+    def test_street_sides(self):
+        self.assertEqual(self.geocoder("31", "Border", "RD", "", "MD")[0], "20720")
+        self.assertEqual(self.geocoder("32", "Border", "Road", "", "MD")[0], "20721")
+
+    def test_city_picks_between_same_named_streets(self):
+        self.assertEqual(self.geocoder("5", "Oak", "DR", "Laurel", "MD")[0], "20707")
+        self.assertEqual(self.geocoder("5", "Oak", "DR", "Landover", "MD")[0], "20785")
+
+    def test_address_points_and_full_names(self):
+        self.assertEqual(self.geocoder("7", "Elm", "CT", "", "MD"), ("20774", RANGE_CONFIDENCE))
+        self.assertEqual(self.geocoder("7", "Elm", "Court", "", "MD"), ("20774", RANGE_CONFIDENCE))
+
+    def test_outside_ranges_and_unknown_streets(self):
+        self.assertEqual(self.geocoder("500", "Main", "AVE", "", "MD"), ("20743", STREET_CONFIDENCE))
+        self.assertEqual(self.geocoder("500", "Main", "ST", "", "MD"), ("20716", STREET_CONFIDENCE))
+        self.assertEqual(self.geocoder("5", "Nowhere", "LN", "", "MD"), (None, None))
+        self.assertEqual(self.geocoder("Rear", "Main", "ST", "", "MD"), (None, None))
+
+    def test_lookups_are_fast(self):
+        start = time.perf_counter()
+        for number in range(1, 10_001):
+            self.geocoder(str(number % 200), "Main", "ST", "Bowie", "MD")
+        self.assertLess((time.perf_counter() - start) / 10_000, 1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
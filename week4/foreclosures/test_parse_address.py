@@ -6,9 +6,17 @@ Tests the unified address parser with various address formats to ensure
 robust parsing across different use cases.
 """
 
+import os
+import tempfile
 import unittest
 from parse_address import parse_address, normalize_street_name
 
+try:
+    import pandas as pd
+    from address_columns import parse_addresses, read_parsed_addresses
+except ImportError:
+    pd = None
+
 
 class TestParseAddress(unittest.TestCase):
     """Test cases for the main parse_address function."""
@@ -217,6 +225,27 @@ class TestParseAddress(unittest.TestCase):
                 self.assertEqual(geocoding_result, expected_geocoding,
                                f"Geocoding parse failed for address: '{address}', got {geocoding_result}, expected {expected_geocoding}")
 
+    def test_pattern_precedence(self):
+        """Test which unit pattern wins when several could match, and how commas affect the street type."""
+        test_cases = [
+            ("12 Main Apt #5", ("12", "Main", "Apt #5", "")),
+            ("12 Main St, Apt 5", ("12", "Main St", "Apt 5", "")),
+            ("7, Oak Ave, Unit 3", ("7", "Oak Ave", "Unit 3", "")),
+            ("9 Court", ("9", "Court", "", "")),
+            ("9 Elm ct", ("9", "Elm", "", "CT")),
+            ("9 Elm St,", ("9", "Elm St", "", "")),
+            ("9 Elm St, Rear", ("9", "Elm", "Rear", "ST")),
+            ("15 Old Way apt 4, b", ("15", "Old Way apt 4", "b", "")),
+            ("3 King St #12,", ("3", "King St #12", "", "")),
+            ("21 Fox Run Apt, 2", ("21", "Fox Run Apt", "2", "")),
+        ]
+
+        for address, expected in test_cases:
+            with self.subTest(address=address):
+                result = parse_address(address)
+                self.assertEqual(result, expected,
+                               f"Failed for address: '{address}', got {result}, expected {expected}")
+
 
 class TestParseAddressForGeocoding(unittest.TestCase):
     """Test cases for the geocoding-specific address parser."""
@@ -321,6 +350,44 @@ class TestNormalizeStreetName(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+@unittest.skipIf(pd is None, "pandas is not installed")
+class TestParseAddresses(unittest.TestCase):
+    """Test cases for parsing whole columns of addresses."""
+
+    addresses = [
+        "1600 Pennsylvania Ave",
+        "456 Oak Dr Apt 2B",
+        "789, Unit 5A Elm Court",
+        "Invalid Address",
+        "",
+        "456 Oak Dr Apt 2B",
+        "  123   Main   Street  ",
+        "12 Main St, Apt 5",
+    ]
+
+    def test_matches_scalar_parser(self):
+        """Every row should equal parse_address() of that address."""
+        series = pd.Series(self.addresses + [None], index=range(10, 19))
+        result = parse_addresses(series)
+        self.assertEqual(list(result.columns), ["number", "name", "unit", "kind"])
+        self.assertEqual(list(result.index), list(series.index))
+        expected = [parse_address(address) for address in self.addresses] + [(None, None, None, None)]
+        self.assertEqual(list(result.itertuples(index=False, name=None)), expected)
+
+    def test_chunked_reader(self):
+        """Chunks should keep the original columns and cover every row."""
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "addresses.csv")
+            pd.DataFrame({"Street Address": self.addresses, "City": "Bowie"}).to_csv(filename, index=False)
+            chunks = list(read_parsed_addresses(filename, chunksize=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 2])
+        combined = pd.concat(chunks)
+        self.assertEqual(list(combined["City"]), ["Bowie"] * len(self.addresses))
+        expected = [parse_address(address) for address in self.addresses]
+        self.assertEqual(list(combined[["number", "name", "unit", "kind"]].itertuples(index=False, name=None)),
+                         expected)
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests combining multiple functions."""
     
@@ -7,7 +7,9 @@ Converted from pytest style to unittest for consistency with other tests.
 import math
 import unittest
 
-from check_pg_county import get_pg_county_polygon, is_in_pg
+import numpy as np
+
+from check_pg_county import are_in_pg, are_in_pg_county, get_pg_county_polygon, is_in_pg, load_pg_county_polygon
 
 
 INSIDE_POINTS = [
@@ -61,5 +63,29 @@ class TestPGCountyBoundary(unittest.TestCase):
                 self.assertFalse(is_in_pg(lat, lon), "Invalid inputs should return False")
 
 
+class TestBatchPGCounty(unittest.TestCase):
+    """Tests for the vectorized are_in_pg() batch check."""
+
+    def test_known_points(self):
+        points = INSIDE_POINTS + OUTSIDE_POINTS + INVALID_POINTS
+        lats, lons = zip(*points)
+        expected = [True] * len(INSIDE_POINTS) + [False] * (len(OUTSIDE_POINTS) + len(INVALID_POINTS))
+        self.assertEqual(are_in_pg(lats, lons).tolist(), expected)
+
+    def test_matches_per_point_check(self):
+        polygon = load_pg_county_polygon('pg_county_boundary.geojson')
+        rng = np.random.default_rng(398)
+        min_lon, min_lat, max_lon, max_lat = polygon.bounds
+        lats = rng.uniform(min_lat - 0.1, max_lat + 0.1, 2000)
+        lons = rng.uniform(min_lon - 0.1, max_lon + 0.1, 2000)
+        expected = [is_in_pg(lat, lon) for lat, lon in zip(lats, lons)]
+        self.assertTrue(any(expected) and not all(expected))
+        self.assertEqual(are_in_pg_county(lats, lons, polygon).tolist(), expected)
+
+    def test_empty_and_missing_polygon(self):
+        self.assertEqual(are_in_pg([], []).tolist(), [])
+        self.assertEqual(are_in_pg_county([38.9897], [-76.9378], None).tolist(), [False])
+
+
 if __name__ == '__main__':  # pragma: no cover
     unittest.main()
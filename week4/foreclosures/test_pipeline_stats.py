@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Unit tests for the pipeline instrumentation (stage timings and JSON progress)."""
+
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from augment_foreclosures import augment_foreclosures_csv
+from geocode_cache import CachedGeocoder, GeocodeCache, LocalGeocoder
+from pipeline_stats import LatencyHistogram, PipelineStats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for microseconds in range(1, 1001):
+            histogram.add(microseconds * 1e-6)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.mean, 500.5e-6)
+        self.assertAlmostEqual(histogram.max, 1e-3)
+        # Bucket upper bounds are within 9% of the exact percentile
+        self.assertTrue(500e-6 <= histogram.percentile(0.5) <= 500e-6 * 1.09)
+        self.assertTrue(950e-6 <= histogram.percentile(0.95) <= 950e-6 * 1.09)
+        self.assertEqual(histogram.percentile(1.0), 1e-3)
+
+    def test_empty_and_tiny(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(0.5), 0.0)
+        histogram.add(0.0)
+        self.assertEqual(histogram.percentile(0.5), 0.0)
+
+
+class TestPipelineStats(unittest.TestCase):
+    def test_stage_timing_and_reports(self):
+        clock = FakeClock()
+        stream = io.StringIO()
+        stats = PipelineStats(stream, interval=5, clock=clock)
+        with stats.time('parse'):
+            clock.now += 0.25
+        self.assertEqual(list(stats.timed([1, 2], 'read')), [1, 2])
+        stats.counts['rows'] += 10
+        clock.now += 4
+        stats.maybe_report()
+        self.assertEqual(stream.getvalue(), '')
+        clock.now += 1
+        stats.maybe_report()
+        line = json.loads(stream.getvalue())
+        self.assertEqual(line['event'], 'progress')
+        self.assertEqual(line['rows_per_sec'], round(10 / 5.25, 1))
+        self.assertEqual(line['stages']['parse']['count'], 1)
+        self.assertAlmostEqual(line['stages']['parse']['total'], 0.25)
+        self.assertEqual(line['stages']['read']['count'], 2)
+        profile = stats.profile()
+        self.assertIn('parse', profile)
+        self.assertIn('10 rows in 5.25s', profile)
+
+    def test_geocoder_metrics(self):
+        cache = GeocodeCache(':memory:')
+        geocoder = CachedGeocoder(LocalGeocoder({("1", "Oak", "DR", "Bowie", "MD"): "20715"}), cache)
+        geocoder("1", "Oak", "DR", "Bowie", "MD")
+        geocoder("1", "Oak", "DR", "Bowie", "MD")
+        geocoder.slept = 1.5
+        stats = PipelineStats()
+        stats.watch(geocoder)
+        metrics = stats.geocoder_metrics()
+        requests = metrics.pop('requests')
+        self.assertEqual(metrics, {'cache_hits': 1, 'cache_hit_rate': 0.5, 'rate_limit_sleep': 1.5})
+        # Only the cache miss reached the backend and was timed
+        self.assertEqual(requests['count'], 1)
+        self.assertIn('Geocoding requests: 1, p50', stats.profile())
+        cache.close()
+
+    def test_augment_reports_progress(self):
+        rows = [{"Street Address": f"{n} Oak Dr", "City": "Bowie", "State": "MD", "Zip Code": ""}
+                for n in range(1, 6)]
+        backend = LocalGeocoder({("1", "Oak", "DR", "Bowie", "MD"): "20715"})
+        stream = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            input_file = os.path.join(directory, "in.csv")
+            with open(input_file, "w", newline="", encoding="utf-8") as file:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                augment_foreclosures_csv(input_file, os.path.join(directory, "out.csv"), backend,
+                                         stats=PipelineStats(stream, interval=0))
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[-1]['event'], 'done')
+        self.assertEqual(lines[-1]['counts']['rows'], 5)
+        self.assertEqual(lines[-1]['counts']['geocoded'], 1)
+        self.assertEqual(set(lines[-1]['stages']), {'read', 'parse', 'geocode', 'validate', 'journal', 'write'})
+        self.assertEqual(lines[-1]['stages']['geocode']['count'], 5)
+        self.assertIn("=== PROFILE ===", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
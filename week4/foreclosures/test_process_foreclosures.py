@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Unit tests for the multi-file, multi-process foreclosure driver."""
+
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from augment_foreclosures import augment_foreclosures_csv
+from geocode_cache import CachedGeocoder, GeocodeCache, LocalGeocoder
+from geocoding_utils import PG_ZIP_CODES
+from process_foreclosures import imap, load_zip_codes, output_filenames, process_files, split_ranges
+
+FIELDS = ["Case", "Street Address", "City", "State", "Zip Code"]
+ZIPS = ["20705", "20706", "20707", "20708", "20710", "20712", "90210"]
+
+
+def write_csv(filename, rows):
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        writer.writerows(rows)
+
+
+def read_csv(filename):
+    with open(filename, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+class TestSplitRanges(unittest.TestCase):
+    def test_ranges_end_on_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "in.csv")
+            write_csv(filename, [[str(n), f"{n} Oak Dr, Apt {n}", "Bowie", "MD", ""] for n in range(200)])
+            with open(filename, "rb") as f:
+                data = f.read()
+            for chunk_size in (1, 37, 500, 10 ** 6):
+                with self.subTest(chunk_size=chunk_size):
+                    header, ranges = split_ranges(filename, chunk_size)
+                    self.assertEqual(header, data[:len(header)])
+                    self.assertEqual(b"".join(data[start:end] for start, end in ranges), data[len(header):])
+                    self.assertTrue(all(data[end - 1:end] == b"\n" for _, end in ranges))
+
+
+class CountingPool(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+class TestImap(unittest.TestCase):
+    def test_ordered_and_bounded(self):
+        with CountingPool() as pool:
+            results = imap(pool, lambda n: n * n, range(10), 3)
+            self.assertEqual(next(results), 0)
+            # Only the tasks within 3 of the one consumed have been submitted
+            self.assertEqual(pool.submitted, 4)
+            self.assertEqual(list(results), [n * n for n in range(1, 10)])
+            self.assertEqual(pool.submitted, 10)
+
+
+class TestProcessFiles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.results = {(str(n), "Oak", "DR", "Bowie", "MD"): ZIPS[n % len(ZIPS)] for n in range(1, 40)}
+        self.inputs = []
+        for month in range(3):
+            rows = []
+            for n in range(60):
+                number = (n * 7 + month) % 45 + 1
+                zip_code = "20774" if n % 5 == 0 else ""
+                rows.append([f"{month}-{n}", f"{number} Oak Dr", "Bowie", "MD", zip_code])
+            rows.append([f"{month}-x", "Invalid Address", "Bowie", "MD", ""])
+            filename = os.path.join(self.directory.name, f"month{month}.csv")
+            write_csv(filename, rows)
+            self.inputs.append(filename)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_files(self, backend, cache_name, workers, chunk_size, output_dir):
+        cache = GeocodeCache(os.path.join(self.directory.name, cache_name))
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return process_files(self.inputs, output_dir, CachedGeocoder(backend, cache), workers, chunk_size)
+        finally:
+            cache.close()
+
+    def test_matches_single_file_augmentation(self):
+        output_dir = os.path.join(self.directory.name, "out")
+        backend = LocalGeocoder(self.results)
+        summaries = self.run_files(backend, "cache.sqlite", 2, 300, output_dir)
+        # Each distinct address is geocoded once across all files
+        distinct = {row[1] for filename in self.inputs for row in read_csv(filename)[1:]
+                    if not row[4] and row[1] != "Invalid Address"}
+        self.assertEqual(backend.calls, len(distinct))
+        for filename in self.inputs:
+            expected = os.path.join(self.directory.name, "expected.csv")
+            with contextlib.redirect_stdout(io.StringIO()):
+                augment_foreclosures_csv(filename, expected, LocalGeocoder(self.results))
+            output = os.path.join(output_dir, os.path.basename(filename).replace(".csv", "_augmented.csv"))
+            self.assertEqual(read_csv(output), read_csv(expected))
+            self.assertEqual(summaries[output]["rows"], 61)
+
+    def test_deterministic_and_uses_cache(self):
+        first = os.path.join(self.directory.name, "first")
+        second = os.path.join(self.directory.name, "second")
+        self.run_files(LocalGeocoder(self.results), "cache.sqlite", 1, 10 ** 6, first)
+        backend = LocalGeocoder(self.results)
+        summaries = self.run_files(backend, "cache.sqlite", 2, 200, second)
+        # Everything was answered by the workers from the cache
+        self.assertEqual(backend.calls, 0)
+        self.assertGreater(sum(counts["cached"] for counts in summaries.values()), 0)
+        for filename in sorted(os.listdir(first)):
+            self.assertEqual(read_csv(os.path.join(first, filename)), read_csv(os.path.join(second, filename)))
+
+    def test_same_names_in_different_directories(self):
+        inputs = []
+        for county, rows in [("a", [["1", "1 Oak Dr", "Bowie", "MD", ""]]),
+                             ("b", [["2", "2 Oak Dr", "Bowie", "MD", ""], ["3", "3 Oak Dr", "Bowie", "MD", ""]])]:
+            os.makedirs(os.path.join(self.directory.name, county))
+            inputs.append(os.path.join(self.directory.name, county, "jan.csv"))
+            write_csv(inputs[-1], rows)
+        output_dir = os.path.join(self.directory.name, "out")
+        with contextlib.redirect_stdout(io.StringIO()):
+            summaries = process_files(inputs, output_dir, LocalGeocoder(self.results), 1)
+        outputs = [os.path.join(output_dir, county, "jan_augmented.csv") for county in "ab"]
+        self.assertEqual(list(summaries), outputs)
+        self.assertEqual([len(read_csv(output)) for output in outputs], [2, 3])
+
+    def test_output_filenames(self):
+        self.assertEqual(output_filenames(self.inputs, "out"),
+                         [os.path.join("out", f"month{month}_augmented.csv") for month in range(3)])
+        with self.assertRaises(ValueError):
+            output_filenames([self.inputs[0], self.inputs[0]], "out")
+
+    def test_zip_codes_of_other_counties(self):
+        # Charles County, outside the default Prince George's zip codes
+        filename = os.path.join(self.directory.name, "charles.csv")
+        write_csv(filename, [["1", "1 Oak Dr", "La Plata", "MD", ""]])
+        backend = LocalGeocoder({("1", "Oak", "DR", "La Plata", "MD"): "20646"})
+        zip_file = os.path.join(self.directory.name, "charles_zips.txt")
+        with open(zip_file, "w", encoding="utf-8") as f:
+            f.write("20646, 20664\n20675\n")
+        self.assertEqual(load_zip_codes("pg"), PG_ZIP_CODES)
+        self.assertIsNone(load_zip_codes("any"))
+        self.assertEqual(load_zip_codes(zip_file), {"20646", "20664", "20675"})
+        for zip_codes, expected in [(PG_ZIP_CODES, ""), (load_zip_codes(zip_file), "20646"), (None, "20646")]:
+            with self.subTest(zip_codes=zip_codes):
+                output_dir = os.path.join(self.directory.name, "out")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    process_files([filename], output_dir, backend, 1, zip_codes=zip_codes)
+                self.assertEqual(read_csv(os.path.join(output_dir, "charles_augmented.csv"))[1][4], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
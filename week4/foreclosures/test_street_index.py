@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Unit tests for fuzzy street name matching."""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from augment_foreclosures import augment_foreclosures_csv, canonical_address_key, make_street_index
+from geocode_cache import CachedGeocoder, GeocodeCache, LocalGeocoder
+from local_geocoder import RoadGeocoder
+from street_index import StreetIndex, canonical_street, deletions, edit_distance
+from test_augment_foreclosures import FailingGeocoder
+from test_local_geocoder import road
+
+
+def make_index():
+    index = StreetIndex()
+    for name, kind in [("PENNSYLVANIA", "AVE"), ("OAK", "DR"), ("MARLBORO", "PIKE"), ("LAUREL", "DR"),
+                       ("LAURELS", "DR"), ("ELM", "CT"), ("ELK", "CT"), ("GREENBELT RD", None)]:
+        index.add(name, kind)
+    return index
+
+
+class TestEditDistance(unittest.TestCase):
+    def test_distances(self):
+        self.assertEqual(edit_distance("OAK DRIVE", "OAK DRIVE", 2), 0)
+        self.assertEqual(edit_distance("OAK DRVE", "OAK DRIVE", 2), 1)
+        self.assertEqual(edit_distance("PENNSYLVAINA", "PENNSYLVANIA", 2), 1)  # swapped letters
+        self.assertEqual(edit_distance("KITTEN", "SITTING", 3), 3)
+        self.assertEqual(edit_distance("KITTEN", "SITTING", 1), 2)  # limit + 1
+        self.assertEqual(edit_distance("A", "ABCD", 1), 2)
+
+    def test_deletions(self):
+        self.assertEqual(deletions("OAK", 1), {"OAK", "AK", "OK", "OA"})
+        self.assertIn("K", deletions("OAK", 2))
+
+    def test_canonical_street(self):
+        self.assertEqual(canonical_street("Oak", "DR"), "OAK DRIVE")
+        self.assertEqual(canonical_street("Main St", ""), "MAIN STREET")
+        self.assertIsNone(canonical_street("", "DR"))
+
+
+class TestStreetIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = make_index()
+
+    def test_exact_and_misspelled(self):
+        self.assertEqual(self.index.match("Oak", "DR"), ("OAK", "DR", 0))
+        self.assertEqual(self.index.match("Oak Drive", ""), ("OAK", "DR", 0))
+        self.assertEqual(self.index.match("Pennsylvnia", "AVE"), ("PENNSYLVANIA", "AVE", 1))
+        self.assertEqual(self.index.match("Oak Drve", ""), ("OAK", "DR", 1))
+        self.assertEqual(self.index.match("Greenbelt", "RD"), ("GREENBELT", "RD", 0))
+        self.assertEqual(self.index.match("Marlboor", "PIKE"), ("MARLBORO", "PIKE", 1))
+
+    def test_no_match(self):
+        self.assertIsNone(self.index.match("Nowhere", "LN"))
+        self.assertIsNone(self.index.match("Pensylvnia", "AVE"))  # two edits
+        # Equally close to LAUREL DR and LAURELS DR
+        self.assertIsNone(self.index.match("Laurela", "DR"))
+        # Short names are only matched exactly
+        self.assertIsNone(self.index.match("Elx", "CT"))
+        self.assertIsNone(self.index.match("", "CT"))
+
+    def test_directionals_and_numbers_are_kept(self):
+        index = StreetIndex()
+        for name, kind in [("E MAIN", "ST"), ("112TH", "ST"), ("CENTRAL AVE E", None), ("N CAPITOL", "ST")]:
+            index.add(name, kind)
+        self.assertIsNone(index.match("W Main", "ST"))
+        self.assertIsNone(index.match("Main", "ST"))
+        self.assertIsNone(index.match("12TH", "ST"))
+        self.assertIsNone(index.match("113TH", "ST"))
+        self.assertIsNone(index.match("Central Ave W", ""))
+        self.assertEqual(index.correct("W Main", "ST"), ("W Main", "ST"))
+        self.assertEqual(index.corrected, 0)
+        # Typos elsewhere in the name are still corrected
+        self.assertEqual(index.match("E Mian", "ST"), ("E MAIN", "ST", 1))
+        self.assertEqual(index.match("112TH", "STREET"), ("112TH", "ST", 0))
+        self.assertEqual(index.match("N Capitl", "ST"), ("N CAPITOL", "ST", 1))
+        self.assertEqual(index.recover("12Main St"), (None, None, None))
+
+    def test_correct_counts(self):
+        self.assertEqual(self.index.correct("Oak", "DR"), ("Oak", "DR"))
+        self.assertEqual(self.index.correct("Pennsylvnia", "AVE"), ("PENNSYLVANIA", "AVE"))
+        self.assertEqual(self.index.correct("Nowhere", "LN"), ("Nowhere", "LN"))
+        self.assertEqual(self.index.corrected, 1)
+
+    def test_larger_distance(self):
+        index = StreetIndex(max_distance=2)
+        index.add("PENNSYLVANIA", "AVE")
+        self.assertEqual(index.match("Pensylvnia", "AVE"), ("PENNSYLVANIA", "AVE", 2))
+
+    def test_recover(self):
+        self.assertEqual(self.index.recover("123Oak Dr"), ("123", "OAK", "DR"))
+        self.assertEqual(self.index.recover("Pennsylvnia Ave 4500"), ("4500", "PENNSYLVANIA", "AVE"))
+        self.assertEqual(self.index.recover("Oak Dr, 12B"), ("12B", "OAK", "DR"))
+        self.assertEqual(self.index.recover("Invalid Address"), (None, None, None))
+        self.assertEqual(self.index.recover("Nowhere Ln 12"), (None, None, None))
+        self.assertEqual(self.index.recovered, 3)
+
+    def test_sources(self):
+        roads = RoadGeocoder()
+        roads.add_range("MAIN", "ST", 1, 99, "20715")
+        roads.add_range("BRANCH AVE", None, 1, 99, "20748")
+        cache = GeocodeCache(":memory:")
+        cache.put(("1", "OAK", "DR", "BOWIE", "MD"), "20715", 0.5)
+        cache.put(("2", "NOWHERE", "LN", "BOWIE", "MD"), None, None)
+        index = StreetIndex()
+        index.add_roads(roads)
+        index.add_cache(cache)
+        cache.close()
+        self.assertEqual(len(index), 3)
+        self.assertIn(("Main", "ST"), index)
+        self.assertIn(("Branch", "AVE"), index)
+        self.assertIn(("Oak", "DR"), index)
+        self.assertNotIn(("Nowhere", "LN"), index)
+
+    def test_lookups_are_fast(self):
+        generator = random.Random(1)
+        words = ["OAK", "MAPLE", "RIDGE", "GLEN", "HILL", "WOOD", "BROOK", "FIELD", "STONE", "MILL",
+                 "LAKE", "CREST", "VIEW", "SPRING", "MEADOW", "FOX", "DEER", "KING", "CHURCH", "MARL"]
+        kinds = ["ST", "AVE", "DR", "RD", "CT", "LN", "PL", "WAY", "TER"]
+        index = StreetIndex()
+        while len(index) < 10_000:
+            index.add("".join(generator.sample(words, generator.choice([2, 3]))), generator.choice(kinds))
+        names = [index.streets[canonical][0] for canonical in generator.sample(list(index.streets), 500)]
+        queries = []
+        for name in names:
+            position = generator.randrange(len(name))
+            queries.append(name[:position] + "Q" + name[position + 1:])
+        start = time.perf_counter()
+        for query in queries:
+            index.match(query, "DR")
+        self.assertLess((time.perf_counter() - start) / len(queries), 1e-3)
+
+
+class TestAugmentWithStreets(unittest.TestCase):
+    def test_canonical_key(self):
+        index = make_index()
+        key = canonical_address_key("456 Oak Dr", "Bowie", "MD")[0]
+        self.assertEqual(canonical_address_key("456 Oak Drve", "Bowie", "MD", index)[0], key)
+        self.assertEqual(canonical_address_key("456Oak Dr", "Bowie", "MD", index)[0], key)
+        self.assertEqual(canonical_address_key("456Oak Dr", "Bowie", "MD"), (None, None))
+
+    def test_misspellings_share_lookup(self):
+        rows = [["456 Oak Dr", "Bowie", "MD", ""], ["456 Oak Drve", "Bowie", "MD", ""],
+                ["456Oak Dr", "Bowie", "MD", ""], ["4500 Pennsylvnia Ave", "Bowie", "MD", ""],
+                ["Invalid Address", "Bowie", "MD", ""]]
+        backend = LocalGeocoder({("456", "OAK", "DR", "Bowie", "MD"): "20716",
+                                 ("4500", "PENNSYLVANIA", "AVE", "Bowie", "MD"): "20746"})
+        cache = GeocodeCache(":memory:")
+        with tempfile.TemporaryDirectory() as directory:
+            input_file = os.path.join(directory, "in.csv")
+            output_file = os.path.join(directory, "out.csv")
+            with open(input_file, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(["Street Address", "City", "State", "Zip Code"])
+                writer.writerows(rows)
+            streets = make_index()
+            with contextlib.redirect_stdout(io.StringIO()):
+                augment_foreclosures_csv(input_file, output_file, CachedGeocoder(backend, cache),
+                                         streets=streets)
+            with open(output_file, newline="", encoding="utf-8") as file:
+                zips = [row[3] for row in list(csv.reader(file))[1:]]
+        cache.close()
+        self.assertEqual(zips, ["20716", "20716", "20716", "20746", ""])
+        self.assertEqual(backend.calls, 2)
+        self.assertEqual((streets.corrected, streets.recovered), (2, 1))
+
+    @mock.patch("augment_foreclosures.BATCH_SIZE", 1)
+    def test_rows_copied_after_failure_are_not_counted(self):
+        rows = [["456 Oak Drve", "Bowie", "MD", ""], ["9 Nowhere Ln", "Bowie", "MD", ""],
+                ["4500 Pennsylvnia Ave", "Bowie", "MD", ""], ["456Oak Dr", "Bowie", "MD", ""]]
+        backend = FailingGeocoder({("456", "OAK", "DR", "Bowie", "MD"): "20716"}, fail_after=1)
+        with tempfile.TemporaryDirectory() as directory:
+            input_file = os.path.join(directory, "in.csv")
+            output_file = os.path.join(directory, "out.csv")
+            with open(input_file, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(["Street Address", "City", "State", "Zip Code"])
+                writer.writerows(rows)
+            streets = make_index()
+            with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(ConnectionError):
+                augment_foreclosures_csv(input_file, output_file, backend, resume=False, streets=streets)
+            with open(output_file, newline="", encoding="utf-8") as file:
+                self.assertEqual(len(list(csv.reader(file))), len(rows) + 1)
+        # Only the rows read before the failure count
+        self.assertEqual((streets.corrected, streets.recovered), (1, 0))
+
+    def test_fuzzy_streets_come_from_the_road_file(self):
+        # The cache has only seen Hill Rd; the road file knows Mill Rd too
+        cache = GeocodeCache(":memory:")
+        cache.put(("1", "HILL", "RD", "BOWIE", "MD"), "20715", 0.5)
+        with tempfile.TemporaryDirectory() as directory:
+            roads = os.path.join(directory, "roads.geojson")
+            with open(roads, "w", encoding="utf-8") as file:
+                json.dump({"type": "FeatureCollection", "features": [
+                    road("HILL", "RD", (1, 99), (2, 98), "20715"), road("MILL", "RD", (1, 99), (2, 98), "20716")]},
+                    file)
+            args = argparse.Namespace(fuzzy_streets=True)
+            with mock.patch("augment_foreclosures.ROADS_FILE", roads), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                streets = make_street_index(args, CachedGeocoder(LocalGeocoder({}), cache))
+        cache.close()
+        self.assertEqual(len(streets), 2)
+        self.assertEqual(streets.correct("Mill", "RD"), ("Mill", "RD"))
+        self.assertEqual(streets.corrected, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
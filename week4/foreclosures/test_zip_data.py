@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Unit tests for the ACS DP04 zip code table and its join to foreclosure rows."""
+
+import math
+import unittest
+
+from geocoding_utils import PG_ZIP_CODES, is_valid_prince_georges_zip
+
+try:
+    import pandas as pd
+    from zip_data import (HOUSING_UNITS, OWNER_OCCUPIED, dp04_label, foreclosure_rates, join_dp04,
+                          load_dp04, normalize_zips)
+except ImportError:
+    pd = None
+
+
+class TestPGZipCodes(unittest.TestCase):
+    def test_valid_zips(self):
+        self.assertTrue(is_valid_prince_georges_zip('20774'))
+        self.assertFalse(is_valid_prince_georges_zip('90210'))
+        self.assertFalse(is_valid_prince_georges_zip(None))
+
+
+@unittest.skipIf(pd is None, "pandas is not installed")
+class TestDP04(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dp04 = load_dp04()
+
+    def test_table(self):
+        self.assertIs(load_dp04(), self.dp04)
+        self.assertEqual(set(self.dp04.index), PG_ZIP_CODES)
+        self.assertEqual(self.dp04.loc['20601', HOUSING_UNITS], 10041)
+        self.assertEqual(self.dp04.loc['20601', OWNER_OCCUPIED], 7215)
+        self.assertEqual(dp04_label(HOUSING_UNITS), 'Estimate!!HOUSING OCCUPANCY!!Total housing units')
+        self.assertNotIn('NAME', self.dp04.columns)
+        # "(X)" placeholders become NaN
+        self.assertTrue(self.dp04['DP04_0001PM'].isna().all())
+
+    def test_normalize_zips(self):
+        zips = normalize_zips(['20774', '20774-1234', 'ZCTA5 20601', '2077', None])
+        self.assertEqual(zips.tolist()[:3], ['20774', '20774', '20601'])
+        self.assertTrue(zips[3:].isna().all())
+
+    def test_join(self):
+        rows = pd.DataFrame({'Zip Code': ['20601', '20774-1234', None, '', '99999', '20601'],
+                             'Case': range(6)})
+        joined = join_dp04(rows, [HOUSING_UNITS, OWNER_OCCUPIED])
+        self.assertEqual(joined['Case'].tolist(), list(range(6)))
+        self.assertEqual(joined['zip'].tolist()[:2], ['20601', '20774'])
+        units = joined[HOUSING_UNITS].tolist()
+        self.assertEqual(units[0], 10041)
+        self.assertEqual(units[5], 10041)
+        self.assertEqual(units[1], self.dp04.loc['20774', HOUSING_UNITS])
+        self.assertTrue(all(math.isnan(value) for value in units[2:5]))
+
+    def test_join_without_zips(self):
+        for zip_codes in ([None, None], [None, '', 'unknown'], []):
+            with self.subTest(zip_codes=zip_codes):
+                rows = pd.DataFrame({'Zip Code': zip_codes, 'Case': range(len(zip_codes))})
+                joined = join_dp04(rows, [HOUSING_UNITS, OWNER_OCCUPIED])
+                self.assertEqual(len(joined), len(zip_codes))
+                self.assertTrue(joined['zip'].isna().all())
+                self.assertTrue(joined[HOUSING_UNITS].isna().all())
+                self.assertTrue(joined[OWNER_OCCUPIED].isna().all())
+
+    def test_foreclosure_rates(self):
+        rows = pd.DataFrame({'Zip Code': ['20601'] * 3 + ['20774-0001', '99999', None]})
+        rates = foreclosure_rates(rows)
+        self.assertEqual(rates.index.tolist(), ['20601', '20774'])
+        self.assertEqual(rates.loc['20601', 'foreclosures'], 3)
+        self.assertAlmostEqual(rates.loc['20601', 'per_1000_units'], 3 / 10041 * 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Zip code (ZCTA) housing data from the ACS DP04 table, indexed by zip code.
+
+ACSDP5Y2020.DP04-Data.csv has one row per ZCTA ("ZCTA5 20601") and several
+hundred estimate/margin columns, with a second header row of descriptive
+labels. load_dp04() parses it once per process into a numeric DataFrame
+indexed by 5-digit zip code, and join_dp04() attaches chosen columns to
+foreclosure rows by zip in a single vectorized step: each distinct zip is
+looked up once (pd.factorize) and the results are spread back to the rows,
+so joining millions of rows costs little more than reading them.
+
+foreclosure_rates() uses the join to compare foreclosures per zip with its
+housing units.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ACS_FILE = "ACSDP5Y2020.DP04-Data.csv"
+# Estimate!!HOUSING OCCUPANCY!!Total housing units
+HOUSING_UNITS = "DP04_0001E"
+# Estimate!!HOUSING TENURE!!Occupied housing units!!Owner-occupied
+OWNER_OCCUPIED = "DP04_0046E"
+
+# Parsed DP04 tables by filename, so each file is read once per process
+_DP04_CACHE = {}
+
+
+def normalize_zips(values):
+    """
+    First 5-digit zip code in each value ("20774-1234" -> "20774", "ZCTA5 20601" -> "20601").
+
+    Args:
+        values: pandas Series (or sequence) of zip codes in any form
+
+    Returns:
+        pandas Series of 5-character strings, with NaN where there is no zip code
+    """
+    series = pd.Series(values, dtype="string")
+    return series.str.extract(r"(\d{5})", expand=False)
+
+
+def _factorize_zips(values):
+    """
+    Codes and normalized zip codes of the distinct values, so each distinct
+    spelling is normalized once however many rows share it.
+
+    Returns:
+        tuple: (codes, zips) with codes -1 for missing values
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype="string"))
+    return codes, normalize_zips(uniques)
+
+
+def read_dp04(filename=ACS_FILE):
+    """
+    Parse a DP04 CSV file.
+
+    Returns:
+        tuple: (table, labels) where table is a numeric DataFrame of every
+        estimate and margin column indexed by zip code, and labels maps each
+        column code to its description ("Estimate!!HOUSING OCCUPANCY!!...")
+    """
+    raw = pd.read_csv(filename, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    raw = raw.loc[:, ~raw.columns.str.startswith("Unnamed")]
+    # The first data row holds the descriptive labels
+    labels = raw.iloc[0].to_dict()
+    raw = raw.iloc[1:]
+    zips = normalize_zips(raw["NAME"]).fillna(raw["GEO_ID"].str[-5:])
+    # "(X)", "-" and "**" mark missing values; "2,000+" style values are top-coded
+    values = raw.drop(columns=["GEO_ID", "NAME"]).apply(
+        lambda column: pd.to_numeric(column.str.replace(r"[,+]", "", regex=True), errors="coerce"))
+    values.index = pd.Index(zips, name="zip")
+    return values, labels
+
+
+def load_dp04(filename=ACS_FILE):
+    """The read_dp04() table of a file, parsed on first use and cached."""
+    if filename not in _DP04_CACHE:
+        _DP04_CACHE[filename] = read_dp04(filename)
+    return _DP04_CACHE[filename][0]
+
+
+def dp04_label(column, filename=ACS_FILE):
+    """Description of a DP04 column code, e.g. DP04_0001E."""
+    load_dp04(filename)
+    return _DP04_CACHE[filename][1][column]
+
+
+def join_dp04(foreclosures, columns=(HOUSING_UNITS,), zip_column="Zip Code", dp04=None):
+    """
+    Add DP04 columns to foreclosure rows, matched by zip code.
+
+    Args:
+        foreclosures: DataFrame with a zip code column
+        columns: DP04 column codes to add
+        zip_column: Name of the zip code column ("20774", "20774-1234", ...)
+        dp04: Table from load_dp04() (default: ACS_FILE)
+
+    Returns:
+        DataFrame: foreclosures with a "zip" column (normalized zip code) and
+        the requested columns, NaN for rows whose zip is missing or not in DP04
+    """
+    if dp04 is None:
+        dp04 = load_dp04()
+    columns = list(columns)
+    # Look up each distinct zip once, then spread the values back over the rows
+    codes, zips = _factorize_zips(foreclosures[zip_column].to_numpy())
+    values = dp04.reindex(pd.Index(zips))[columns].to_numpy(dtype=float)
+    # A last row of NaN for code -1 (no zip), which also works when no row has a zip
+    values = np.vstack([values, np.full((1, len(columns)), np.nan)])
+    joined = foreclosures.copy()
+    joined["zip"] = zips.array.take(codes, allow_fill=True)
+    for position, column in enumerate(columns):
+        joined[column] = values[codes, position]
+    return joined
+
+
+def foreclosure_rates(foreclosures, zip_column="Zip Code", dp04=None):
+    """
+    Foreclosures per 1,000 housing units in each zip code.
+
+    Args:
+        foreclosures: DataFrame with one row per foreclosure
+        zip_column: Name of the zip code column
+        dp04: Table from load_dp04() (default: ACS_FILE)
+
+    Returns:
+        DataFrame indexed by zip with columns foreclosures, housing_units and
+        per_1000_units, sorted by rate (highest first). Zips not in DP04 are left out.
+    """
+    if dp04 is None:
+        dp04 = load_dp04()
+    codes, zips = _factorize_zips(foreclosures[zip_column].to_numpy())
+    counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(zips)), index=zips)
+    counts = counts.groupby(level=0).sum().rename_axis("zip")
+    table = pd.DataFrame({"foreclosures": counts})
+    table = table.join(dp04[[HOUSING_UNITS]].rename(columns={HOUSING_UNITS: "housing_units"}), how="inner")
+    table["per_1000_units"] = table["foreclosures"] / table["housing_units"] * 1000
+    return table.sort_values("per_1000_units", ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Foreclosures per 1,000 housing units by zip code")
+    parser.add_argument("foreclosures", nargs="?", default="County_Foreclosures_augmented.csv",
+                        help="Foreclosure CSV (default: County_Foreclosures_augmented.csv)")
+    parser.add_argument("--acs", default=ACS_FILE, help=f"ACS DP04 CSV (default: {ACS_FILE})")
+    parser.add_argument("--zip-column", default="Zip Code", help="Zip code column of the foreclosure CSV")
+    args = parser.parse_args()
+
+    foreclosures = pd.read_csv(args.foreclosures, usecols=[args.zip_column], dtype=str)
+    rates = foreclosure_rates(foreclosures, args.zip_column, load_dp04(args.acs))
+    print(f"{len(foreclosures):,} foreclosures, {rates['foreclosures'].sum():,} in "
+          f"{len(rates)} zip codes with ACS housing data")
+    print(rates.to_string(float_format=lambda value: f"{value:,.1f}"))
+
+
+if __name__ == "__main__":
+    main()
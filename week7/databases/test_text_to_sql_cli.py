@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Unit tests for the SQL cache of text_to_sql_cli, using the offline LocalModel."""
+
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import text_to_sql_cli
+from text_to_sql_cli import REPAIR_INSTRUCTIONS, LocalModel, SQLCache, cache_key
+
+QUESTION = "Who are the people?"
+
+
+class TestLocalModel(unittest.TestCase):
+    def test_question_with_blank_lines(self):
+        question = "List the people.\n\nOnly their names, please."
+        model = LocalModel({question: "SELECT name FROM people"})
+        prompt = f"Schema:\n\nCREATE TABLE people (name TEXT)\n\nQuestion:\n\n{question}"
+        self.assertEqual(model.prompt(prompt).text(), "SELECT name FROM people")
+        repair = f"{prompt}\n\n{REPAIR_INSTRUCTIONS}\nSQL that failed:\n\nSELECT nope\n\nError:\n\nno such column"
+        self.assertEqual(model.prompt(repair).text(), "SELECT name FROM people")
+        self.assertEqual(model.prompt(prompt.replace("List", "Count")).text(), "")
+
+
+class TestSQLCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.directory.name, "people.db")
+        self.cache = os.path.join(self.directory.name, "cache.db")
+        self.output = os.path.join(self.directory.name, "out.csv")
+        connection = sqlite3.connect(self.db)
+        with connection:
+            connection.execute("CREATE TABLE people (name TEXT)")
+            connection.executemany("INSERT INTO people VALUES (?)", [("Ada",), ("Grace",)])
+        connection.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_answers(self, answers):
+        filename = os.path.join(self.directory.name, "answers.json")
+        with open(filename, "w", encoding="utf-8") as fh:
+            json.dump(answers, fh)
+        return f"local:{filename}"
+
+    def run_cli(self, model, *options):
+        """Run main() and return how many times it loaded the model."""
+        argv = ["text_to_sql_cli.py", self.db, QUESTION, "--model", model, "--cache", self.cache,
+                "--output", self.output, *options]
+        with mock.patch("sys.argv", argv), \
+                mock.patch.object(text_to_sql_cli, "get_model", wraps=text_to_sql_cli.get_model) as get_model, \
+                contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            try:
+                text_to_sql_cli.main()
+            except SystemExit as e:
+                if e.code:
+                    raise
+        return get_model.call_count
+
+    def cached_rows(self):
+        """Rows of the cache table, oldest first."""
+        connection = sqlite3.connect(self.cache)
+        connection.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in connection.execute("SELECT * FROM sql_cache ORDER BY updated")]
+        finally:
+            connection.close()
+
+    def read_output(self):
+        with open(self.output, encoding="utf-8") as fh:
+            return fh.read().split()
+
+    def test_second_run_uses_cache(self):
+        model = self.write_answers({QUESTION: "SELECT name FROM people"})
+        self.assertEqual(self.run_cli(model), 1)
+        os.remove(self.output)
+        self.assertEqual(self.run_cli(model), 0)
+        self.assertEqual(self.read_output(), ["name", "Ada", "Grace"])
+
+    def test_repaired_sql_replaces_failed_entry(self):
+        model = self.write_answers({QUESTION: ["SELECT nope FROM missing", "SELECT name FROM people"]})
+        self.assertEqual(self.run_cli(model), 1)
+        [row] = self.cached_rows()
+        self.assertEqual((row["sql"], row["ok"], row["error"]), ("SELECT name FROM people", 1, None))
+        self.assertEqual(self.run_cli(model), 0)
+
+    def test_failed_entry_is_bypassed(self):
+        model = self.write_answers({QUESTION: "SELECT name FROM people"})
+        self.run_cli(model, "--no-exec")
+        [row] = self.cached_rows()
+        self.assertIsNone(row["ok"])
+        SQLCache(self.cache).put(row["key"], QUESTION, model, "SELECT nope FROM missing", ok=False, error="boom")
+        self.assertEqual(self.run_cli(model), 1)
+        [row] = self.cached_rows()
+        self.assertEqual((row["sql"], row["ok"]), ("SELECT name FROM people", 1))
+
+    def test_schema_change_gives_new_key(self):
+        model = self.write_answers({QUESTION: "SELECT name FROM people"})
+        self.run_cli(model)
+        connection = sqlite3.connect(self.db)
+        with connection:
+            connection.execute("CREATE TABLE pets (name TEXT)")
+        connection.close()
+        self.assertEqual(self.run_cli(model), 1)
+        self.assertEqual(len({row["key"] for row in self.cached_rows()}), 2)
+
+    def test_cache_key(self):
+        schema = "CREATE TABLE people (name TEXT)"
+        key = cache_key(QUESTION, "local", "system", schema)
+        self.assertEqual(cache_key("  who are the PEOPLE ", "local", "system", schema), key)
+        self.assertNotEqual(cache_key(QUESTION, "local", "system", schema.replace("people", "pets")), key)
+        self.assertNotEqual(cache_key(QUESTION, "other", "system", schema), key)
+
+
+if __name__ == "__main__":
+    unittest.main()
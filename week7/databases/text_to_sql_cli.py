@@ -1,4 +1,6 @@
 import argparse
+import hashlib
+import json
 import re
 import sys
 import csv
@@ -48,6 +50,123 @@ def prompt_to_sql(model, schema: str, question: str, system_msg: str) -> str:
     return extract_sql(resp)
 
 
+DEFAULT_CACHE = "text_to_sql_cache.db"
+# First line after the question in the repair prompt
+REPAIR_INSTRUCTIONS = "The SQL you produced failed when executed against the database."
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case a question, collapse whitespace and drop trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip("?.! ")
+
+
+def cache_key(question: str, model_name: str, system_msg: str, schema: str) -> str:
+    """Hash of everything the generated SQL depends on.
+
+    The schema is included, so editing the --schema file or changing the
+    database's tables gives new keys and the old SQL is no longer used.
+    """
+    schema_hash = hashlib.sha256(schema.encode("utf-8")).hexdigest()
+    parts = [normalize_question(question), model_name, system_msg, schema_hash]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class SQLCache:
+    """Generated SQL, and whether it ran, keyed by cache_key().
+
+    Stored in a table of its own SQLite database (not the one being queried,
+    which may be read-only or shared).
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE):
+        self.db = sqlite_utils.Database(path)
+        self.table = self.db["sql_cache"]
+        if not self.table.exists():
+            self.table.create(
+                {
+                    "key": str,
+                    "question": str,
+                    "model": str,
+                    "sql": str,
+                    "ok": int,
+                    "error": str,
+                    "updated": float,
+                },
+                pk="key",
+            )
+
+    def get(self, key: str):
+        """The cached row for a key as a dict, or None.
+
+        ok is 1 if the SQL ran, 0 if it failed, and None if it was never
+        executed (--no-exec).
+        """
+        try:
+            return self.table.get(key)
+        except sqlite_utils.db.NotFoundError:
+            return None
+
+    def put(self, key: str, question: str, model_name: str, sql: str, ok=None, error=None):
+        """Store SQL for a key, replacing what was there (e.g. SQL that failed)."""
+        self.table.upsert(
+            {
+                "key": key,
+                "question": question,
+                "model": model_name,
+                "sql": sql,
+                "ok": None if ok is None else int(ok),
+                "error": None if error is None else str(error),
+                "updated": time.time(),
+            },
+            pk="key",
+        )
+
+
+class LocalResponse:
+    def __init__(self, text: str):
+        self._text = text
+
+    def text(self) -> str:
+        return self._text
+
+
+class LocalModel:
+    """Offline stand-in for an llm model, answering from a JSON file.
+
+    The file maps questions to SQL, or to a list of SQL replies given in
+    turn (the last one repeats), so the repair pass can be tried too. Use it
+    with --model local:answers.json.
+    """
+
+    def __init__(self, answers: dict):
+        self.answers = {
+            normalize_question(question): [reply] if isinstance(reply, str) else list(reply)
+            for question, reply in answers.items()
+        }
+        self.calls = 0
+
+    def prompt(self, prompt: str, system: str = None) -> LocalResponse:
+        self.calls += 1
+        # The question follows "Question:" in both prompts, and ends the first one or
+        # comes before the repair instructions (it may contain blank lines itself)
+        m = re.search(
+            r"Question:\n\n(.*?)(?:\n\n" + re.escape(REPAIR_INSTRUCTIONS) + r"|\Z)", prompt, flags=re.DOTALL
+        )
+        question = m.group(1) if m else ""
+        replies = self.answers.get(normalize_question(question))
+        if not replies:
+            return LocalResponse("")
+        return LocalResponse(replies.pop(0) if len(replies) > 1 else replies[0])
+
+
+def get_model(name: str):
+    """The llm model called name, or a LocalModel for "local:<answers.json>"."""
+    if name.startswith("local:"):
+        with open(name[len("local:"):], "r", encoding="utf-8") as fh:
+            return LocalModel(json.load(fh))
+    return llm.get_model(name)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Simple text-to-SQL CLI backed by an LLM and sqlite-utils."
@@ -81,6 +200,16 @@ def main():
         "-o",
         help="Path to output CSV file for query results (default: results-<timestamp>.csv)",
     )
+    parser.add_argument(
+        "--cache",
+        default=DEFAULT_CACHE,
+        help=f"SQLite file caching the SQL generated for each question (default: {DEFAULT_CACHE})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always ask the model, and don't store what it generates",
+    )
 
     args = parser.parse_args()
 
@@ -94,22 +223,37 @@ def main():
     else:
         schema = db.schema
 
-    # prepare model
-    model = llm.get_model(args.model)
-
     system_msg = "reply with SQLite SQL, not in markdown, just the SQL"
 
-    # Get SQL from model
-    sql = prompt_to_sql(model, schema, args.question, system_msg)
-    if not sql:
-        print("No SQL was produced by the model.", file=sys.stderr)
-        sys.exit(1)
+    # Reuse SQL generated before for the same question, model and schema,
+    # unless it failed when it was run
+    cache = None if args.no_cache else SQLCache(args.cache)
+    key = cache_key(args.question, args.model, system_msg, schema)
+    cached = cache.get(key) if cache is not None else None
+    model = None
+    if cached is not None and cached["ok"] != 0:
+        sql = cached["sql"]
+        print("---- Cached SQL ----")
+    else:
+        # prepare model
+        model = get_model(args.model)
 
-    print("---- Generated SQL ----")
+        # Get SQL from model
+        sql = prompt_to_sql(model, schema, args.question, system_msg)
+        if not sql:
+            print("No SQL was produced by the model.", file=sys.stderr)
+            sys.exit(1)
+        print("---- Generated SQL ----")
     print(sql)
     print("-----------------------")
 
+    def remember(sql_text, ok=None, error=None):
+        if cache is not None:
+            cache.put(key, args.question, args.model, sql_text, ok, error)
+
     if args.no_exec:
+        if cached is None or cached["sql"] != sql:
+            remember(sql)
         sys.exit(0)
 
     # Try executing the SQL. IMPORTANT: We will only execute read-only queries.
@@ -167,6 +311,7 @@ def main():
             return False, e
 
     ok, err = try_execute(sql)
+    remember(sql, ok, err)
     if ok:
         return
 
@@ -175,12 +320,14 @@ def main():
     repair_prompt = (
         f"Schema:\n\n{schema}\n\n"
         f"Question:\n\n{args.question}\n\n"
-        "The SQL you produced failed when executed against the database.\n"
+        f"{REPAIR_INSTRUCTIONS}\n"
         f"SQL that failed:\n\n{sql}\n\n"
         f"Error:\n\n{err}\n\n"
         "Please return corrected SQLite SQL only (no markdown). Only return a read-only query "
         "(SELECT/WITH/PRAGMA). Do not return any statements that modify the database."
     )
+    if model is None:
+        model = get_model(args.model)
     resp = model.prompt(repair_prompt, system=system_msg).text()
     sql2 = extract_sql(resp)
     print("---- Repaired SQL ----")
@@ -191,6 +338,8 @@ def main():
         sys.exit(1)
 
     ok2, err2 = try_execute(sql2)
+    # The repaired SQL replaces the failed entry
+    remember(sql2, ok2, err2)
     if ok2:
         return
 